@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Profile, Category, Tag, Listing
+from .models import Profile, Category, Tag, Listing, Job, StoredFile, ListingStat
 
 @admin.register(Profile)
 class ProfileAdmin(admin.ModelAdmin):
@@ -15,8 +15,25 @@ class TagAdmin(admin.ModelAdmin):
 
 @admin.register(Listing)
 class ListingAdmin(admin.ModelAdmin):
-    list_display = ('title', 'author', 'status', 'created_at')
+    list_display = ('title', 'author', 'status', 'thumbnail_status', 'favorite_count', 'created_at')
     list_filter = ('status', 'category', 'created_at')
     search_fields = ('title', 'description', 'author__username')
     raw_id_fields = ('author',)
-    filter_horizontal = ('tags', 'favorited_by')
\ No newline at end of file
+    filter_horizontal = ('tags', 'favorited_by')
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = ('task', 'status', 'attempts', 'created_at', 'finished_at')
+    list_filter = ('status', 'task')
+
+
+@admin.register(StoredFile)
+class StoredFileAdmin(admin.ModelAdmin):
+    list_display = ('name', 'refcount')
+    search_fields = ('name',)
+
+
+@admin.register(ListingStat)
+class ListingStatAdmin(admin.ModelAdmin):
+    list_display = ('group', 'key', 'count', 'price_sum')
+    list_filter = ('group',)
@@ -0,0 +1,115 @@
+"""
+Async counterparts of the read-only ListingViewSet endpoints. They take the
+same query parameters and return the same JSON, but read through the async
+ORM so an ASGI worker can serve other requests while waiting on the database.
+"""
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+
+from django.contrib.auth import get_user
+from django.http import JsonResponse
+from django.views.decorators.http import require_GET
+from rest_framework.exceptions import AuthenticationFailed, NotFound, ValidationError
+from rest_framework.request import Request
+from rest_framework.utils.encoders import JSONEncoder
+
+from users.authentication import CachedJWTAuthentication, ClaimsJWTAuthentication
+from .pagination import KeysetPagination
+from .serializers import ListingSerializer, StatisticsQuerySerializer
+from .views import ListingViewSet
+from .. import favorites, stats
+from ..models import Listing
+
+
+async def _request(request, stateless):
+    """
+    DRF Request for `request`, authenticated without blocking the event
+    loop: with `stateless`, JWTs are read from their claims alone; otherwise
+    the user comes from the user cache, in a worker thread like sessions
+    (graphql_jwt's backend has no `aget_user`, so `auser()` can't be used).
+    Raises AuthenticationFailed for a bad token or an inactive user.
+    """
+    drf_request = Request(request)
+    if stateless:
+        auth = ClaimsJWTAuthentication().authenticate(drf_request)
+    else:
+        auth = await sync_to_async(CachedJWTAuthentication().authenticate)(drf_request)
+    drf_request.user = auth[0] if auth else await sync_to_async(get_user)(request)
+    return drf_request
+
+
+def authenticated(stateless=False):
+    """
+    Authenticates the request for the view. `stateless` trusts token claims
+    without a user lookup; only for endpoints anonymous users can read.
+    """
+    def decorator(view):
+        @wraps(view)
+        async def wrapper(request, *args, **kwargs):
+            try:
+                drf_request = await _request(request, stateless)
+            except AuthenticationFailed as e:
+                return _error(str(e.detail), 401)
+            return await view(drf_request, *args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def _json(data, status=200):
+    # DRF's encoder, so decimals and dates render as they do in the sync views.
+    return JsonResponse(data, status=status, encoder=JSONEncoder)
+
+
+def _error(detail, status):
+    return _json({'detail': detail}, status)
+
+
+def _listings(drf_request):
+    """
+    The queryset ListingViewSet.list paginates, built by the viewset itself
+    so filters, search and ordering can't drift. Raises ValidationError for
+    invalid filters. Runs in a worker thread: validating ids queries the database.
+    """
+    view = ListingViewSet(request=drf_request, action='list', args=(), kwargs={}, format_kwarg=None)
+    return view.filter_queryset(view.get_queryset())
+
+
+@require_GET
+@authenticated(stateless=True)
+async def listing_list(drf_request):
+    try:
+        queryset = await sync_to_async(_listings)(drf_request)
+    except ValidationError as e:
+        return _json(e.detail, 400)
+    paginator = KeysetPagination()
+    try:
+        items = await paginator.apaginate_queryset(queryset, drf_request)
+    except NotFound as e:
+        return _error(str(e.detail), 404)
+    ids = await favorites.afavorited_ids(drf_request.user, [listing.pk for listing in items])
+    data = ListingSerializer(items, many=True, context={'request': drf_request, 'favorited_ids': ids}).data
+    return _json(paginator.get_paginated_data(data))
+
+
+@require_GET
+@authenticated(stateless=True)
+async def listing_detail(drf_request, pk):
+    queryset = ListingSerializer.setup_eager_loading(Listing.objects.all())
+    try:
+        listing = await queryset.aget(pk=pk)
+    except Listing.DoesNotExist:
+        return _error('No Listing matches the given query.', 404)
+    ids = await favorites.afavorited_ids(drf_request.user, [listing.pk])
+    return _json(ListingSerializer(listing, context={'request': drf_request, 'favorited_ids': ids}).data)
+
+
+@require_GET
+@authenticated()
+async def listing_statistics(drf_request):
+    if not drf_request.user.is_authenticated:
+        return _error('Authentication credentials were not provided.', 401)
+    params = StatisticsQuerySerializer(data=drf_request.query_params)
+    if not params.is_valid():
+        return _json(params.errors, 400)
+    return _json(await stats.asnapshot(series_days=params.validated_data.get('days')))
@@ -0,0 +1,101 @@
+import hashlib
+
+from django.core.cache import cache
+from django.db.models import Max
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils import timezone
+from django.utils.http import http_date
+from rest_framework.response import Response
+
+from .. import versions
+
+
+class ConditionalCacheMixin:
+    """
+    ETag/Last-Modified validators and a server-side response cache for
+    `list` and `retrieve`.
+
+    The validators come from one indexed aggregate (max pk and max
+    `freshness_field`) plus the version counters of `cache_dependencies`,
+    which every write bumps; deletes are only visible through the counters,
+    so they live in the CACHES backend shared by all worker processes
+    (settings.CACHES). 304 responses and cache hits
+    skip the queryset and the serializer entirely. Cache entries are keyed
+    by the ETag, so they never outlive the data they were built from.
+
+    Lists that hide rows past `expiry_field` change without any write; the
+    latest expiry that has passed goes into the validators, so they change
+    the moment a listed row expires.
+    """
+    cache_dependencies = ()
+    freshness_field = None
+    expiry_field = None
+    response_cache_timeout = 60
+
+    def list(self, request, *args, **kwargs):
+        return self.conditional_response(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.conditional_response(super().retrieve, request, *args, **kwargs)
+
+    def get_freshness(self):
+        """(token, last_modified) for the data behind this request, or None if the object does not exist."""
+        queryset = self.queryset.model._default_manager.all()
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        if lookup_url_kwarg in self.kwargs:
+            queryset = queryset.filter(**{self.lookup_field: self.kwargs[lookup_url_kwarg]})
+
+        aggregates = {'last_pk': Max('pk')}
+        if self.freshness_field:
+            aggregates['last_modified'] = Max(self.freshness_field)
+        state = queryset.aggregate(**aggregates)
+        if lookup_url_kwarg in self.kwargs and state['last_pk'] is None:
+            return None
+
+        last_expired = None
+        if self.expiry_field and lookup_url_kwarg not in self.kwargs:
+            # One row off the end of an index range.
+            last_expired = queryset.filter(**{f'{self.expiry_field}__lte': timezone.now()}).order_by(
+                f'-{self.expiry_field}'
+            ).values_list(self.expiry_field, flat=True).first()
+
+        counters, changed = versions.get_versions(self.cache_dependencies)
+        last_modified = max(filter(None, [state.get('last_modified'), changed, last_expired]), default=None)
+        token = '{}:{}:{}:{}'.format(
+            counters, state['last_pk'], last_modified.isoformat() if last_modified else '',
+            last_expired.isoformat() if last_expired else '',
+        )
+        return token, last_modified
+
+    def get_cache_scope(self):
+        user = self.request.user
+        return f'user:{user.pk}' if user and user.is_authenticated else 'anon'
+
+    def conditional_response(self, handler, request, *args, **kwargs):
+        freshness = self.get_freshness()
+        if freshness is None:
+            return handler(request, *args, **kwargs)
+        token, last_modified = freshness
+
+        variant = '|'.join([
+            token, self.get_cache_scope(), request.get_full_path(), request.accepted_renderer.format
+        ])
+        etag = '"{}"'.format(hashlib.md5(variant.encode()).hexdigest())
+        timestamp = int(last_modified.timestamp()) if last_modified else None
+
+        response = get_conditional_response(request, etag=etag, last_modified=timestamp)
+        if response is None:
+            cache_key = f'listings:response:{etag}'
+            data = cache.get(cache_key)
+            if data is not None:
+                response = Response(data)
+            else:
+                response = handler(request, *args, **kwargs)
+                if response.status_code == 200:
+                    cache.set(cache_key, response.data, self.response_cache_timeout)
+
+        response['ETag'] = etag
+        if timestamp is not None:
+            response['Last-Modified'] = http_date(timestamp)
+        patch_vary_headers(response, ['Authorization', 'Cookie'])
+        return response
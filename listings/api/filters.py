@@ -0,0 +1,18 @@
+from rest_framework import filters
+
+from ..search import get_backend
+from ..search.backends import split_terms
+
+
+class FullTextSearchFilter(filters.SearchFilter):
+    """
+    `?search=` backed by the configured listings search backend. Results
+    are ordered by relevance unless a valid `?ordering=` is given.
+    """
+    def filter_queryset(self, request, queryset, view):
+        query = request.query_params.get(self.search_param, '')
+        if not split_terms(query):
+            return queryset
+        if filters.OrderingFilter().get_ordering(request, queryset, view):
+            return get_backend().filter(queryset, query)
+        return get_backend().ranked(queryset, query)
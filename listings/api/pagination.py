@@ -0,0 +1,101 @@
+from django.conf import settings
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+from ..pagination import InvalidCursor, Keyset, decode_cursor, encode_cursor
+
+
+class KeysetPagination(BasePagination):
+    """
+    Cursor pagination over the view's ordering plus the primary key, e.g.
+    (created_at, id). Pages are fetched with a seek predicate instead of
+    OFFSET and no COUNT(*) is issued, so deep pages cost the same as page one.
+    """
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+
+    def get_page_size(self, request):
+        default = settings.REST_FRAMEWORK.get('PAGE_SIZE') or 20
+        try:
+            size = int(request.query_params.get(self.page_size_query_param, default))
+        except (TypeError, ValueError):
+            return default
+        return max(1, min(size, self.max_page_size))
+
+    def _start(self, queryset, request):
+        self.request = request
+        self.keyset = Keyset.for_queryset(queryset)
+        self.cursor = request.query_params.get(self.cursor_query_param)
+        try:
+            payload = decode_cursor(self.cursor) if self.cursor else {'v': None}
+        except InvalidCursor as e:
+            raise NotFound(str(e))
+        return self.get_page_size(request), payload['v'], not payload.get('r')
+
+    def _finish(self, items, has_more, forward):
+        if forward:
+            self.has_next, self.has_previous = has_more, self.cursor is not None
+        else:
+            self.has_next, self.has_previous = True, has_more
+        self.items = items
+        return items
+
+    def paginate_queryset(self, queryset, request, view=None):
+        limit, values, forward = self._start(queryset, request)
+        try:
+            items, has_more = self.keyset.page(queryset, limit, values, forward)
+        except InvalidCursor as e:
+            raise NotFound(str(e))
+        return self._finish(items, has_more, forward)
+
+    async def apaginate_queryset(self, queryset, request):
+        """`paginate_queryset()` for async views; the page is read with the async ORM."""
+        limit, values, forward = self._start(queryset, request)
+        try:
+            items, has_more = await self.keyset.apage(queryset, limit, values, forward)
+        except InvalidCursor as e:
+            raise NotFound(str(e))
+        return self._finish(items, has_more, forward)
+
+    def get_paginated_data(self, data):
+        return {
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        }
+
+    def _link(self, obj, reverse=False):
+        payload = {'v': self.keyset.values_for(obj)}
+        if reverse:
+            payload['r'] = 1
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, encode_cursor(payload))
+
+    def get_next_link(self):
+        if not self.has_next or not self.items:
+            return None
+        return self._link(self.items[-1])
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if not self.items:
+            return remove_query_param(self.request.build_absolute_uri(), self.cursor_query_param)
+        return self._link(self.items[0], reverse=True)
+
+    def get_paginated_response(self, data):
+        return Response(self.get_paginated_data(data))
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
@@ -1,22 +1,41 @@
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Prefetch
 from rest_framework import serializers
+from .. import favorites, profiling
+from ..images import renditions_with_urls
 from ..models import Listing, Category, Tag, Profile
 
-class CategorySerializer(serializers.ModelSerializer):
+class TimedDataMixin:
+    """Building `.data` counts as serialization time in the request profile (listings.profiling)."""
+    @property
+    def data(self):
+        with profiling.timed('serialize'):
+            return super().data
+
+
+class TimedListSerializer(TimedDataMixin, serializers.ListSerializer):
+    pass
+
+
+class CategorySerializer(TimedDataMixin, serializers.ModelSerializer):
     class Meta:
         model = Category
         fields = ['id', 'name']
+        list_serializer_class = TimedListSerializer
 
-class TagSerializer(serializers.ModelSerializer):
+class TagSerializer(TimedDataMixin, serializers.ModelSerializer):
     class Meta:
         model = Tag
         fields = ['id', 'name']
+        list_serializer_class = TimedListSerializer
 
-class ProfileSerializer(serializers.ModelSerializer):
+class ProfileSerializer(TimedDataMixin, serializers.ModelSerializer):
     phone_number = serializers.SerializerMethodField()
 
     class Meta:
         model = Profile
         fields = ['user', 'phone_number']
+        list_serializer_class = TimedListSerializer
         read_only_fields = ['user']
 
     def get_phone_number(self, obj):
@@ -26,18 +45,71 @@ class ProfileSerializer(serializers.ModelSerializer):
         return None
 
 
-class ListingSerializer(serializers.ModelSerializer):
+class EagerLoadingMixin:
+    """
+    Builds select_related/prefetch_related/only() from the serializer's own
+    fields, so a list page costs a fixed number of queries.
+    """
+    @classmethod
+    def setup_eager_loading(cls, queryset):
+        model = cls.Meta.model
+        only, select, prefetch = {model._meta.pk.name}, set(), []
+        for name, field in cls().fields.items():
+            source = name if isinstance(field, serializers.SerializerMethodField) else field.source
+            if source == '*':
+                continue
+            attr, _, rest = source.partition('.')
+            try:
+                model_field = model._meta.get_field(attr)
+            except FieldDoesNotExist:
+                continue
+            if model_field.many_to_many or model_field.one_to_many:
+                relation = getattr(field, 'child_relation', field)
+                related = model_field.related_model
+                columns = {related._meta.pk.name, getattr(relation, 'slug_field', None) or related._meta.pk.name}
+                prefetch.append(Prefetch(attr, queryset=related._default_manager.only(*columns)))
+            elif model_field.is_relation:
+                select.add(attr)
+                related_attr = rest or getattr(field, 'slug_field', None)
+                only.add(f"{attr}__{related_attr}" if related_attr else attr)
+            else:
+                only.add(attr)
+        return queryset.select_related(*select).prefetch_related(*prefetch).only(*only)
+
+
+class ListingSerializer(TimedDataMixin, EagerLoadingMixin, serializers.ModelSerializer):
     author = serializers.ReadOnlyField(source='author.username')
     category = serializers.SlugRelatedField(queryset=Category.objects.all(), slug_field='name')
     tags = serializers.SlugRelatedField(queryset=Tag.objects.all(), slug_field='name', many=True, required=False)
+    renditions = serializers.SerializerMethodField()
+    is_favorited = serializers.SerializerMethodField()
 
     class Meta:
         model = Listing
         fields = [
             'id', 'title', 'description', 'price', 'status',
             'created_at', 'updated_at', 'expires_at',
-            'author', 'category', 'tags', 'image'
+            'author', 'category', 'tags', 'image', 'thumbnail', 'thumbnail_status', 'renditions',
+            'favorite_count', 'is_favorited',
         ]
+        read_only_fields = ['thumbnail', 'thumbnail_status', 'favorite_count']
+        list_serializer_class = TimedListSerializer
+
+    def get_renditions(self, obj):
+        return renditions_with_urls(obj.renditions, obj.thumbnail.storage, self.context.get('request'))
+
+    def get_is_favorited(self, obj):
+        """
+        Looked up in `context['favorited_ids']`. When absent it is loaded once
+        for the whole page (or the single object) and stored in the context.
+        """
+        ids = self.context.get('favorited_ids')
+        if ids is None:
+            request = self.context.get('request')
+            page = self.parent.instance if isinstance(self.parent, serializers.ListSerializer) else [obj]
+            ids = favorites.favorited_ids(getattr(request, 'user', None), [listing.pk for listing in page])
+            self.context['favorited_ids'] = ids
+        return obj.pk in ids
 
     def create(self, validated_data):
         tags = validated_data.pop('tags', [])
@@ -50,4 +122,25 @@ class ListingSerializer(serializers.ModelSerializer):
             instance.category = validated_data.pop('category')
         if 'tags' in validated_data:
             instance.tags.set(validated_data.pop('tags'))
-        return super().update(instance, validated_data)
\ No newline at end of file
+        return super().update(instance, validated_data)
+
+class BulkListingRowSerializer(serializers.Serializer):
+    """Shape of one row of /api/listings/bulk/; lookups and permissions are checked in listings.bulk."""
+    id = serializers.IntegerField(required=False)
+    delete = serializers.BooleanField(default=False)
+    title = serializers.CharField(max_length=200, required=False)
+    description = serializers.CharField(required=False)
+    price = serializers.DecimalField(max_digits=10, decimal_places=2, required=False)
+    status = serializers.ChoiceField(choices=Listing.STATUS_CHOICES, required=False)
+    category = serializers.CharField(max_length=100, required=False)
+    tags = serializers.ListField(child=serializers.CharField(max_length=50), required=False)
+    expires_at = serializers.DateTimeField(required=False, allow_null=True)
+    image = serializers.CharField(max_length=100, required=False)
+
+class StatisticsQuerySerializer(serializers.Serializer):
+    """Query parameters of the listing statistics endpoints (sync and async)."""
+    days = serializers.IntegerField(required=False, min_value=1, max_value=366, error_messages={
+        'invalid': 'Must be an integer.',
+        'min_value': 'Must be between 1 and 366.',
+        'max_value': 'Must be between 1 and 366.',
+    })
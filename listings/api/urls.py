@@ -1,4 +1,6 @@
+from django.urls import path
 from rest_framework.routers import DefaultRouter
+from . import async_views
 from .views import ListingViewSet, CategoryViewSet, TagViewSet, ProfileViewSet
 
 router = DefaultRouter()
@@ -7,4 +9,8 @@ router.register(r'categories', CategoryViewSet)
 router.register(r'tags', TagViewSet)
 router.register(r'profiles', ProfileViewSet)
 
-urlpatterns = router.urls
\ No newline at end of file
+urlpatterns = [
+    path('async/listings/', async_views.listing_list, name='async-listing-list'),
+    path('async/listings/statistics/', async_views.listing_statistics, name='async-listing-statistics'),
+    path('async/listings/<int:pk>/', async_views.listing_detail, name='async-listing-detail'),
+] + router.urls
\ No newline at end of file
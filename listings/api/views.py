@@ -1,65 +1,110 @@
-from django.db.models import Avg, Count
 from rest_framework import viewsets, permissions, filters
+from rest_framework.authentication import SessionAuthentication
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from rest_framework.response import Response
 from django_filters.rest_framework import DjangoFilterBackend
-from .serializers import ListingSerializer, CategorySerializer, TagSerializer, ProfileSerializer
+from .caching import ConditionalCacheMixin
+from .filters import FullTextSearchFilter
+from .pagination import KeysetPagination
+from .serializers import (
+    BulkListingRowSerializer, ListingSerializer, CategorySerializer, TagSerializer, ProfileSerializer,
+    StatisticsQuerySerializer,
+)
+from .. import bulk, favorites, stats, versions
 from ..models import Listing, Category, Tag, Profile
 from ..permissions import IsOwnerOrAdminOrModerator
+from users.authentication import StatelessReadJWTAuthentication
 
 
-class ListingViewSet(viewsets.ModelViewSet):
+class ListingViewSet(ConditionalCacheMixin, viewsets.ModelViewSet):
     queryset = Listing.objects.all()
     serializer_class = ListingSerializer
+    pagination_class = KeysetPagination
+    authentication_classes = [StatelessReadJWTAuthentication, SessionAuthentication]
+    # Readable anonymously too; the token user only personalises them.
+    stateless_auth_actions = ('list', 'retrieve')
     permission_classes = [permissions.IsAuthenticatedOrReadOnly, IsOwnerOrAdminOrModerator]
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
+    filter_backends = [DjangoFilterBackend, FullTextSearchFilter, filters.OrderingFilter]
     filterset_fields = ['status', 'category', 'tags', 'author']
-    search_fields = ['title', 'description']
     ordering_fields = ['created_at', 'price']
+    cache_dependencies = (versions.LISTING, versions.CATEGORY, versions.TAG, versions.USER, versions.FAVORITE)
+    freshness_field = 'updated_at'
+    # The list shows only active() listings.
+    expiry_field = 'expires_at'
 
     def perform_create(self, serializer):
         serializer.save(author=self.request.user)
 
     def get_queryset(self):
-        qs = super().get_queryset()
+        qs = self.get_serializer_class().setup_eager_loading(super().get_queryset())
+        if self.action == 'list':
+            qs = qs.active()
         status_param = self.request.query_params.get('status')
         if status_param:
             qs = qs.filter(status=status_param)
         return qs
 
-    @action(detail=False, methods=["get"], url_path="statistics", permission_classes=[permissions.IsAuthenticated])
-    def statistics(self, request):
-        total = Listing.objects.count()
-        avg_price = Listing.objects.aggregate(avg=Avg("price"))["avg"]
+    @action(detail=False, methods=["post"], url_path="bulk", url_name="bulk", permission_classes=[permissions.IsAuthenticated])
+    def bulk_write(self, request):
+        """
+        Create/update/delete up to bulk.MAX_ROWS listings from a JSON list of
+        rows. Rows with an `id` update (or with `"delete": true` delete) that
+        listing, the rest are created. Answers with one result per row.
+        """
+        if not isinstance(request.data, list):
+            raise ValidationError({"detail": "Expected a list of rows."})
+        if len(request.data) > bulk.MAX_ROWS:
+            raise ValidationError({"detail": f"At most {bulk.MAX_ROWS} rows per request."})
+
+        rows, results = [], []
+        for index, row in enumerate(request.data):
+            serializer = BulkListingRowSerializer(data=row)
+            if serializer.is_valid():
+                rows.append((index, serializer.validated_data))
+            else:
+                results.append({"index": index, "id": None, "action": None, "errors": serializer.errors})
+        results += bulk.write(request.user, rows)
+        return Response({"results": sorted(results, key=lambda result: result["index"])})
 
-        by_category = (
-            Category.objects.annotate(count=Count("listings"))
-            .values("name", "count")
-        )
+    @action(detail=True, methods=["post", "delete"], url_path="favorite", permission_classes=[permissions.IsAuthenticated])
+    def favorite(self, request, pk=None):
+        """POST favorites the listing for the current user, DELETE removes it; both are idempotent."""
+        listing = self.get_object()
+        favorited = request.method == "POST"
+        (favorites.add if favorited else favorites.remove)(request.user, listing)
+        return Response({"id": listing.pk, "is_favorited": favorited, "favorite_count": favorites.count(listing.pk)})
 
-        by_status = (
-            Listing.objects.values("status")
-            .annotate(count=Count("id"))
-            .order_by("status")
-        )
+    @action(detail=False, methods=["get"], url_path="favorites", url_name="favorites", permission_classes=[permissions.IsAuthenticated])
+    def my_favorites(self, request):
+        """The current user's favorited active listings, keyset-paginated like the main list."""
+        queryset = self.get_serializer_class().setup_eager_loading(favorites.favorites_of(request.user))
+        page = self.paginate_queryset(self.filter_queryset(queryset))
+        context = dict(self.get_serializer_context(), favorited_ids={listing.pk for listing in page})
+        return self.get_paginated_response(self.get_serializer(page, many=True, context=context).data)
 
-        return Response({
-            "total_listings": total,
-            "average_price": avg_price,
-            "listings_by_category": list(by_category),
-            "listings_by_status": list(by_status),
-        })
+    @action(detail=False, methods=["get"], url_path="statistics", permission_classes=[permissions.IsAuthenticated])
+    def statistics(self, request):
+        """
+        Served from the incrementally maintained counters in ListingStat.
+        `?days=N` adds a `listings_per_day` series for the last N days.
+        """
+        params = StatisticsQuerySerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        return Response(stats.snapshot(series_days=params.validated_data.get("days")))
 
 
-class CategoryViewSet(viewsets.ModelViewSet):
+class CategoryViewSet(ConditionalCacheMixin, viewsets.ModelViewSet):
     queryset = Category.objects.all()
     serializer_class = CategorySerializer
     permission_classes = [permissions.IsAdminUser]
+    cache_dependencies = (versions.CATEGORY,)
 
-class TagViewSet(viewsets.ModelViewSet):
+class TagViewSet(ConditionalCacheMixin, viewsets.ModelViewSet):
     queryset = Tag.objects.all()
     serializer_class = TagSerializer
     permission_classes = [permissions.IsAdminUser]
+    cache_dependencies = (versions.TAG,)
 
 class ProfileViewSet(viewsets.ModelViewSet):
     queryset = Profile.objects.all()
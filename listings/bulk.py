@@ -0,0 +1,157 @@
+from django.db import transaction
+from django.utils import timezone
+
+from . import stats, versions
+from .jobs import enqueue
+from .models import Listing
+from .storage import acquire, release
+from .images import rendition_names
+from .taxonomy import resolve_categories, resolve_tags, set_tags
+from users.roles import can_modify_listing
+
+MAX_ROWS = 5000
+BATCH_SIZE = 500
+
+VALUE_FIELDS = ('title', 'description', 'price', 'status', 'expires_at')
+REQUIRED_ON_CREATE = ('title', 'description', 'price', 'category')
+STATUSES = {value for value, _ in Listing.STATUS_CHOICES}
+
+
+def _release_files(listing):
+    storage = listing.image.storage
+    for name in (listing.image.name, listing.thumbnail.name, *rendition_names(listing.renditions)):
+        release(name, storage)
+
+
+def _check(row, existing, user, categories, tags):
+    """Errors of one row as `{field: message}`."""
+    errors = {}
+    if row.get('delete') or 'id' in row:
+        listing = existing.get(row.get('id'))
+        if listing is None:
+            return {'id': 'Listing not found.'}
+        if not can_modify_listing(user, listing):
+            return {'id': 'Not permitted to modify this listing.'}
+    else:
+        for field in REQUIRED_ON_CREATE:
+            if row.get(field) in (None, ''):
+                errors[field] = 'This field is required.'
+    if row.get('delete'):
+        return errors
+    if 'status' in row and row['status'] not in STATUSES:
+        errors['status'] = f"Invalid status \"{row['status']}\"."
+    if row.get('category') and row['category'] not in categories:
+        errors['category'] = f"Category \"{row['category']}\" does not exist."
+    unknown = [name for name in row.get('tags') or () if name not in tags]
+    if unknown:
+        errors['tags'] = f"Unknown tags: {', '.join(unknown)}."
+    return errors
+
+
+def write(user, rows, create_missing=False):
+    """
+    Create, update and delete listings in bulk for `user`.
+
+    `rows` is a list of `(index, data)`; `data` holds any of `id`, `delete`,
+    the listing's value fields, `category` and `tags` (names) and `image`
+    (a stored media path). Rows without `id` are created. Returns one
+    `{index, id, action, errors}` dict per row; rows with errors are
+    skipped, the rest are written in one transaction with a fixed number of
+    queries per batch. Image derivatives are queued as background jobs.
+    """
+    ids = {data['id'] for _, data in rows if 'id' in data}
+    existing = Listing.objects.in_bulk(ids) if ids else {}
+    categories = resolve_categories((data['category'] for _, data in rows if data.get('category')), create_missing)
+    tags = resolve_tags((name for _, data in rows for name in data.get('tags') or ()), create_missing)
+
+    results, creates, updates, deletes, seen = [], [], [], [], set()
+    for index, data in rows:
+        if 'id' in data and data['id'] in seen:
+            errors = {'id': 'Listing appears more than once in this request.'}
+        else:
+            errors = _check(data, existing, user, categories, tags)
+            seen.add(data.get('id'))
+        result = {'index': index, 'id': data.get('id'), 'action': None, 'errors': errors}
+        results.append(result)
+        if errors:
+            continue
+        if data.get('delete'):
+            result['action'] = 'deleted'
+            deletes.append(existing[data['id']])
+        elif 'id' in data:
+            result['action'] = 'updated'
+            updates.append((existing[data['id']], data))
+        else:
+            result['action'] = 'created'
+            creates.append((result, data))
+
+    derivative_ids = []
+    with transaction.atomic(), stats.batched():
+        if creates:
+            _create(user, creates, categories, derivative_ids)
+        if updates:
+            _update(updates, categories, derivative_ids)
+        assignments = {listing.pk: data['tags'] for listing, data in updates if 'tags' in data}
+        created = {result['id']: data['tags'] for result, data in creates if data.get('tags')}
+        assignments.update(created)
+        set_tags(
+            {listing_id: {tags[name].pk for name in names} for listing_id, names in assignments.items()},
+            created=created,
+        )
+        if deletes:
+            Listing.objects.filter(pk__in=[listing.pk for listing in deletes]).delete()
+            for listing in deletes:
+                _release_files(listing)
+
+    if creates or updates:
+        versions.bump(versions.LISTING)
+    for listing_id in derivative_ids:
+        enqueue('listings.tasks.generate_derivatives', listing_id)
+    return results
+
+
+def _create(user, creates, categories, derivative_ids):
+    listings = []
+    for _, data in creates:
+        listing = Listing(author=user, category=categories[data['category']])
+        for field in VALUE_FIELDS:
+            if field in data:
+                setattr(listing, field, data[field])
+        if data.get('image'):
+            listing.image = data['image']
+            listing.thumbnail_status = 'PENDING'
+        listings.append(listing)
+    Listing.objects.bulk_create(listings, batch_size=BATCH_SIZE)
+
+    for (result, _), listing in zip(creates, listings):
+        result['id'] = listing.pk
+        stats.apply(stats.contribution(listing.status, listing.category_id, listing.price, listing.created_at))
+        if listing.image:
+            acquire(listing.image.name)
+            derivative_ids.append(listing.pk)
+
+
+def _update(updates, categories, derivative_ids):
+    fields = {'updated_at'}
+    now = timezone.now()
+    for listing, data in updates:
+        before = stats.contribution_of(listing.loaded_values())
+        for field in VALUE_FIELDS:
+            if field in data:
+                setattr(listing, field, data[field])
+                fields.add(field)
+        if data.get('category'):
+            listing.category = categories[data['category']]
+            fields.add('category')
+        if data.get('image') and data['image'] != listing.image.name:
+            acquire(data['image'])
+            _release_files(listing)
+            listing.image, listing.thumbnail, listing.renditions = data['image'], None, {}
+            listing.thumbnail_status = 'PENDING'
+            fields.update(('image', *Listing.DERIVED_FIELDS))
+            derivative_ids.append(listing.pk)
+        listing.updated_at = now
+        after = stats.contribution(listing.status, listing.category_id, listing.price, listing.created_at)
+        stats.apply(stats.diff(before, after))
+    Listing.objects.bulk_update([listing for listing, _ in updates], sorted(fields), batch_size=BATCH_SIZE)
+
@@ -0,0 +1,146 @@
+import hashlib
+import random
+import sqlite3
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+REPLICA_DEFAULTS = {
+    'ALIASES': [],
+    'STICKY_SECONDS': 5,
+    'COOKIE': 'use_primary',
+}
+
+# Replica alias reads go to in the current request/operation, or None.
+_read_alias = ContextVar('listings_read_alias', default=None)
+# {'wrote': bool} for the current request; a dict so writes made in
+# sync_to_async threads are seen by the request that started them.
+_request_state = ContextVar('listings_request_state', default=None)
+
+
+def sqlite_pragmas(connection):
+    """PRAGMAs for `connection`: DATABASES[alias]['PRAGMAS'] if set, else settings.SQLITE_PRAGMAS."""
+    pragmas = connection.settings_dict.get('PRAGMAS')
+    if pragmas is None:
+        pragmas = getattr(settings, 'SQLITE_PRAGMAS', {})
+    return pragmas
+
+
+@receiver(connection_created)
+def configure_sqlite(sender, connection, **kwargs):
+    if connection.vendor != 'sqlite':
+        return
+    for name, value in sqlite_pragmas(connection).items():
+        if not name.isidentifier():
+            raise ValueError(f"Invalid SQLite PRAGMA name: {name!r}")
+        # Runs on the raw connection so the statements stay out of query logs and wrappers.
+        connection.connection.execute(f'PRAGMA {name} = {value}')
+
+
+def backup_sqlite(connection, path):
+    """Consistent copy of the SQLite database behind `connection` into the file at `path`."""
+    connection.ensure_connection()
+    target = sqlite3.connect(path)
+    try:
+        connection.connection.backup(target)
+    finally:
+        target.close()
+
+
+def replica_settings():
+    return dict(REPLICA_DEFAULTS, **getattr(settings, 'LISTINGS_REPLICAS', {}))
+
+
+def _client_key(request):
+    identity = (
+        request.META.get('HTTP_AUTHORIZATION')
+        or request.COOKIES.get(settings.SESSION_COOKIE_NAME)
+        or request.META.get('REMOTE_ADDR', '')
+    )
+    return 'listings:primary:' + hashlib.sha256(identity.encode()).hexdigest()
+
+
+def is_pinned(request):
+    """Whether `request`'s client wrote recently and must read its own writes from the primary."""
+    return request.COOKIES.get(replica_settings()['COOKIE']) == '1' or bool(cache.get(_client_key(request)))
+
+
+def pin(request, response):
+    config = replica_settings()
+    cache.set(_client_key(request), True, config['STICKY_SECONDS'])
+    response.set_cookie(config['COOKIE'], '1', max_age=config['STICKY_SECONDS'], httponly=True, samesite='Lax')
+
+
+@contextmanager
+def replica_reads(request=None):
+    """Route reads inside the block to a replica, unless none is configured or `request`'s client is pinned."""
+    aliases = replica_settings()['ALIASES']
+    state = _request_state.get()
+    if not aliases or (state and state['wrote']) or (request is not None and is_pinned(request)):
+        yield None
+        return
+    token = _read_alias.set(random.choice(aliases))
+    try:
+        yield _read_alias.get()
+    finally:
+        _read_alias.reset(token)
+
+
+@contextmanager
+def request_routing(request):
+    """Reads of safe-method requests go to a replica; a request that writes pins its client to the primary."""
+    state = {'wrote': False}
+    state_token = _request_state.set(state)
+    try:
+        if request.method in ('GET', 'HEAD', 'OPTIONS'):
+            with replica_reads(request):
+                yield state
+        else:
+            yield state
+    finally:
+        _request_state.reset(state_token)
+
+
+class ReplicaRouter:
+    """
+    Reads go to the replica chosen by `replica_reads()`, or wherever Django
+    would send them otherwise; writes go to the primary (or to the database
+    an object was explicitly loaded from, if that is not a replica). Reads inside a
+    transaction on the primary, or after a write in the same request, stay
+    on the primary.
+    """
+    def db_for_read(self, model, **hints):
+        alias = _read_alias.get()
+        if alias is None:
+            return None
+        state = _request_state.get()
+        if (state and state['wrote']) or connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        return alias
+
+    def db_for_write(self, model, **hints):
+        # Objects loaded through .using() keep their database, unless it is a replica.
+        instance = hints.get('instance')
+        if instance is not None and instance._state.db not in (None, DEFAULT_DB_ALIAS, *replica_settings()['ALIASES']):
+            return instance._state.db
+        state = _request_state.get()
+        if state is not None:
+            state['wrote'] = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {DEFAULT_DB_ALIAS, *replica_settings()['ALIASES']}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Replicas get their schema from the primary.
+        if db in replica_settings()['ALIASES']:
+            return False
+        return None
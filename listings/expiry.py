@@ -0,0 +1,37 @@
+import time
+
+from django.db import transaction
+from django.utils import timezone
+
+from . import stats, versions
+from .models import Listing
+from .signals import STAT_FIELDS
+
+BATCH_SIZE = 500
+
+
+def archive_expired(now=None, batch_size=BATCH_SIZE, pause=0.0):
+    """
+    Move listings past their `expires_at` to ARCHIVED, `batch_size` rows per
+    transaction so the write lock is only ever held briefly, sleeping
+    `pause` seconds between batches. Returns the number of archived rows.
+    """
+    now = now or timezone.now()
+    archived = 0
+    while True:
+        with transaction.atomic(), stats.batched():
+            rows = list(Listing.objects.expired(now).order_by('expires_at').values('pk', *STAT_FIELDS)[:batch_size])
+            if not rows:
+                break
+            Listing.objects.filter(pk__in=[row['pk'] for row in rows]).update(
+                status='ARCHIVED', updated_at=timezone.now(),
+            )
+            for row in rows:
+                stats.apply(stats.diff(stats.contribution_of(row), stats.contribution_of(dict(row, status='ARCHIVED'))))
+        archived += len(rows)
+        versions.bump(versions.LISTING)
+        if len(rows) < batch_size:
+            break
+        if pause:
+            time.sleep(pause)
+    return archived
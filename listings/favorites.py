@@ -0,0 +1,68 @@
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from . import versions
+from .models import Listing
+
+Favorite = Listing.favorited_by.through
+
+
+def add(user, listing):
+    """Favorite `listing` for `user`; False if it already was. The count moves in the same transaction."""
+    with transaction.atomic():
+        try:
+            with transaction.atomic():
+                Favorite.objects.create(listing_id=listing.pk, user_id=user.pk)
+        except IntegrityError:
+            return False
+        Listing.objects.filter(pk=listing.pk).update(favorite_count=F('favorite_count') + 1)
+    versions.bump(versions.FAVORITE)
+    return True
+
+
+def remove(user, listing):
+    """Drop `user`'s favorite of `listing`; False if there was none."""
+    with transaction.atomic():
+        deleted, _ = Favorite.objects.filter(listing_id=listing.pk, user_id=user.pk).delete()
+        if not deleted:
+            return False
+        Listing.objects.filter(pk=listing.pk).update(favorite_count=F('favorite_count') - 1)
+    versions.bump(versions.FAVORITE)
+    return True
+
+
+def count(listing_id):
+    return Listing.objects.filter(pk=listing_id).values_list('favorite_count', flat=True).first() or 0
+
+
+def _ids_query(user, listing_ids):
+    return Favorite.objects.filter(user_id=user.pk, listing_id__in=listing_ids).values_list('listing_id', flat=True)
+
+
+def favorited_ids(user, listing_ids):
+    """The subset of `listing_ids` that `user` has favorited, with one query (none for anonymous users)."""
+    listing_ids = [pk for pk in listing_ids if pk is not None]
+    if user is None or not user.is_authenticated or not listing_ids:
+        return set()
+    return set(_ids_query(user, listing_ids))
+
+
+async def afavorited_ids(user, listing_ids):
+    """`favorited_ids()` read with the async ORM."""
+    listing_ids = [pk for pk in listing_ids if pk is not None]
+    if user is None or not user.is_authenticated or not listing_ids:
+        return set()
+    return {pk async for pk in _ids_query(user, listing_ids)}
+
+
+def favorites_of(user):
+    """Active listings favorited by `user`, for the "my favorites" feed."""
+    return Listing.objects.active().filter(pk__in=Favorite.objects.filter(user_id=user.pk).values('listing_id'))
+
+
+def recount(listing_ids=None):
+    """Recompute favorite_count from the links, for `listing_ids` or every listing (drift repair)."""
+    links = Favorite.objects.filter(listing_id=OuterRef('pk')).order_by().values('listing_id')
+    listings = Listing.objects.all() if listing_ids is None else Listing.objects.filter(pk__in=listing_ids)
+    listings.update(favorite_count=Coalesce(Subquery(links.annotate(c=Count('pk')).values('c')), 0))
@@ -0,0 +1,118 @@
+from collections import defaultdict
+
+from django.contrib.auth.models import User
+from django.db.models import Window
+from django.db.models.functions import RowNumber
+from listings import favorites
+from listings.models import Listing, Category
+from listings.pagination import MAX_PAGE_SIZE
+
+
+def _newest_per(queryset, partition, created_at='created_at', pk='pk'):
+    """At most MAX_PAGE_SIZE rows of `queryset` per value of `partition`, newest first."""
+    ordering = (f'-{created_at}', f'-{pk}')
+    return queryset.annotate(
+        row=Window(RowNumber(), partition_by=partition, order_by=ordering)
+    ).filter(row__lte=MAX_PAGE_SIZE).order_by(*ordering)
+
+
+class BatchLoader:
+    """
+    Synchronous DataLoader. Keys are primed while parent objects are
+    resolved; the first load() of an unknown key fetches every pending
+    key with a single batch call. Results are cached for the request.
+    """
+    def __init__(self, batch_load_fn, default=None):
+        self.batch_load_fn = batch_load_fn
+        self.default = default
+        self._cache = {}
+        self._pending = {}
+
+    def prime(self, keys):
+        for key in keys:
+            if key is not None and key not in self._cache:
+                self._pending[key] = None
+
+    def load(self, key):
+        if key not in self._cache:
+            self._pending[key] = None
+            keys = list(self._pending)
+            self._pending = {}
+            results = self.batch_load_fn(keys)
+            for k in keys:
+                self._cache[k] = results.get(k, self.default() if callable(self.default) else self.default)
+        return self._cache[key]
+
+
+class Loaders:
+    """Loaders for one GraphQL request; use `get_loaders(info)`."""
+    def __init__(self, user=None):
+        self.viewer = user
+        self.users = BatchLoader(lambda ids: User.objects.in_bulk(ids))
+        self.categories = BatchLoader(self._load_categories)
+        self.tags_by_listing = BatchLoader(self._load_tags_by_listing, default=list)
+        self.listings_by_category = BatchLoader(self._load_listings_by_category, default=list)
+        self.listings_by_tag = BatchLoader(self._load_listings_by_tag, default=list)
+        self.favorited = BatchLoader(self._load_favorited, default=False)
+
+    def prime_listings(self, listings):
+        listings = list(listings)
+        self.users.prime(listing.author_id for listing in listings)
+        self.categories.prime(listing.category_id for listing in listings)
+        self.tags_by_listing.prime(listing.pk for listing in listings)
+        self.favorited.prime(listing.pk for listing in listings)
+        return listings
+
+    def prime_categories(self, categories):
+        categories = list(categories)
+        self.listings_by_category.prime(category.pk for category in categories)
+        return categories
+
+    def prime_tags(self, tags):
+        tags = list(tags)
+        self.listings_by_tag.prime(tag.pk for tag in tags)
+        return tags
+
+    def _load_categories(self, category_ids):
+        categories = Category.objects.in_bulk(category_ids)
+        self.prime_categories(categories.values())
+        return categories
+
+    def _load_tags_by_listing(self, listing_ids):
+        result = defaultdict(list)
+        links = Listing.tags.through.objects.filter(listing_id__in=listing_ids).select_related('tag')
+        for link in links.order_by('tag__name'):
+            result[link.listing_id].append(link.tag)
+        self.prime_tags(tag for tags in result.values() for tag in tags)
+        return result
+
+    def _load_favorited(self, listing_ids):
+        return dict.fromkeys(favorites.favorited_ids(self.viewer, listing_ids), True)
+
+    def _load_listings_by_category(self, category_ids):
+        result = defaultdict(list)
+        listings = Listing.objects.active().filter(category_id__in=category_ids)
+        for listing in _newest_per(listings, 'category_id'):
+            result[listing.category_id].append(listing)
+        self.prime_listings(listing for listings in result.values() for listing in listings)
+        return result
+
+    def _load_listings_by_tag(self, tag_ids):
+        result = defaultdict(list)
+        links = Listing.tags.through.objects.filter(
+            tag_id__in=tag_ids, listing__in=Listing.objects.active()
+        ).select_related('listing')
+        for link in _newest_per(links, 'tag_id', 'listing__created_at', 'listing_id'):
+            result[link.tag_id].append(link.listing)
+        self.prime_listings(listing for listings in result.values() for listing in listings)
+        return result
+
+
+def get_loaders(info):
+    context = info.context
+    if context is None:
+        return Loaders()
+    loaders = getattr(context, '_graphql_loaders', None)
+    if loaders is None:
+        loaders = context._graphql_loaders = Loaders(getattr(context, 'user', None))
+    return loaders
@@ -1,9 +1,30 @@
 import graphene
 import graphql_jwt
 from decimal import Decimal
+from django.core.exceptions import ValidationError
+from listings import bulk, favorites
 from listings.models import Listing, Category, Tag, Profile
+from listings.taxonomy import get_category, resolve_tags, set_tags
+from listings.uploads import validate_image_upload
+from users.roles import can_modify_listing
 from .types import ListingType, CategoryType, TagType, ProfileType
 
+
+def resolve_image(info, value):
+    """
+    `image` names either a file part of a multipart request (streamed to a
+    temp file by the upload handler) or an already stored media path.
+    """
+    upload = info.context.FILES.get(value) if hasattr(info.context, "FILES") else None
+    if upload is None:
+        return value
+    try:
+        validate_image_upload(upload)
+    except ValidationError as e:
+        raise Exception(e.messages[0])
+    return upload
+
+
 class CreateListing(graphene.Mutation):
     listing = graphene.Field(ListingType)
 
@@ -21,23 +42,21 @@ class CreateListing(graphene.Mutation):
         if not user or not user.is_authenticated:
             raise Exception("Authentication required")
 
-        cat, _ = Category.objects.get_or_create(name=category_name)
         listing = Listing(
             title=title,
             description=description,
             price=Decimal(str(price)),
             author=user,
-            category=cat,
+            category=get_category(category_name),
             expires_at=expires_at
         )
         if image:
-            listing.image = image
+            listing.image = resolve_image(info, image)
         listing.save()
 
         if tag_names:
-            for name in tag_names:
-                tag, _ = Tag.objects.get_or_create(name=name)
-                listing.tags.add(tag)
+            tags = resolve_tags(tag_names)
+            set_tags({listing.pk: {tag.pk for tag in tags.values()}}, created=[listing.pk])
 
         return CreateListing(listing=listing)
 
@@ -61,7 +80,7 @@ class UpdateListing(graphene.Mutation):
             listing = Listing.objects.get(pk=id)
         except Listing.DoesNotExist:
             raise Exception("Listing not found")
-        if listing.author != user and not user.is_staff and not user.groups.filter(name="moderators").exists():
+        if not can_modify_listing(user, listing):
             raise Exception("Not permitted to update this listing")
 
         if "title" in kwargs and kwargs["title"] is not None:
@@ -75,19 +94,67 @@ class UpdateListing(graphene.Mutation):
         if "expires_at" in kwargs and kwargs["expires_at"] is not None:
             listing.expires_at = kwargs["expires_at"]
         if "image" in kwargs and kwargs["image"] is not None:
-            listing.image = kwargs["image"]
+            listing.image = resolve_image(info, kwargs["image"])
         if "category_name" in kwargs and kwargs["category_name"] is not None:
-            cat, _ = Category.objects.get_or_create(name=kwargs["category_name"])
-            listing.category = cat
-        if "tag_names" in kwargs and kwargs["tag_names"] is not None:
-            listing.tags.clear()
-            for name in kwargs["tag_names"]:
-                tag, _ = Tag.objects.get_or_create(name=name)
-                listing.tags.add(tag)
+            listing.category = get_category(kwargs["category_name"])
 
         listing.save()
+        if "tag_names" in kwargs and kwargs["tag_names"] is not None:
+            tags = resolve_tags(kwargs["tag_names"])
+            set_tags({listing.pk: {tag.pk for tag in tags.values()}})
         return UpdateListing(listing=listing)
 
+class BulkListingInput(graphene.InputObjectType):
+    id = graphene.Int()
+    delete = graphene.Boolean()
+    title = graphene.String()
+    description = graphene.String()
+    price = graphene.Float()
+    status = graphene.String()
+    category_name = graphene.String()
+    tag_names = graphene.List(graphene.String)
+    expires_at = graphene.DateTime()
+    image = graphene.String()
+
+class BulkListingResult(graphene.ObjectType):
+    index = graphene.Int()
+    id = graphene.Int()
+    action = graphene.String()
+    errors = graphene.List(graphene.String)
+
+class BulkUpsertListings(graphene.Mutation):
+    results = graphene.List(BulkListingResult)
+
+    class Arguments:
+        listings = graphene.List(graphene.NonNull(BulkListingInput), required=True)
+
+    def mutate(self, info, listings):
+        user = info.context.user
+        if not user or not user.is_authenticated:
+            raise Exception("Authentication required")
+        if len(listings) > bulk.MAX_ROWS:
+            raise Exception(f"At most {bulk.MAX_ROWS} listings per request")
+
+        rows = []
+        for index, row in enumerate(listings):
+            data = {key: value for key, value in row.items() if value is not None}
+            if "category_name" in data:
+                data["category"] = data.pop("category_name")
+            if "tag_names" in data:
+                data["tags"] = data.pop("tag_names")
+            if "price" in data:
+                data["price"] = Decimal(str(data["price"]))
+            rows.append((index, data))
+
+        results = bulk.write(user, rows, create_missing=True)
+        return BulkUpsertListings(results=[
+            BulkListingResult(
+                index=result["index"], id=result["id"], action=result["action"],
+                errors=[f"{field}: {message}" for field, message in result["errors"].items()],
+            )
+            for result in results
+        ])
+
 class DeleteListing(graphene.Mutation):
     ok = graphene.Boolean()
 
@@ -100,11 +167,31 @@ class DeleteListing(graphene.Mutation):
             listing = Listing.objects.get(pk=id)
         except Listing.DoesNotExist:
             raise Exception("Listing not found")
-        if listing.author != user and not user.is_staff and not user.groups.filter(name="moderators").exists():
+        if not can_modify_listing(user, listing):
             raise Exception("Not permitted to delete this listing")
         listing.delete()
         return DeleteListing(ok=True)
 
+class FavoriteListing(graphene.Mutation):
+    """Favorites (`favorited: true`, the default) or unfavorites a listing for the current user."""
+    listing = graphene.Field(ListingType)
+
+    class Arguments:
+        id = graphene.Int(required=True)
+        favorited = graphene.Boolean()
+
+    def mutate(self, info, id, favorited=True):
+        user = info.context.user
+        if not user or not user.is_authenticated:
+            raise Exception("Authentication required")
+        try:
+            listing = Listing.objects.get(pk=id)
+        except Listing.DoesNotExist:
+            raise Exception("Listing not found")
+        (favorites.add if favorited else favorites.remove)(user, listing)
+        listing.favorite_count = favorites.count(listing.pk)
+        return FavoriteListing(listing=listing)
+
 # -----------------------------
 # CRUD Category
 # -----------------------------
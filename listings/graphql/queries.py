@@ -1,29 +1,93 @@
 import graphene
+from graphene import relay
+from .. import favorites
 from ..models import Listing, Category, Tag, Profile
+from ..pagination import InvalidCursor, Keyset, decode_cursor, encode_cursor, page_size
+from ..search import get_backend as get_search_backend
+from .loaders import get_loaders
 from .types import ListingType, CategoryType, TagType, ProfileType
 
+class ListingConnection(relay.Connection):
+    class Meta:
+        node = ListingType
+
+
+def resolve_keyset_connection(info, queryset, first=None, after=None, last=None, before=None):
+    """Relay connection over `queryset` using keyset (seek) pagination."""
+    if after and before:
+        raise Exception("Use either 'after' or 'before', not both")
+    forward = before is None and (first is not None or last is None)
+    limit = page_size(first if forward else last, "'first' and 'last'")
+
+    keyset = Keyset.for_queryset(queryset)
+    cursor = after if forward else before
+    try:
+        values = decode_cursor(cursor)['v'] if cursor else None
+        items, has_more = keyset.page(queryset, limit, values, forward)
+    except InvalidCursor as e:
+        raise Exception(str(e))
+    if forward:
+        has_next, has_previous = has_more, cursor is not None
+    else:
+        has_next, has_previous = cursor is not None, has_more
+
+    get_loaders(info).prime_listings(items)
+    edges = [
+        ListingConnection.Edge(node=item, cursor=encode_cursor({'v': keyset.values_for(item)}))
+        for item in items
+    ]
+    return ListingConnection(
+        edges=edges,
+        page_info=relay.PageInfo(
+            has_next_page=has_next,
+            has_previous_page=has_previous,
+            start_cursor=edges[0].cursor if edges else None,
+            end_cursor=edges[-1].cursor if edges else None,
+        ),
+    )
+
+
 class Query(graphene.ObjectType):
-    all_listings = graphene.List(ListingType, status=graphene.String())
+    all_listings = relay.ConnectionField(ListingConnection, status=graphene.String())
+    my_favorites = relay.ConnectionField(ListingConnection)
     listing = graphene.Field(ListingType, id=graphene.Int(required=True))
+    search_listings = graphene.List(
+        ListingType, query=graphene.String(required=True), status=graphene.String(), first=graphene.Int()
+    )
     all_categories = graphene.List(CategoryType)
     all_tags = graphene.List(TagType)
     me = graphene.Field(ProfileType)
 
-    def resolve_all_listings(root, info, status=None):
-        qs = Listing.objects.all()
+    def resolve_all_listings(root, info, status=None, **kwargs):
+        qs = Listing.objects.active()
+        if status:
+            qs = qs.filter(status=status)
+        return resolve_keyset_connection(info, qs, **kwargs)
+
+    def resolve_my_favorites(root, info, **kwargs):
+        user = info.context.user
+        if not user or not user.is_authenticated:
+            raise Exception("Authentication required")
+        return resolve_keyset_connection(info, favorites.favorites_of(user), **kwargs)
+
+    def resolve_search_listings(root, info, query, status=None, first=None):
+        qs = Listing.objects.active()
         if status:
             qs = qs.filter(status=status)
-        return qs
+        qs = get_search_backend().ranked(qs, query)[:page_size(first, "'first'")]
+        return get_loaders(info).prime_listings(qs)
 
     def resolve_listing(root, info, id):
-        return Listing.objects.get(pk=id)
+        listing = Listing.objects.get(pk=id)
+        get_loaders(info).prime_listings([listing])
+        return listing
 
     def resolve_all_categories(root, info):
-        return Category.objects.all()
+        return get_loaders(info).prime_categories(Category.objects.all())
 
     def resolve_all_tags(root, info):
-        return Tag.objects.all()
+        return get_loaders(info).prime_tags(Tag.objects.all())
 
     def resolve_me(root, info):
         user = info.context.user
-        return Profile.objects.get(user=user)
\ No newline at end of file
+        return Profile.objects.get(user=user)
@@ -1,26 +1,66 @@
 import graphene
+from graphene.types.generic import GenericScalar
 from graphene_django import DjangoObjectType
+from listings.images import renditions_with_urls
 from listings.models import Listing, Category, Tag, Profile
+from listings.pagination import page_size
+from .loaders import get_loaders
+
+
+def listing_list():
+    """Newest listings first, `first` of them (default 20, at most 100)."""
+    return graphene.List(graphene.NonNull(lambda: ListingType), required=True, first=graphene.Int())
 
 class CategoryType(DjangoObjectType):
+    listings = listing_list()
+
     class Meta:
         model = Category
         fields = ("id", "name", "listings")
 
+    def resolve_listings(self, info, first=None):
+        return get_loaders(info).listings_by_category.load(self.pk)[:page_size(first, "'first'")]
+
 class TagType(DjangoObjectType):
+    listings = listing_list()
+
     class Meta:
         model = Tag
         fields = ("id", "name", "listings")
 
+    def resolve_listings(self, info, first=None):
+        return get_loaders(info).listings_by_tag.load(self.pk)[:page_size(first, "'first'")]
+
 class ListingType(DjangoObjectType):
+    renditions = GenericScalar()
+    is_favorited = graphene.Boolean()
+
     class Meta:
         model = Listing
         fields = (
             "id", "title", "description", "price", "status", 
             "created_at", "updated_at", "expires_at", 
-            "author", "category", "tags", "image", "thumbnail"
+            "author", "category", "tags", "image", "thumbnail", "thumbnail_status",
+            "favorite_count"
         )
 
+    def resolve_author(self, info):
+        return get_loaders(info).users.load(self.author_id)
+
+    def resolve_category(self, info):
+        if self.category_id is None:
+            return None
+        return get_loaders(info).categories.load(self.category_id)
+
+    def resolve_tags(self, info):
+        return get_loaders(info).tags_by_listing.load(self.pk)
+
+    def resolve_is_favorited(self, info):
+        return get_loaders(info).favorited.load(self.pk)
+
+    def resolve_renditions(self, info):
+        return renditions_with_urls(self.renditions, self.thumbnail.storage, info.context)
+
 class ProfileType(DjangoObjectType):
     class Meta:
         model = Profile
@@ -0,0 +1,144 @@
+import os
+import tempfile
+
+from django.conf import settings
+from django.core.files import File
+from PIL import Image, features
+
+from . import profiling
+from .storage import discard
+from .uploads import check_image_size
+
+DEFAULT_RENDITIONS = {
+    'SIZES': [64, 200, 480, 1024],
+    'FORMATS': ['WEBP', 'ORIGINAL'],
+    'QUALITY': 80,
+}
+THUMBNAIL_SIZE = 200
+
+EXTENSIONS = {'JPEG': 'jpg', 'PNG': 'png', 'GIF': 'gif', 'WEBP': 'webp', 'AVIF': 'avif'}
+# Formats that cannot store an alpha channel.
+NO_ALPHA = {'JPEG'}
+# Encoded derivatives larger than this spill from memory to a temp file.
+SPOOL_MAX_SIZE = 512 * 1024
+
+
+def rendition_settings():
+    config = dict(DEFAULT_RENDITIONS)
+    config.update(getattr(settings, 'LISTINGS_IMAGE_RENDITIONS', {}))
+    return config
+
+
+def format_supported(fmt):
+    feature = {'WEBP': 'webp', 'AVIF': 'avif'}.get(fmt)
+    return feature is None or bool(features.check(feature))
+
+
+def _prepare(img, fmt):
+    if fmt in NO_ALPHA and img.mode not in ('RGB', 'L'):
+        return img.convert('RGB')
+    if img.mode not in ('RGB', 'RGBA', 'L'):
+        return img.convert('RGBA' if 'A' in img.getbands() or 'transparency' in img.info else 'RGB')
+    return img
+
+
+def _encode(img, fmt, quality, name):
+    out = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_SIZE)
+    options = {'quality': quality} if fmt in ('JPEG', 'WEBP', 'AVIF') else {}
+    _prepare(img, fmt).save(out, format=fmt, **options)
+    out.seek(0)
+    return File(out, name=name)
+
+
+@profiling.timed('pillow')
+def build_renditions(source, base_name, storage, upload_dir='listings/renditions'):
+    """
+    Decode `source` once and write every configured size/format to `storage`.
+
+    JPEG sources are decoded with `draft()` straight at the largest needed
+    scale; each smaller size is reduced from the previous one, so the full
+    resolution image is never resampled more than once.
+
+    Returns `(renditions, thumbnail)` where `renditions` maps format name
+    (lowercase) to a list of `{'size', 'name', 'width', 'height'}` entries
+    and `thumbnail` is `(filename, File)` for the legacy 200px thumbnail; the
+    caller saves and closes it. Encoded files are written through a spooled
+    temp file rather than copied out of an in-memory buffer. On failure the
+    renditions already written are discarded and the thumbnail is closed.
+    """
+    config = rendition_settings()
+    sizes = sorted(set(config['SIZES']) | {THUMBNAIL_SIZE}, reverse=True)
+    renditions = {}
+    thumbnail = None
+    try:
+        with Image.open(source) as img:
+            original_format = img.format
+            check_image_size(*img.size)
+            longest_side = max(img.size)
+            img.draft('RGB', (sizes[0], sizes[0]))
+            img.load()
+
+            formats = []
+            for fmt in config['FORMATS']:
+                fmt = original_format if fmt == 'ORIGINAL' else fmt.upper()
+                if fmt not in formats and format_supported(fmt):
+                    formats.append(fmt)
+
+            renditions = {fmt.lower(): [] for fmt in formats}
+            current = img
+            for size in sizes:
+                # Never upscale; the thumbnail is always produced.
+                if size > longest_side and size != THUMBNAIL_SIZE:
+                    continue
+                current = current.copy()
+                current.thumbnail((size, size), reducing_gap=2.0)
+
+                if size == THUMBNAIL_SIZE:
+                    thumb_ext = os.path.splitext(base_name)[1] or '.' + EXTENSIONS.get(original_format, 'jpg')
+                    thumb_filename = f"{os.path.splitext(base_name)[0]}_thumb{thumb_ext}"
+                    thumbnail = (thumb_filename, _encode(current, original_format, config['QUALITY'], thumb_filename))
+                    if size not in config['SIZES']:
+                        continue
+
+                for fmt in formats:
+                    ext = EXTENSIONS.get(fmt, fmt.lower())
+                    filename = f"{upload_dir}/{os.path.splitext(base_name)[0]}_{size}.{ext}"
+                    with _encode(current, fmt, config['QUALITY'], filename) as encoded:
+                        name = storage.save(filename, encoded)
+                    renditions[fmt.lower()].append({
+                        'size': size, 'name': name, 'width': current.width, 'height': current.height,
+                    })
+    except Exception:
+        # Nothing references the files written so far yet.
+        if thumbnail is not None:
+            thumbnail[1].close()
+        for name in rendition_names(renditions):
+            discard(name, storage)
+        raise
+
+    for entries in renditions.values():
+        entries.reverse()
+    return renditions, thumbnail
+
+
+def rendition_names(renditions):
+    for entries in (renditions or {}).values():
+        for entry in entries:
+            yield entry['name']
+
+
+def renditions_with_urls(renditions, storage, request=None):
+    """Public representation: per-format srcset plus the individual images."""
+    result = {}
+    for fmt, entries in (renditions or {}).items():
+        images = []
+        for entry in entries:
+            url = storage.url(entry['name'])
+            if request is not None:
+                url = request.build_absolute_uri(url)
+            images.append({'size': entry['size'], 'url': url, 'width': entry['width'], 'height': entry['height']})
+        result[fmt] = {
+            'srcset': ', '.join(f"{image['url']} {image['width']}w" for image in images),
+            'images': images,
+        }
+    return result
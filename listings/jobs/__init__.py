@@ -0,0 +1,32 @@
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from django.utils.module_loading import import_string
+
+DEFAULT_BACKEND = 'listings.jobs.backends.ProcessPoolBackend'
+
+_backend = None
+
+
+def get_backend():
+    global _backend
+    if _backend is None:
+        config = getattr(settings, 'LISTINGS_JOBS', {})
+        backend_cls = import_string(config.get('BACKEND', DEFAULT_BACKEND))
+        _backend = backend_cls(**config.get('OPTIONS', {}))
+    return _backend
+
+
+def enqueue(task, *args):
+    """
+    Schedule `task` (dotted path to a function) to run with `args`.
+    Arguments must be JSON serializable so every backend can store them.
+    """
+    get_backend().enqueue(task, *args)
+
+
+@receiver(setting_changed)
+def reset_backend(setting, **kwargs):
+    global _backend
+    if setting == 'LISTINGS_JOBS':
+        _backend = None
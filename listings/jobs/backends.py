@@ -0,0 +1,135 @@
+import atexit
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from datetime import timedelta
+
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+
+def run_task(task, args):
+    try:
+        return import_string(task)(*args)
+    finally:
+        close_old_connections()
+
+
+def _init_worker(settings_module):
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', settings_module)
+    import django
+    django.setup()
+
+
+class BaseBackend:
+    def enqueue(self, task, *args):
+        raise NotImplementedError
+
+
+class ImmediateBackend(BaseBackend):
+    """Runs jobs synchronously in the calling thread. Meant for tests and scripts."""
+    def enqueue(self, task, *args):
+        import_string(task)(*args)
+
+
+class ProcessPoolBackend(BaseBackend):
+    """
+    Runs jobs in a local pool of worker processes.
+    Jobs are submitted only after the surrounding transaction commits,
+    so workers always see the rows they were scheduled for.
+    """
+    def __init__(self, max_workers=None):
+        self.max_workers = max_workers
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=multiprocessing.get_context('spawn'),
+                    initializer=_init_worker,
+                    initargs=(os.environ.get('DJANGO_SETTINGS_MODULE', 'zai_project.settings'),),
+                )
+                atexit.register(self._executor.shutdown)
+            return self._executor
+
+    def enqueue(self, task, *args):
+        transaction.on_commit(lambda: self._submit(task, args))
+
+    def _submit(self, task, args):
+        future = self._get_executor().submit(run_task, task, args)
+        future.add_done_callback(lambda f: self._log_failure(task, args, f))
+
+    def _log_failure(self, task, args, future):
+        exc = future.exception()
+        if exc is not None:
+            logger.error("Job %s%r failed: %s", task, args, exc)
+
+
+class DatabaseBackend(BaseBackend):
+    """
+    Stores jobs in the `Job` table; `manage.py runjobs` executes them.
+    Claiming uses a conditional UPDATE, so it works on SQLite without row locks.
+    A claim holds the job for `lease_seconds`; a RUNNING job whose lease
+    expired (its worker crashed) is claimed again, or fails once it has
+    used up its attempts.
+    """
+    def __init__(self, max_attempts=3, lease_seconds=600):
+        self.max_attempts = max_attempts
+        self.lease_seconds = lease_seconds
+
+    def enqueue(self, task, *args):
+        from listings.models import Job
+        Job.objects.create(task=task, args=list(args))
+
+    def _next(self, now):
+        from listings.models import Job
+        expired = Job.objects.filter(status='RUNNING', lease_expires_at__lt=now).order_by('id').first()
+        return expired or Job.objects.filter(status='QUEUED').order_by('id').first()
+
+    def claim(self):
+        from listings.models import Job
+        while True:
+            now = timezone.now()
+            job = self._next(now)
+            if job is None:
+                return None
+            # `attempts` changes on every claim, so two workers can't both take the job.
+            current = Job.objects.filter(pk=job.pk, status=job.status, attempts=job.attempts)
+            if job.status == 'RUNNING' and job.attempts >= self.max_attempts:
+                logger.error("Job %s lost its worker on the last attempt", job.pk)
+                current.update(status='FAILED', error='Lease expired.', lease_expires_at=None)
+                continue
+            lease_expires_at = now + timedelta(seconds=self.lease_seconds)
+            claimed = current.update(
+                status='RUNNING', attempts=job.attempts + 1, started_at=now, lease_expires_at=lease_expires_at
+            )
+            if claimed:
+                job.status = 'RUNNING'
+                job.attempts += 1
+                job.started_at, job.lease_expires_at = now, lease_expires_at
+                return job
+
+    def run_next(self):
+        from listings.models import Job
+        job = self.claim()
+        if job is None:
+            return None
+        # Unless the lease expired and another worker has claimed the job since.
+        current = Job.objects.filter(pk=job.pk, status='RUNNING', attempts=job.attempts)
+        try:
+            import_string(job.task)(*job.args)
+        except Exception as e:
+            logger.exception("Job %s failed", job.pk)
+            status = 'QUEUED' if job.attempts < self.max_attempts else 'FAILED'
+            current.update(status=status, error=str(e), lease_expires_at=None)
+        else:
+            current.update(status='DONE', finished_at=timezone.now(), lease_expires_at=None)
+        return job
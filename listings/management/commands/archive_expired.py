@@ -0,0 +1,22 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from listings.expiry import BATCH_SIZE, archive_expired
+
+
+class Command(BaseCommand):
+    help = "Archive listings whose expires_at has passed, in small batches."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE, help="Rows archived per transaction.")
+        parser.add_argument('--pause', type=float, default=0.0, help="Seconds to sleep between batches.")
+        parser.add_argument('--interval', type=float, help="Keep sweeping, waiting this many seconds between runs.")
+
+    def handle(self, *args, **options):
+        while True:
+            archived = archive_expired(batch_size=options['batch_size'], pause=options['pause'])
+            self.stdout.write(f"Archived {archived} listing(s).")
+            if options['interval'] is None:
+                break
+            time.sleep(options['interval'])
@@ -0,0 +1,194 @@
+import json
+import platform
+import random
+import re
+import sqlite3
+import statistics
+import time
+from pathlib import Path
+
+import django
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from graphql import OperationDefinitionNode, OperationType, parse, print_ast
+
+from listings.models import Category, Listing
+
+GRAPHQL_FILE = Path(settings.BASE_DIR) / 'graphql_queries.graphql'
+
+# A regression is a p95 this much above the baseline (latency is noisy) or any
+# rise in queries per request (deterministic).
+DEFAULT_TOLERANCE = 0.25
+
+
+def _operation_blocks(text):
+    """Top-level `query`/`mutation` blocks of the example file, which also holds headers and notes."""
+    block, depth = [], 0
+    for line in text.splitlines():
+        if not block and not re.match(r'(query|mutation)\b', line):
+            continue
+        if line.lstrip().startswith('#'):
+            continue
+        block.append(line)
+        depth += line.count('{') - line.count('}')
+        if depth <= 0 and '{' in ''.join(block):
+            yield '\n'.join(block)
+            block, depth = [], 0
+
+
+def graphql_operations(path=GRAPHQL_FILE):
+    """`{name: query}` for every query (not mutation) in the example file, named after its root fields."""
+    operations = {}
+    for block in _operation_blocks(Path(path).read_text(encoding='utf-8')):
+        definition = parse(block).definitions[0]
+        if isinstance(definition, OperationDefinitionNode) and definition.operation == OperationType.QUERY:
+            fields = '+'.join(selection.name.value for selection in definition.selection_set.selections)
+            operations[f'graphql:{fields}'] = print_ast(definition)
+    return operations
+
+
+def percentile(ordered, fraction):
+    return ordered[min(len(ordered) - 1, max(0, round(fraction * len(ordered)) - 1))]
+
+
+class Command(BaseCommand):
+    help = (
+        "Drive the REST and GraphQL read endpoints in process and report p50/p95/p99 "
+        "latency, queries per request and throughput; optionally write or compare "
+        "a JSON baseline. Run against data from `seed_data`."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=100, help="Requests per scenario.")
+        parser.add_argument('--warmup', type=int, default=5, help="Unmeasured requests per scenario.")
+        parser.add_argument('--seed', type=int, default=42, help="Seed for sampled ids and search terms.")
+        parser.add_argument('--scenario', action='append', help="Run only these scenarios (repeatable).")
+        parser.add_argument(
+            '--cached', action='store_true',
+            help="Repeat identical requests, so REST reads are served from the response cache.",
+        )
+        parser.add_argument('--output', help="Write the results as JSON to this file.")
+        parser.add_argument('--baseline', help="Compare with a JSON file from --output; fail on regressions.")
+        parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE, help="Allowed p95 growth (0.25 = 25%%).")
+
+    def handle(self, *args, **options):
+        user = User.objects.filter(listings__isnull=False, profile__isnull=False).order_by('pk').first()
+        if user is None:
+            raise CommandError("No listings to benchmark; run `manage.py seed_data` first.")
+        scenarios = self.scenarios(user, random.Random(options['seed']))
+        unknown = set(options['scenario'] or ()) - scenarios.keys()
+        if unknown:
+            raise CommandError(f"Unknown scenario(s): {', '.join(sorted(unknown))}. Known: {', '.join(scenarios)}.")
+
+        results = {}
+        with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver']):
+            client = Client()
+            client.force_login(user)
+            self.stdout.write(
+                f"{'scenario':<32} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'queries':>8} {'errors':>6}"
+            )
+            for name, requests in scenarios.items():
+                if options['scenario'] and name not in options['scenario']:
+                    continue
+                results[name] = self.run(client, requests, options)
+                self.report(name, results[name])
+
+        data = {
+            'environment': {
+                'python': platform.python_version(), 'django': django.get_version(),
+                'sqlite': sqlite3.sqlite_version, 'listings': Listing.objects.count(),
+                'requests': options['requests'], 'cached': options['cached'], 'seed': options['seed'],
+            },
+            'scenarios': results,
+        }
+        if options['output']:
+            Path(options['output']).write_text(json.dumps(data, indent=2) + '\n')
+        if options['baseline']:
+            self.compare(results, json.loads(Path(options['baseline']).read_text()), options['tolerance'])
+
+    def scenarios(self, user, rng):
+        """`{name: request factory}`; each factory takes the request number and returns (method, path, body)."""
+        ids = list(Listing.objects.active().values_list('pk', flat=True)[:1000])
+        category = Category.objects.filter(listings__isnull=False).values_list('pk', flat=True).first()
+        words = sorted({word for title in Listing.objects.values_list('title', flat=True)[:200] for word in title.split()[:1]})
+        terms = [rng.choice(words) for _ in range(50)] if words else ['x']
+        sampled = [rng.choice(ids) for _ in range(50)] if ids else [0]
+
+        def get(path):
+            return lambda i: ('get', path(i), None)
+
+        scenarios = {
+            'rest:listings': get(lambda i: '/api/listings/'),
+            'rest:listings-filtered': get(lambda i: f'/api/listings/?status=APPROVED&category={category}&ordering=-price'),
+            'rest:listings-detail': get(lambda i: f'/api/listings/{sampled[i % len(sampled)]}/'),
+            'rest:statistics': get(lambda i: '/api/listings/statistics/?days=30'),
+            'rest:search': get(lambda i: f'/api/listings/?search={terms[i % len(terms)]}'),
+            'rest:favorites': get(lambda i: '/api/listings/favorites/'),
+        }
+        for name, query in graphql_operations().items():
+            scenarios[name] = lambda i, query=query: ('post', '/graphql/', json.dumps({'query': query}))
+        return scenarios
+
+    def run(self, client, make_request, options):
+        run_id = time.time_ns()
+
+        def send(i):
+            method, path, body = make_request(i)
+            if not options['cached'] and method == 'get':
+                # A parameter unique to this request (across runs too) keeps the response cache out of the measurement.
+                path += f"{'&' if '?' in path else '?'}_bench={run_id}-{i}"
+            if method == 'post':
+                return client.post(path, body, content_type='application/json')
+            return client.get(path)
+
+        for i in range(options['warmup']):
+            send(-1 - i)
+        latencies, queries, errors = [], [], 0
+        started = time.perf_counter()
+        for i in range(options['requests']):
+            with CaptureQueriesContext(connection) as captured:
+                request_started = time.perf_counter()
+                response = send(i)
+                latencies.append(time.perf_counter() - request_started)
+            queries.append(len(captured.captured_queries))
+            if response.status_code != 200 or (response.get('Content-Type', '').startswith('application/json')
+                                               and 'errors' in response.json()):
+                errors += 1
+        elapsed = time.perf_counter() - started
+
+        latencies.sort()
+        return {
+            'requests': len(latencies),
+            'throughput': round(len(latencies) / elapsed, 1),
+            'p50_ms': round(percentile(latencies, 0.50) * 1000, 2),
+            'p95_ms': round(percentile(latencies, 0.95) * 1000, 2),
+            'p99_ms': round(percentile(latencies, 0.99) * 1000, 2),
+            'queries_per_request': round(statistics.mean(queries), 2),
+            'errors': errors,
+        }
+
+    def report(self, name, result):
+        self.stdout.write(
+            f"{name:<32} {result['throughput']:>8.1f} {result['p50_ms']:>8.1f} {result['p95_ms']:>8.1f} "
+            f"{result['p99_ms']:>8.1f} {result['queries_per_request']:>8.1f} {result['errors']:>6}"
+        )
+
+    def compare(self, results, baseline, tolerance):
+        regressions = []
+        for name, result in results.items():
+            before = baseline.get('scenarios', {}).get(name)
+            if before is None:
+                continue
+            if result['queries_per_request'] > before['queries_per_request']:
+                regressions.append(
+                    f"{name}: {result['queries_per_request']} queries/request (baseline {before['queries_per_request']})"
+                )
+            if result['p95_ms'] > before['p95_ms'] * (1 + tolerance):
+                regressions.append(f"{name}: p95 {result['p95_ms']} ms (baseline {before['p95_ms']} ms)")
+        if regressions:
+            raise CommandError("Regressions against the baseline:\n" + '\n'.join(regressions))
+        self.stdout.write("No regressions against the baseline.")
@@ -0,0 +1,107 @@
+import asyncio
+import json
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from asgiref.sync import ThreadSensitiveContext
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.test import AsyncClient, Client, override_settings
+
+GRAPHQL_QUERY = '{ allListings(first: 20) { edges { node { id title category { name } tags { name } } } } }'
+
+# (name, WSGI path, ASGI path, GraphQL?)
+SCENARIOS = [
+    ('listings', '/api/listings/', '/api/async/listings/', False),
+    ('graphql', '/graphql/', '/graphql/async/', True),
+]
+
+
+def _latency_wrapper(delay):
+    def wrapper(execute, sql, params, many, context):
+        time.sleep(delay)
+        return execute(sql, params, many, context)
+    return wrapper
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare request throughput of the sync views under a threaded WSGI "
+        "handler with the async views under one ASGI event loop, in process."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=200, help="Requests per scenario and mode.")
+        parser.add_argument('--concurrency', type=int, default=20, help="WSGI threads / concurrent ASGI requests.")
+        parser.add_argument(
+            '--db-latency', type=float, default=0.0,
+            help="Milliseconds added to every query, to model a networked database.",
+        )
+        parser.add_argument('--scenario', choices=[s[0] for s in SCENARIOS], action='append')
+
+    def handle(self, *args, **options):
+        with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver']):
+            self.benchmark(options)
+
+    def benchmark(self, options):
+        if options['db_latency']:
+            wrapper = _latency_wrapper(options['db_latency'] / 1000)
+
+            def add_latency(sender, connection, **kwargs):
+                connection.execute_wrappers.append(wrapper)
+            connection_created.connect(add_latency, weak=False)
+            connections.close_all()
+
+        self.stdout.write(f"{'scenario':<10} {'mode':<5} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'errors':>6}")
+        for name, wsgi_path, asgi_path, graphql in SCENARIOS:
+            if options['scenario'] and name not in options['scenario']:
+                continue
+            for mode, path, run in (('wsgi', wsgi_path, self.run_wsgi), ('asgi', asgi_path, self.run_asgi)):
+                started = time.perf_counter()
+                results = run(path, graphql, options['requests'], options['concurrency'])
+                elapsed = time.perf_counter() - started
+                latencies = sorted(latency for _, latency in results)
+                errors = sum(1 for status, _ in results if status != 200)
+                self.stdout.write(
+                    f"{name:<10} {mode:<5} {len(results) / elapsed:>8.1f} "
+                    f"{statistics.median(latencies) * 1000:>8.1f} "
+                    f"{latencies[int(len(latencies) * 0.95) - 1] * 1000:>8.1f} {errors:>6}"
+                )
+
+    @staticmethod
+    def request_args(path, graphql, i):
+        if graphql:
+            return 'post', (path, json.dumps({'query': GRAPHQL_QUERY})), {'content_type': 'application/json'}
+        # A distinct parameter per request keeps the listing response cache out of the comparison.
+        return 'get', (f'{path}?_bench={i}',), {}
+
+    def run_wsgi(self, path, graphql, total, concurrency):
+        def one(i):
+            method, args, kwargs = self.request_args(path, graphql, i)
+            started = time.perf_counter()
+            response = getattr(Client(), method)(*args, **kwargs)
+            return response.status_code, time.perf_counter() - started
+
+        with ThreadPoolExecutor(concurrency) as pool:
+            return list(pool.map(one, range(total)))
+
+    def run_asgi(self, path, graphql, total, concurrency):
+        async def main():
+            client = AsyncClient()
+            semaphore = asyncio.Semaphore(concurrency)
+
+            async def one(i):
+                method, args, kwargs = self.request_args(path, graphql, i)
+                # As ASGIHandler does, so each request's sync code gets its own thread.
+                async with semaphore, ThreadSensitiveContext():
+                    started = time.perf_counter()
+                    response = await getattr(client, method)(*args, **kwargs)
+                    return response.status_code, time.perf_counter() - started
+
+            return await asyncio.gather(*(one(i) for i in range(total)))
+
+        return asyncio.run(main())
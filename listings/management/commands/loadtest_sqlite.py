@@ -0,0 +1,135 @@
+import os
+import shutil
+import tempfile
+import threading
+import time
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, connections, transaction
+from django.utils import timezone
+
+from listings.db import backup_sqlite
+from listings.models import Category, Listing
+
+ALIAS = 'loadtest'
+
+# (PRAGMAS, OPTIONS): rollback journal, no busy wait and deferred transactions,
+# against the tuned profile from settings (None = as configured).
+PROFILES = {
+    'default': ({'journal_mode': 'DELETE', 'synchronous': 'FULL', 'busy_timeout': 0}, {}),
+    'tuned': (None, None),
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure listing read throughput while writers keep updating listings, "
+        "on a copy of the database, with SQLite defaults and with SQLITE_PRAGMAS."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--seconds', type=float, default=5.0, help="Duration of each run.")
+        parser.add_argument('--readers', type=int, default=4)
+        parser.add_argument('--writers', type=int, default=2)
+        parser.add_argument('--profile', choices=PROFILES, action='append')
+
+    def handle(self, *args, **options):
+        source = connections['default']
+        if source.vendor != 'sqlite':
+            raise CommandError("The default database is not SQLite.")
+
+        workdir = tempfile.mkdtemp()
+        try:
+            self.stdout.write(f"{'profile':<8} {'reads/s':>9} {'writes/s':>9} {'locked':>7}")
+            for profile in options['profile'] or PROFILES:
+                path = os.path.join(workdir, f'{profile}.sqlite3')
+                backup_sqlite(source, path)
+                self.configure_alias(path, *PROFILES[profile])
+                try:
+                    ids = self.prepare()
+                    reads, writes, locked = self.run(ids, options)
+                finally:
+                    connections[ALIAS].close()
+                seconds = options['seconds']
+                self.stdout.write(f"{profile:<8} {reads / seconds:>9.1f} {writes / seconds:>9.1f} {locked:>7}")
+        finally:
+            self.drop_alias()
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    @staticmethod
+    def configure_alias(path, pragmas, options):
+        config = dict(connections.settings['default'], NAME=path, TEST={}, PRAGMAS=pragmas)
+        if options is not None:
+            config['OPTIONS'] = options
+        Command.drop_alias()
+        connections.settings[ALIAS] = config
+
+    @staticmethod
+    def drop_alias():
+        if hasattr(connections._connections, ALIAS):
+            connections[ALIAS].close()
+            del connections[ALIAS]
+        connections.settings.pop(ALIAS, None)
+
+    @staticmethod
+    def prepare():
+        """Listing ids to read and write, creating a few hundred when the copy is nearly empty."""
+        ids = list(Listing.objects.using(ALIAS).values_list('pk', flat=True)[:500])
+        if len(ids) >= 100:
+            return ids
+        # bulk_create skips model signals, so nothing leaks into the real database.
+        User.objects.using(ALIAS).bulk_create([User(username='loadtest')], ignore_conflicts=True)
+        Category.objects.using(ALIAS).bulk_create([Category(name='Load test')], ignore_conflicts=True)
+        author = User.objects.using(ALIAS).get(username='loadtest')
+        category = Category.objects.using(ALIAS).get(name='Load test')
+        Listing.objects.using(ALIAS).bulk_create(
+            Listing(title=f'Load test {i}', description='Load test', price=Decimal(i % 500),
+                    author=author, category=category, status='APPROVED')
+            for i in range(300)
+        )
+        return list(Listing.objects.using(ALIAS).values_list('pk', flat=True)[:500])
+
+    def run(self, ids, options):
+        deadline = time.monotonic() + options['seconds']
+        counts = {'reads': 0, 'writes': 0, 'locked': 0}
+        lock = threading.Lock()
+
+        def worker(operation):
+            done = locked = 0
+            i = 0
+            try:
+                while time.monotonic() < deadline:
+                    i += 1
+                    try:
+                        operation(i)
+                        done += 1
+                    except OperationalError:
+                        locked += 1
+            finally:
+                connections[ALIAS].close()
+            with lock:
+                counts['reads' if operation is read else 'writes'] += done
+                counts['locked'] += locked
+
+        def read(i):
+            list(
+                Listing.objects.using(ALIAS).filter(status='APPROVED')
+                .select_related('author', 'category').order_by('-created_at')[:20]
+            )
+
+        def write(i):
+            # A save followed by a thumbnail-style update_fields save, as in the upload path.
+            pk = ids[i % len(ids)]
+            with transaction.atomic(using=ALIAS):
+                Listing.objects.using(ALIAS).filter(pk=pk).update(updated_at=timezone.now())
+                Listing.objects.using(ALIAS).filter(pk=pk).update(thumbnail_status='PENDING')
+
+        threads = [threading.Thread(target=worker, args=(read,)) for _ in range(options['readers'])]
+        threads += [threading.Thread(target=worker, args=(write,)) for _ in range(options['writers'])]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return counts['reads'], counts['writes'], counts['locked']
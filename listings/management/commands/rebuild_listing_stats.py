@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from listings import stats
+
+
+class Command(BaseCommand):
+    help = "Recompute the listing statistics counters from the listings table."
+
+    def handle(self, *args, **options):
+        stats.rebuild()
+        self.stdout.write("Listing statistics rebuilt.")
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from listings.search import get_backend
+
+
+class Command(BaseCommand):
+    help = "Rebuild the listings full-text search index."
+
+    def handle(self, *args, **options):
+        get_backend().rebuild()
+        self.stdout.write("Search index rebuilt.")
@@ -0,0 +1,30 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from listings.jobs import get_backend
+from listings.jobs.backends import DatabaseBackend
+
+
+class Command(BaseCommand):
+    help = "Process jobs queued by the database job backend."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help="Drain the queue and exit.")
+        parser.add_argument('--sleep', type=float, default=1.0, help="Seconds to wait when the queue is empty.")
+
+    def handle(self, *args, **options):
+        backend = get_backend()
+        if not isinstance(backend, DatabaseBackend):
+            raise CommandError("LISTINGS_JOBS['BACKEND'] is not the database backend.")
+
+        processed = 0
+        while True:
+            job = backend.run_next()
+            if job is not None:
+                processed += 1
+                continue
+            if options['once']:
+                break
+            time.sleep(options['sleep'])
+        self.stdout.write(f"Processed {processed} job(s).")
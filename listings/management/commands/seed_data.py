@@ -0,0 +1,181 @@
+import io
+import random
+from collections import Counter
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import Group, User
+from django.core.files.base import ContentFile
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+from PIL import Image, ImageDraw
+
+from listings import stats, versions
+from listings.images import build_renditions, rendition_names
+from listings.models import Category, Listing, Profile, StoredFile, Tag
+from listings.storage import listing_storage
+
+WORDS = (
+    'rower laptop telefon sofa biurko lampa kurtka buty zegarek aparat konsola gitara '
+    'monitor drukarka krzesło stół regał dywan namiot plecak narty deska hulajnoga '
+    'opony felgi fotel łóżko szafa lodówka pralka kuchenka mikser ekspres odkurzacz '
+    'tablet słuchawki głośnik router kamera dron książka komiks płyta winyl puzzle'
+).split()
+ADJECTIVES = (
+    'nowy używany sprawny zadbany tani okazja oryginalny markowy solidny lekki '
+    'duży mały czarny biały czerwony niebieski drewniany metalowy skórzany vintage'
+).split()
+# APPROVED dominates a live marketplace; ARCHIVED rows come from archive_expired.
+STATUS_WEIGHTS = (('APPROVED', 80), ('PENDING', 15), ('REJECTED', 5))
+
+
+class Command(BaseCommand):
+    help = (
+        "Fill the database with synthetic users, categories, tags and listings "
+        "(with tag and favorite links and optional images) using bulk inserts. "
+        "The same --seed produces the same data; dates are relative to now."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--categories', type=int, default=50)
+        parser.add_argument('--tags', type=int, default=500)
+        parser.add_argument('--listings', type=int, default=10000)
+        parser.add_argument('--max-tags', type=int, default=5, help="Tags per listing, 0..N.")
+        parser.add_argument('--favorites', type=float, default=3.0, help="Average favorites per listing.")
+        parser.add_argument('--images', type=int, default=0, help="Distinct images shared by the listings; 0 for none.")
+        parser.add_argument('--days', type=int, default=365, help="Spread of created_at into the past.")
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--prefix', default='seed', help="Prefix of generated user, category and tag names.")
+        parser.add_argument('--password', default='pass', help="Password of every generated user.")
+
+    def handle(self, *args, **options):
+        if options['users'] < 1 or options['categories'] < 1:
+            raise CommandError("At least one user and one category are needed.")
+        prefix = options['prefix']
+        if User.objects.filter(username__startswith=f'{prefix}-').exists():
+            raise CommandError(f"Users named '{prefix}-*' exist already; pick another --prefix.")
+
+        self.rng = random.Random(options['seed'])
+        self.batch_size = options['batch_size']
+        user_ids = self.create_users(options['users'], prefix, options['password'])
+        category_ids = self.create_named(Category, options['categories'], f'{prefix}-category')
+        tag_ids = self.create_named(Tag, options['tags'], f'{prefix}-tag')
+        images = self.create_images(options['images'])
+        self.create_listings(options, user_ids, category_ids, tag_ids, images)
+
+        # bulk_create sends no signals: rebuild what they would have maintained.
+        stats.rebuild()
+        versions.bump(versions.LISTING, versions.CATEGORY, versions.TAG, versions.USER, versions.FAVORITE)
+        self.stdout.write(
+            f"Created {len(user_ids)} users, {len(category_ids)} categories, {len(tag_ids)} tags, "
+            f"{options['listings']} listings."
+        )
+
+    def batches(self, total):
+        for start in range(0, total, self.batch_size):
+            yield range(start, min(start + self.batch_size, total))
+
+    def create_users(self, count, prefix, password):
+        password = make_password(password)
+        group, _ = Group.objects.get_or_create(name='user')
+        ids = []
+        for batch in self.batches(count):
+            with transaction.atomic():
+                users = User.objects.bulk_create(
+                    [User(username=f'{prefix}-{i}', email=f'{prefix}-{i}@example.com', password=password) for i in batch],
+                    batch_size=self.batch_size,
+                )
+                Profile.objects.bulk_create([Profile(user=user) for user in users], batch_size=self.batch_size)
+                User.groups.through.objects.bulk_create(
+                    [User.groups.through(user_id=user.pk, group_id=group.pk) for user in users],
+                    batch_size=self.batch_size,
+                )
+            ids += [user.pk for user in users]
+        return ids
+
+    def create_named(self, model, count, name):
+        objects = model.objects.bulk_create([model(name=f'{name}-{i}') for i in range(count)], batch_size=self.batch_size)
+        return [obj.pk for obj in objects]
+
+    def create_images(self, count):
+        """`count` distinct stored images with their derivatives: [(image, thumbnail, renditions)]."""
+        storage = listing_storage()
+        images = []
+        for i in range(count):
+            img = Image.new('RGB', (1024, 768), tuple(self.rng.randrange(256) for _ in range(3)))
+            draw = ImageDraw.Draw(img)
+            for _ in range(8):
+                x, y = self.rng.randrange(900), self.rng.randrange(650)
+                draw.rectangle((x, y, x + 120, y + 100), fill=tuple(self.rng.randrange(256) for _ in range(3)))
+            buffer = io.BytesIO()
+            img.save(buffer, format='JPEG', quality=80)
+            name = storage.save(f'listings/seed-{i}.jpg', ContentFile(buffer.getvalue()))
+            with storage.open(name, 'rb') as source:
+                renditions, (thumb_filename, thumb_content) = build_renditions(source, f'seed-{i}.jpg', storage)
+            with thumb_content:
+                thumbnail = storage.save(f'listings/thumbnails/{thumb_filename}', thumb_content)
+            images.append((name, thumbnail, renditions))
+        return images
+
+    def create_listings(self, options, user_ids, category_ids, tag_ids, images):
+        rng = self.rng
+        now = timezone.now()
+        statuses, weights = zip(*STATUS_WEIGHTS)
+        favorites = min(options['favorites'], len(user_ids))
+        references = Counter()
+
+        for batch in self.batches(options['listings']):
+            listings, tag_sets, fan_sets = [], [], []
+            for _ in batch:
+                created_at = now - timedelta(seconds=rng.randrange(max(options['days'], 1) * 86400))
+                fans = rng.sample(user_ids, min(len(user_ids), round(rng.uniform(0, 2 * favorites))))
+                listing = Listing(
+                    title=f"{rng.choice(WORDS).capitalize()} {rng.choice(ADJECTIVES)} {rng.randrange(1000)}",
+                    description=' '.join(rng.choices(WORDS + ADJECTIVES, k=rng.randrange(10, 60))),
+                    price=Decimal(rng.randrange(100, 500000)) / 100,
+                    status=rng.choices(statuses, weights)[0],
+                    created_at=created_at,
+                    # A few listings expire, some of them already.
+                    expires_at=created_at + timedelta(days=rng.randrange(7, 400)) if rng.random() < 0.3 else None,
+                    author_id=rng.choice(user_ids),
+                    category_id=rng.choice(category_ids),
+                    favorite_count=len(fans),
+                )
+                if images:
+                    image, thumbnail, renditions = rng.choice(images)
+                    listing.image, listing.thumbnail, listing.renditions = image, thumbnail, renditions
+                    listing.thumbnail_status = 'READY'
+                    references.update((image, thumbnail, *rendition_names(renditions)))
+                listings.append(listing)
+                tag_sets.append(rng.sample(tag_ids, min(len(tag_ids), rng.randrange(options['max_tags'] + 1))))
+                fan_sets.append(fans)
+
+            with transaction.atomic():
+                listings = Listing.objects.bulk_create(listings, batch_size=self.batch_size)
+                Listing.tags.through.objects.bulk_create([
+                    Listing.tags.through(listing_id=listing.pk, tag_id=tag_id)
+                    for listing, tag_set in zip(listings, tag_sets) for tag_id in tag_set
+                ], batch_size=self.batch_size)
+                Listing.favorited_by.through.objects.bulk_create([
+                    Listing.favorited_by.through(listing_id=listing.pk, user_id=user_id)
+                    for listing, fans in zip(listings, fan_sets) for user_id in fans
+                ], batch_size=self.batch_size)
+            self.stdout.write(f"  listings {batch.stop}/{options['listings']}")
+
+        self.add_references(references)
+
+    @staticmethod
+    def add_references(references):
+        """Count the seeded listings' media in StoredFile, as acquire() would have one by one."""
+        existing = set(StoredFile.objects.filter(name__in=references).values_list('name', flat=True))
+        with transaction.atomic():
+            for name in existing:
+                StoredFile.objects.filter(name=name).update(refcount=F('refcount') + references[name])
+            StoredFile.objects.bulk_create(
+                [StoredFile(name=name, refcount=count) for name, count in references.items() if name not in existing]
+            )
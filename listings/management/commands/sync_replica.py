@@ -0,0 +1,37 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from listings.db import backup_sqlite, replica_settings
+
+
+class Command(BaseCommand):
+    help = (
+        "Stand-in for replication between SQLite files: copy the primary "
+        "database over each read replica, once or every --interval seconds."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', action='append', help="Replica alias (default: LISTINGS_REPLICAS['ALIASES']).")
+        parser.add_argument('--interval', type=float, help="Keep copying, waiting this many seconds between rounds.")
+
+    def handle(self, *args, **options):
+        aliases = options['database'] or replica_settings()['ALIASES']
+        if not aliases:
+            raise CommandError("No replicas configured in LISTINGS_REPLICAS['ALIASES'].")
+        for alias in aliases:
+            if alias not in connections or alias == DEFAULT_DB_ALIAS:
+                raise CommandError(f"Unknown replica database: {alias}")
+            if connections[alias].vendor != 'sqlite':
+                raise CommandError(f"Replica {alias} is not SQLite.")
+
+        while True:
+            for alias in aliases:
+                # The backup API writes into the live file, so open replica
+                # connections see the new contents on their next read.
+                backup_sqlite(connections[DEFAULT_DB_ALIAS], connections[alias].settings_dict['NAME'])
+                self.stdout.write(f"Synced {alias}.")
+            if options['interval'] is None:
+                break
+            time.sleep(options['interval'])
@@ -0,0 +1,104 @@
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+
+from django.core.exceptions import MiddlewareNotUsed
+
+from . import db, profiling
+
+
+class ReplicaRoutingMiddleware:
+    """
+    Sends the reads of GET/HEAD/OPTIONS requests to a read replica
+    (settings.LISTINGS_REPLICAS) and keeps a client that just wrote on the
+    primary for STICKY_SECONDS, so it reads its own writes.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        with db.request_routing(request) as state:
+            response = self.get_response(request)
+        return self.finish(request, response, state)
+
+    async def __acall__(self, request):
+        with db.request_routing(request) as state:
+            response = await self.get_response(request)
+        return self.finish(request, response, state)
+
+    def finish(self, request, response, state):
+        if state['wrote'] and db.replica_settings()['ALIASES']:
+            db.pin(request, response)
+        return response
+
+
+def view_label(view_func, request):
+    """`ListingViewSet.list` for DRF viewsets, the class name for other class-based views, else the function's name."""
+    cls = getattr(view_func, 'cls', None) or getattr(view_func, 'view_class', None)
+    if cls is None:
+        return getattr(view_func, '__qualname__', repr(view_func))
+    action = (getattr(view_func, 'actions', None) or {}).get(request.method.lower())
+    return f'{cls.__name__}.{action}' if action else cls.__name__
+
+
+class RequestProfilingMiddleware:
+    """
+    Profiles every request while settings.LISTINGS_PROFILING['ENABLED'] is
+    set (listings.profiling): query count and DB, Pillow and serialization
+    time go out in a Server-Timing header and one log line per request.
+    When disabled it removes itself from the middleware stack.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        config = profiling.profiling_settings()
+        if not config['ENABLED']:
+            raise MiddlewareNotUsed
+        self.server_timing = config['SERVER_TIMING']
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        with profiling.profile_request() as profile:
+            response = self.get_response(request)
+        return self.finish(request, response, profile)
+
+    async def __acall__(self, request):
+        with profiling.profile_request() as profile:
+            response = await self.get_response(request)
+        return self.finish(request, response, profile)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        profiling.set_view(view_label(view_func, request))
+
+    def finish(self, request, response, profile):
+        summary = profile.summary()
+        if self.server_timing:
+            timing = profile.server_timing()
+            response['Server-Timing'] = f"{response['Server-Timing']}, {timing}" if response.has_header('Server-Timing') else timing
+        profiling.logger.info(
+            "%s %s %s %s", request.method, request.path, response.status_code,
+            ' '.join(f'{key}={value}' for key, value in summary.items()),
+            extra=dict(summary, method=request.method, path=request.path, status=response.status_code),
+        )
+        return response
+
+
+class GraphQLProfilingMiddleware:
+    """
+    Graphene middleware: queries run by a resolver are attributed to it
+    (`Type.field`) in slow-query log lines. The GraphQL view leaves it out
+    of requests that are not profiled.
+    """
+    def resolve(self, next, root, info, **args):
+        with profiling.origin(f'{info.parent_type.name}.{info.field_name}'):
+            return next(root, info, **args)
@@ -0,0 +1,44 @@
+# Generated by Django 5.2.1 on 2026-10-18 16:58
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+def mark_existing_thumbnails(apps, schema_editor):
+    Listing = apps.get_model('listings', 'Listing')
+    Listing.objects.exclude(thumbnail='').exclude(thumbnail=None).update(thumbnail_status='READY')
+    Listing.objects.filter(thumbnail_status='NONE').exclude(image='').exclude(image=None).update(thumbnail_status='FAILED')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('listings', '0003_listing_thumbnail'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='listing',
+            name='thumbnail_status',
+            field=models.CharField(choices=[('NONE', 'No image'), ('PENDING', 'Pending'), ('READY', 'Ready'), ('FAILED', 'Failed')], default='NONE', max_length=10),
+        ),
+        migrations.CreateModel(
+            name='Job',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('task', models.CharField(max_length=200)),
+                ('args', models.JSONField(default=list)),
+                ('status', models.CharField(choices=[('QUEUED', 'Queued'), ('RUNNING', 'Running'), ('DONE', 'Done'), ('FAILED', 'Failed')], default='QUEUED', max_length=10)),
+                ('attempts', models.PositiveSmallIntegerField(default=0)),
+                ('error', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'ordering': ['id'],
+                'indexes': [models.Index(fields=['status', 'id'], name='listings_jo_status_82493a_idx')],
+            },
+        ),
+        migrations.RunPython(mark_existing_thumbnails, migrations.RunPython.noop),
+    ]
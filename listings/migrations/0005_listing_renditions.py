@@ -0,0 +1,18 @@
+# Generated by Django 5.2.1 on 2026-10-18 17:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('listings', '0004_listing_thumbnail_status_job'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='listing',
+            name='renditions',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.1 on 2026-10-18 17:05
+
+import listings.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('listings', '0005_listing_renditions'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StoredFile',
+            fields=[
+                ('name', models.CharField(max_length=255, primary_key=True, serialize=False)),
+                ('refcount', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.AlterField(
+            model_name='listing',
+            name='image',
+            field=models.ImageField(blank=True, null=True, storage=listings.storage.listing_storage, upload_to='listings/'),
+        ),
+        migrations.AlterField(
+            model_name='listing',
+            name='thumbnail',
+            field=models.ImageField(blank=True, null=True, storage=listings.storage.listing_storage, upload_to='listings/thumbnails/'),
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 5.2.1 on 2026-10-18 17:07
+
+import listings.storage
+import listings.uploads
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('listings', '0006_content_addressed_storage'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='listing',
+            name='image',
+            field=models.ImageField(blank=True, null=True, storage=listings.storage.listing_storage, upload_to='listings/', validators=[listings.uploads.validate_image_upload]),
+        ),
+    ]
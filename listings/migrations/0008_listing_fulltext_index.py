@@ -0,0 +1,60 @@
+from django.db import migrations
+
+FORWARD_SQL = [
+    """
+    CREATE VIRTUAL TABLE listings_listing_fts USING fts5(
+        title, description,
+        content='listings_listing', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )
+    """,
+    """
+    CREATE TRIGGER listings_listing_fts_ai AFTER INSERT ON listings_listing BEGIN
+        INSERT INTO listings_listing_fts(rowid, title, description)
+        VALUES (new.id, new.title, new.description);
+    END
+    """,
+    """
+    CREATE TRIGGER listings_listing_fts_ad AFTER DELETE ON listings_listing BEGIN
+        INSERT INTO listings_listing_fts(listings_listing_fts, rowid, title, description)
+        VALUES ('delete', old.id, old.title, old.description);
+    END
+    """,
+    """
+    CREATE TRIGGER listings_listing_fts_au AFTER UPDATE OF title, description ON listings_listing BEGIN
+        INSERT INTO listings_listing_fts(listings_listing_fts, rowid, title, description)
+        VALUES ('delete', old.id, old.title, old.description);
+        INSERT INTO listings_listing_fts(rowid, title, description)
+        VALUES (new.id, new.title, new.description);
+    END
+    """,
+    "INSERT INTO listings_listing_fts(listings_listing_fts) VALUES ('rebuild')",
+]
+
+REVERSE_SQL = [
+    "DROP TRIGGER IF EXISTS listings_listing_fts_au",
+    "DROP TRIGGER IF EXISTS listings_listing_fts_ad",
+    "DROP TRIGGER IF EXISTS listings_listing_fts_ai",
+    "DROP TABLE IF EXISTS listings_listing_fts",
+]
+
+
+def run_sqlite(statements):
+    def run(apps, schema_editor):
+        # Other databases use the LikeSearchBackend (see settings.LISTINGS_SEARCH).
+        if schema_editor.connection.vendor != 'sqlite':
+            return
+        for sql in statements:
+            schema_editor.execute(sql)
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('listings', '0007_listing_image_validators'),
+    ]
+
+    operations = [
+        migrations.RunPython(run_sqlite(FORWARD_SQL), run_sqlite(REVERSE_SQL)),
+    ]
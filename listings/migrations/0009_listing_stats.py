@@ -0,0 +1,32 @@
+# Generated by Django 5.2.1 on 2026-10-18 17:18
+
+from django.db import migrations, models
+
+
+def build_stats(apps, schema_editor):
+    from listings.stats import rebuild
+    rebuild(apps.get_model('listings', 'Listing'), apps.get_model('listings', 'ListingStat'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('listings', '0008_listing_fulltext_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ListingStat',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('group', models.CharField(max_length=10)),
+                ('key', models.CharField(max_length=50)),
+                ('count', models.IntegerField(default=0)),
+                ('price_sum', models.DecimalField(decimal_places=2, default=0, max_digits=20)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('group', 'key'), name='unique_listing_stat')],
+            },
+        ),
+        migrations.RunPython(build_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.1 on 2026-10-18 17:28
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('listings', '0009_listing_stats'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='listing',
+            index=models.Index(fields=['updated_at'], name='listings_li_updated_28d1ab_idx'),
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.2.1 on 2026-10-18 18:42
+
+from importlib import import_module
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def count_favorites(apps, schema_editor):
+    Listing = apps.get_model('listings', 'Listing')
+    links = Listing.favorited_by.through.objects.filter(listing_id=OuterRef('pk')).order_by().values('listing_id')
+    Listing.objects.update(favorite_count=Coalesce(Subquery(links.annotate(c=Count('pk')).values('c')), 0))
+
+
+# SQLite adds and removes a NOT NULL column by rebuilding the table, which
+# drops the full-text triggers from 0008; put them back and reindex.
+fulltext = import_module('listings.migrations.0008_listing_fulltext_index')
+RESTORE_FULLTEXT = fulltext.REVERSE_SQL[:3] + fulltext.FORWARD_SQL[1:]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('listings', '0011_listing_expiry'),
+    ]
+
+    operations = [
+        # Runs last when unapplying, after RemoveField has rebuilt the table.
+        migrations.RunPython(migrations.RunPython.noop, fulltext.run_sqlite(RESTORE_FULLTEXT)),
+        migrations.AddField(
+            model_name='listing',
+            name='favorite_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(fulltext.run_sqlite(RESTORE_FULLTEXT), migrations.RunPython.noop),
+        migrations.RunPython(count_favorites, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,47 @@
+# Generated by Django 5.2.1 on 2026-10-18 18:50
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('listings', '0012_listing_favorite_count'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='listing',
+            name='listings_li_status_63af6d_idx',
+        ),
+        migrations.AddIndex(
+            model_name='listing',
+            index=models.Index(fields=['price'], name='listings_li_price_d6caaa_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='listing',
+            index=models.Index(fields=['status', 'created_at'], name='listings_li_status_29a9da_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='listing',
+            index=models.Index(fields=['status', 'price'], name='listings_li_status_7347de_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='listing',
+            index=models.Index(fields=['category', 'created_at'], name='listings_li_categor_622d0c_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='listing',
+            index=models.Index(fields=['category', 'price'], name='listings_li_categor_b61150_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='listing',
+            index=models.Index(fields=['author', 'created_at'], name='listings_li_author__0ac01a_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='listing',
+            index=models.Index(fields=['author', 'price'], name='listings_li_author__79da75_idx'),
+        ),
+    ]
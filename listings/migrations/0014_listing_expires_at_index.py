@@ -0,0 +1,19 @@
+# Generated by Django 5.2.1 on 2026-10-18 19:21
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('listings', '0013_listing_filter_order_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='listing',
+            index=models.Index(fields=['expires_at'], name='listings_li_expires_79b526_idx'),
+        ),
+    ]
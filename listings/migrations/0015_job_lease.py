@@ -0,0 +1,28 @@
+# Generated by Django 5.2.1 on 2026-10-18 19:45
+
+from datetime import timedelta
+
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def lease_running_jobs(apps, schema_editor):
+    # Jobs claimed before leases existed; if their worker is gone they are reclaimed after the default lease.
+    Job = apps.get_model('listings', 'Job')
+    Job.objects.filter(status='RUNNING').update(lease_expires_at=timezone.now() + timedelta(seconds=600))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('listings', '0014_listing_expires_at_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='job',
+            name='lease_expires_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.RunPython(lease_running_jobs, migrations.RunPython.noop),
+    ]
@@ -1,10 +1,11 @@
-from io import BytesIO
-from django.core.files.base import ContentFile
 from django.db import models
 from django.contrib.auth.models import User
 from django.utils import timezone
-from PIL import Image
-import os
+from . import profiling
+from .images import rendition_names
+from .jobs import enqueue
+from .storage import acquire, listing_storage, release
+from .uploads import validate_image_upload
 
 class Profile(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE)
@@ -25,11 +26,37 @@ class Tag(models.Model):
     def __str__(self):
         return self.name
 
+class ListingQuerySet(models.QuerySet):
+    # Every status but ARCHIVED, spelled out so (status, expires_at) serves the filter.
+    ACTIVE_STATUSES = ('PENDING', 'APPROVED', 'REJECTED')
+
+    def active(self, now=None):
+        """Listings that are neither archived nor past their expiry date."""
+        # Written as a residual check, not an index range: nearly every row is
+        # active, so feeds are served best by walking a (filter, order) index
+        # and stopping at the page size.
+        now = now or timezone.now()
+        return self.exclude(status='ARCHIVED').filter(
+            models.Q(expires_at__isnull=True) | models.Q(expires_at__gt=now)
+        )
+
+    def expired(self, now=None):
+        """Active-status listings whose expiry date has passed, i.e. due for archival."""
+        return self.filter(status__in=self.ACTIVE_STATUSES, expires_at__lte=now or timezone.now())
+
+
 class Listing(models.Model):
     STATUS_CHOICES = [
         ('PENDING', 'Pending Approval'),
         ('APPROVED', 'Approved'),
         ('REJECTED', 'Rejected'),
+        ('ARCHIVED', 'Archived'),
+    ]
+    THUMBNAIL_STATUS_CHOICES = [
+        ('NONE', 'No image'),
+        ('PENDING', 'Pending'),
+        ('READY', 'Ready'),
+        ('FAILED', 'Failed'),
     ]
 
     title = models.CharField(max_length=200)
@@ -43,53 +70,189 @@ class Listing(models.Model):
     author = models.ForeignKey(User, on_delete=models.CASCADE, related_name='listings')
     category = models.ForeignKey(Category, on_delete=models.SET_NULL, null=True, related_name='listings')
     tags = models.ManyToManyField(Tag, related_name='listings', blank=True)
-    image = models.ImageField(upload_to='listings/', null=True, blank=True)
-    thumbnail = models.ImageField(upload_to='listings/thumbnails/', null=True, blank=True)
+    image = models.ImageField(
+        upload_to='listings/', storage=listing_storage, null=True, blank=True,
+        validators=[validate_image_upload],
+    )
+    thumbnail = models.ImageField(upload_to='listings/thumbnails/', storage=listing_storage, null=True, blank=True)
+    thumbnail_status = models.CharField(max_length=10, choices=THUMBNAIL_STATUS_CHOICES, default='NONE')
+    renditions = models.JSONField(default=dict, blank=True)
     favorited_by = models.ManyToManyField(User, related_name='favorites', blank=True)
+    favorite_count = models.PositiveIntegerField(default=0, editable=False)
+
+    objects = ListingQuerySet.as_manager()
 
     def __str__(self):
         return self.title
 
     class Meta:
         ordering = ['-created_at']
-        indexes = [models.Index(fields=['status']), models.Index(fields=['created_at'])]
+        indexes = [
+            models.Index(fields=['created_at']), models.Index(fields=['price']), models.Index(fields=['updated_at']),
+            models.Index(fields=['status', 'expires_at']), models.Index(fields=['expires_at']),
+            # One per ListingViewSet filter x ordering, so a filtered feed page is
+            # an index range read in order; `tags` filters through its own table.
+            # listings/tests/test_query_plans.py fails when a combination lacks one.
+            models.Index(fields=['status', 'created_at']), models.Index(fields=['status', 'price']),
+            models.Index(fields=['category', 'created_at']), models.Index(fields=['category', 'price']),
+            models.Index(fields=['author', 'created_at']), models.Index(fields=['author', 'price']),
+        ]
+
+    # Filled in by the background derivative job, never by regular saves.
+    DERIVED_FIELDS = ('thumbnail', 'renditions', 'thumbnail_status')
+
+    # Maintained with F() updates by listings.favorites, never written by save().
+    COUNTER_FIELDS = ('favorite_count',)
+
+    # Values remembered from the DB row, so changes are detected without a SELECT.
+    TRACKED_FIELDS = ('image', 'status', 'category_id', 'price', 'created_at')
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._remember_loaded()
+        return instance
+
+    def refresh_from_db(self, *args, **kwargs):
+        super().refresh_from_db(*args, **kwargs)
+        self._remember_loaded()
 
+    def _remember_loaded(self):
+        self._loaded = {
+            attname: self._tracked_value(attname)
+            for attname in self.TRACKED_FIELDS if attname in self.__dict__
+        }
+
+    def _tracked_value(self, attname):
+        value = getattr(self, attname)
+        return (value.name or '') if attname == 'image' else value
+
+    def loaded_values(self):
+        """Tracked values as last read from or written to the DB."""
+        return dict(getattr(self, '_loaded', {}))
+
+    def image_changed(self):
+        if self._state.adding:
+            return bool(self.image)
+        if 'image' in self.get_deferred_fields():
+            # Neither read nor assigned since the instance was loaded with .only()/.defer().
+            return False
+        loaded = self.loaded_values()
+        if not self.image._committed or 'image' not in loaded:
+            return True
+        return (self.image.name or '') != loaded['image']
+
+    def _stored_derivatives(self):
+        # Read from the DB: the in-memory copy may predate the background job.
+        return Listing.objects.filter(pk=self.pk).values('image', 'thumbnail', 'renditions').first()
+
+    def _release_files(self, image, thumbnail, renditions):
+        for name in (image, thumbnail, *rendition_names(renditions)):
+            release(name, self.image.storage)
+
+    def _update_fields(self, kwargs, skip):
+        # Only for plain saves of existing rows: explicit update_fields are left as given.
+        if not self._state.adding and kwargs.get('update_fields') is None and not kwargs.get('force_insert'):
+            deferred = self.get_deferred_fields()
+            kwargs['update_fields'] = [
+                f.name for f in self._meta.concrete_fields
+                if not f.primary_key and f.name not in skip and f.attname not in deferred
+            ]
+
+    @profiling.origin('Listing.save')
     def save(self, *args, **kwargs):
-        old = Listing.objects.filter(pk=self.pk).first() if self.pk else None
+        if not self.image_changed():
+            # Leave image derivatives alone so a stale instance cannot overwrite them.
+            self._update_fields(kwargs, (*self.DERIVED_FIELDS, *self.COUNTER_FIELDS))
+            super().save(*args, **kwargs)
+            self._remember_loaded()
+            return
 
-        if old:
-            if old.image and self.image != old.image and os.path.isfile(old.image.path):
-                os.remove(old.image.path)
-            if old.thumbnail and os.path.isfile(old.thumbnail.path):
-                os.remove(old.thumbnail.path)
+        old = self._stored_derivatives() if self.pk and not self._state.adding else None
+        self._update_fields(kwargs, self.COUNTER_FIELDS)
+
+        self.thumbnail = None
+        self.renditions = {}
+        self.thumbnail_status = 'PENDING' if self.image else 'NONE'
+        if kwargs.get('update_fields') is not None:
+            kwargs['update_fields'] = set(kwargs['update_fields']) | {'image', *self.DERIVED_FIELDS}
 
         super().save(*args, **kwargs)
+        self._remember_loaded()
+
+        # Take the new reference before dropping the old one: re-uploading
+        # identical bytes resolves to the same stored file.
+        acquire(self.image.name)
+        if old:
+            self._release_files(old['image'], old['thumbnail'], old['renditions'])
 
         if self.image:
-            try:
-                img = Image.open(self.image)
-                img.thumbnail((200, 200))
-                thumb_io = BytesIO()
-                img.save(thumb_io, format=img.format)
-                img.close()
-                base, ext = os.path.splitext(os.path.basename(self.image.name))
-                thumb_filename = f"{base}_thumb{ext}"
-
-                self.thumbnail.save(thumb_filename, ContentFile(thumb_io.getvalue()), save=False)
-                super().save(update_fields=['thumbnail'])
-            except Exception as e:
-                print(f"Thumbnail generation failed: {e}")
+            enqueue('listings.tasks.generate_derivatives', self.pk)
 
     def delete(self, *args, **kwargs):
-        if self.image and os.path.isfile(self.image.path):
-            os.remove(self.image.path)
-        if self.thumbnail and os.path.isfile(self.thumbnail.path):
-            os.remove(self.thumbnail.path)
-        super().delete(*args, **kwargs)
+        stored = self._stored_derivatives()
+        result = super().delete(*args, **kwargs)
+        if stored:
+            self._release_files(stored['image'], stored['thumbnail'], stored['renditions'])
+        return result
+
+
+class StoredFile(models.Model):
+    """Reference count of a content-addressed media file."""
+    name = models.CharField(max_length=255, primary_key=True)
+    refcount = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.name} ({self.refcount})"
+
+
+class ListingStat(models.Model):
+    """
+    Counters behind /api/listings/statistics/, kept up to date by the
+    signals in listings.signals. `group` is 'total', 'status', 'category'
+    or 'day'; `key` is the status, category id or ISO date.
+    """
+    group = models.CharField(max_length=10)
+    key = models.CharField(max_length=50)
+    count = models.IntegerField(default=0)
+    price_sum = models.DecimalField(max_digits=20, decimal_places=2, default=0)
+
+    def __str__(self):
+        return f"{self.group}:{self.key} = {self.count}"
+
+    class Meta:
+        constraints = [models.UniqueConstraint(fields=['group', 'key'], name='unique_listing_stat')]
+
+
+class Job(models.Model):
+    STATUS_CHOICES = [
+        ('QUEUED', 'Queued'),
+        ('RUNNING', 'Running'),
+        ('DONE', 'Done'),
+        ('FAILED', 'Failed'),
+    ]
+
+    task = models.CharField(max_length=200)
+    args = models.JSONField(default=list)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='QUEUED')
+    attempts = models.PositiveSmallIntegerField(default=0)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(default=timezone.now)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    # A RUNNING job whose lease expired lost its worker and may be claimed again.
+    lease_expires_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.task}{tuple(self.args)} [{self.status}]"
+
+    class Meta:
+        ordering = ['id']
+        indexes = [models.Index(fields=['status', 'id'])]
 
 
-class PublishedManager(models.Manager):
+class PublishedManager(models.Manager.from_queryset(ListingQuerySet)):
     def get_queryset(self):
-        return super().get_queryset().filter(status='APPROVED')
+        return super().get_queryset().active().filter(status='APPROVED')
 
 Listing.add_to_class('published', PublishedManager())
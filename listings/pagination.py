@@ -0,0 +1,128 @@
+import base64
+import json
+
+from django.db.models import Q
+
+
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def page_size(limit, arguments):
+    """`limit` or the default page size, capped at MAX_PAGE_SIZE; negative limits are rejected."""
+    if limit is not None and limit < 0:
+        raise Exception(f"{arguments} must be non-negative")
+    return min(DEFAULT_PAGE_SIZE if limit is None else limit, MAX_PAGE_SIZE)
+
+
+def encode_cursor(payload):
+    data = json.dumps(payload, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(data).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (ValueError, TypeError):
+        raise InvalidCursor("Invalid cursor.")
+    if not isinstance(payload, dict) or not isinstance(payload.get('v'), list):
+        raise InvalidCursor("Invalid cursor.")
+    return payload
+
+
+def keyset_ordering(queryset):
+    """
+    The queryset's ordering with the primary key appended as a tie-breaker,
+    e.g. ('-created_at', '-id'). Every column must be a concrete model field.
+    """
+    model = queryset.model
+    pk = model._meta.pk.name
+    ordering = [
+        ('-' if o.startswith('-') else '') + pk if o.lstrip('-') == 'pk' else o
+        for o in (queryset.query.order_by or model._meta.ordering)
+    ]
+    if pk not in [o.lstrip('-') for o in ordering]:
+        descending = bool(ordering) and ordering[-1].startswith('-')
+        ordering.append(f"-{pk}" if descending else pk)
+    return tuple(ordering)
+
+
+class Keyset:
+    """
+    Seek-based paging over `ordering`, which must end in a unique column.
+    Columns are model fields or `annotations` with an output_field, such as
+    the search rank.
+    """
+    def __init__(self, model, ordering, annotations=None):
+        self.ordering = ordering
+        self.fields = [self._field(model, o.lstrip('-'), annotations or {}) for o in ordering]
+
+    @classmethod
+    def for_queryset(cls, queryset):
+        return cls(queryset.model, keyset_ordering(queryset), queryset.query.annotations)
+
+    @staticmethod
+    def _field(model, name, annotations):
+        if name not in annotations:
+            return model._meta.get_field(name)
+        field = annotations[name].output_field.clone()
+        field.set_attributes_from_name(name)
+        return field
+
+    def values_for(self, obj):
+        return [field.value_to_string(obj) for field in self.fields]
+
+    def _seek(self, values, forward):
+        """Rows strictly after (forward) or before `values` in the ordering."""
+        if len(values) != len(self.fields):
+            raise InvalidCursor("Cursor does not match the ordering.")
+        try:
+            values = [field.to_python(value) for field, value in zip(self.fields, values)]
+        except Exception:
+            raise InvalidCursor("Invalid cursor.")
+        condition = None
+        for field, order, value in reversed(list(zip(self.fields, self.ordering, values))):
+            lookup = 'lt' if order.startswith('-') == forward else 'gt'
+            step = Q(**{f"{field.name}__{lookup}": value})
+            condition = step if condition is None else step | (Q(**{field.name: value}) & condition)
+        if len(self.fields) > 1:
+            # Redundant bound on the leading column: SQLite cannot turn the OR
+            # into an index range, so without it every page rescans the index.
+            condition &= Q(**{f"{self.fields[0].name}__{lookup}e": values[0]})
+        return condition
+
+    def _page_queryset(self, queryset, limit, values, forward):
+        ordering = self.ordering if forward else tuple(
+            o[1:] if o.startswith('-') else f"-{o}" for o in self.ordering
+        )
+        qs = queryset.order_by(*ordering)
+        if values is not None:
+            qs = qs.filter(self._seek(values, forward))
+        return qs[:limit + 1]
+
+    @staticmethod
+    def _finish(items, limit, forward):
+        has_more = len(items) > limit
+        items = items[:limit]
+        if not forward:
+            items.reverse()
+        return items, has_more
+
+    def page(self, queryset, limit, values=None, forward=True):
+        """
+        Up to `limit` rows after (or before) the row with key `values`,
+        in display order, plus whether more rows exist in that direction.
+        Without `values` the page starts at the beginning (or the end).
+        """
+        items = list(self._page_queryset(queryset, limit, values, forward))
+        return self._finish(items, limit, forward)
+
+    async def apage(self, queryset, limit, values=None, forward=True):
+        """`page()` for async views."""
+        items = [obj async for obj in self._page_queryset(queryset, limit, values, forward)]
+        return self._finish(items, limit, forward)
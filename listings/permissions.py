@@ -1,4 +1,5 @@
 from rest_framework import permissions
+from users.roles import can_modify_listing
 
 class IsOwnerOrAdminOrModerator(permissions.BasePermission):
     """
@@ -11,11 +12,4 @@ class IsOwnerOrAdminOrModerator(permissions.BasePermission):
     def has_object_permission(self, request, view, obj):
         if request.method in permissions.SAFE_METHODS:
             return True
-        user = request.user
-        if not user or not user.is_authenticated:
-            return False
-        if obj.author == user:
-            return True
-        if user.is_staff or user.is_superuser:
-            return True
-        return user.groups.filter(name='moderators').exists()
\ No newline at end of file
+        return can_modify_listing(request.user, obj)
\ No newline at end of file
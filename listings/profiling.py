@@ -0,0 +1,161 @@
+"""
+Per-request profile: SQL query count and time, Pillow time and
+serialization time, attributed to the view or GraphQL resolver running at
+the time (listings.middleware). Outside a profiled request every hook here
+is a no-op, and with profiling disabled the query wrapper is not installed.
+"""
+import logging
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+logger = logging.getLogger(__name__)
+
+PROFILING_DEFAULTS = {
+    'ENABLED': False,
+    'SERVER_TIMING': True,
+    'SLOW_QUERY_MS': 100,
+}
+
+# Phases reported besides `db` and `total`, with their Server-Timing descriptions.
+PHASES = {
+    'pillow': 'image processing',
+    'serialize': 'serialization',
+}
+
+# Profile of the current request, or None.
+_profile = ContextVar('listings_profile', default=None)
+# Innermost `origin()` label, e.g. 'Query.allListings' or 'ListingViewSet.create > Listing.save'.
+_origin = ContextVar('listings_profile_origin', default=None)
+
+
+def profiling_settings():
+    return dict(PROFILING_DEFAULTS, **getattr(settings, 'LISTINGS_PROFILING', {}))
+
+
+class Profile:
+    """
+    Counters of one request. A plain object, so queries run in
+    sync_to_async threads are counted in the request that started them.
+    Phases may overlap: serialization time includes the queries it runs.
+    """
+    def __init__(self, slow_query_ms):
+        self.slow_query_ms = slow_query_ms
+        self.view = None
+        self.queries = 0
+        self.timings = {'db': 0.0}
+        self.started = time.perf_counter()
+
+    def add(self, phase, seconds):
+        self.timings[phase] = self.timings.get(phase, 0.0) + seconds
+
+    def summary(self):
+        """Flat dict for the request log line: origin, queries and `<phase>_ms`, including `total_ms`."""
+        data = {'origin': self.view, 'queries': self.queries}
+        for phase, seconds in self.timings.items():
+            data[f'{phase}_ms'] = round(seconds * 1000, 2)
+        data['total_ms'] = round((time.perf_counter() - self.started) * 1000, 2)
+        return data
+
+    def server_timing(self):
+        entries = [f'db;dur={self.timings["db"] * 1000:.2f};desc="{self.queries} queries"']
+        for phase, description in PHASES.items():
+            if phase in self.timings:
+                entries.append(f'{phase};dur={self.timings[phase] * 1000:.2f};desc="{description}"')
+        entries.append(f'total;dur={(time.perf_counter() - self.started) * 1000:.2f}')
+        return ', '.join(entries)
+
+
+def active():
+    """Whether the current request is being profiled."""
+    return _profile.get() is not None
+
+
+def set_view(label):
+    profile = _profile.get()
+    if profile is not None:
+        profile.view = label
+
+
+def current_origin():
+    profile = _profile.get()
+    return _origin.get() or (profile.view if profile else None)
+
+
+@contextmanager
+def profile_request():
+    """Profile the block as one request; yields the Profile."""
+    profile = Profile(profiling_settings()['SLOW_QUERY_MS'])
+    for connection in connections.all(initialized_only=True):
+        instrument(connection)
+    token = _profile.set(profile)
+    try:
+        yield profile
+    finally:
+        _profile.reset(token)
+
+
+@contextmanager
+def timed(phase):
+    """Add the block's duration to `phase` of the current profile. Also usable as a decorator."""
+    profile = _profile.get()
+    if profile is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        profile.add(phase, time.perf_counter() - started)
+
+
+@contextmanager
+def origin(label):
+    """Attribute queries in the block (in slow-query log lines) to `label`, nested in the current origin."""
+    if _profile.get() is None:
+        yield
+        return
+    parent = current_origin()
+    token = _origin.set(f'{parent} > {label}' if parent else label)
+    try:
+        yield
+    finally:
+        _origin.reset(token)
+
+
+def record_query(execute, sql, params, many, context):
+    """Connection execute wrapper: counts and times queries, logs the slow ones."""
+    profile = _profile.get()
+    if profile is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        elapsed = time.perf_counter() - started
+        profile.queries += 1
+        profile.timings['db'] += elapsed
+        duration_ms = elapsed * 1000
+        if duration_ms >= profile.slow_query_ms:
+            where = current_origin()
+            alias = context['connection'].alias
+            logger.warning(
+                "Slow query (%.1f ms on %s) from %s: %s", duration_ms, alias, where, sql,
+                extra={'duration_ms': round(duration_ms, 2), 'origin': where, 'alias': alias, 'sql': sql},
+            )
+
+
+def instrument(connection):
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+@receiver(connection_created)
+def instrument_new_connection(sender, connection, **kwargs):
+    if profiling_settings()['ENABLED']:
+        instrument(connection)
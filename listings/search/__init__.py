@@ -0,0 +1,24 @@
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from django.utils.module_loading import import_string
+
+DEFAULT_BACKEND = 'listings.search.backends.SQLiteFTS5Backend'
+
+_backend = None
+
+
+def get_backend():
+    global _backend
+    if _backend is None:
+        config = getattr(settings, 'LISTINGS_SEARCH', {})
+        backend_cls = import_string(config.get('BACKEND', DEFAULT_BACKEND))
+        _backend = backend_cls(**config.get('OPTIONS', {}))
+    return _backend
+
+
+@receiver(setting_changed)
+def reset_backend(setting, **kwargs):
+    global _backend
+    if setting == 'LISTINGS_SEARCH':
+        _backend = None
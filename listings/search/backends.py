@@ -0,0 +1,86 @@
+import re
+
+from django.db import connection
+from django.db.models import FloatField, Q
+from django.db.models.expressions import RawSQL
+
+WORD_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def split_terms(query):
+    return WORD_RE.findall(query or '')
+
+
+class BaseSearchBackend:
+    """
+    `filter()` restricts a Listing queryset to matches and keeps its ordering;
+    `ranked()` additionally annotates `search_rank` (lower is better) and
+    orders by it.
+    """
+    def filter(self, queryset, query):
+        raise NotImplementedError
+
+    def ranked(self, queryset, query):
+        raise NotImplementedError
+
+    def rebuild(self):
+        """Re-index every listing; used to repair drift."""
+
+
+class LikeSearchBackend(BaseSearchBackend):
+    """Portable fallback: every term must appear in the title or description."""
+    def _condition(self, terms):
+        condition = Q()
+        for term in terms:
+            condition &= Q(title__icontains=term) | Q(description__icontains=term)
+        return condition
+
+    def filter(self, queryset, query):
+        terms = split_terms(query)
+        return queryset.filter(self._condition(terms)) if terms else queryset
+
+    def ranked(self, queryset, query):
+        return self.filter(queryset, query).annotate(
+            search_rank=RawSQL('0', [], output_field=FloatField())
+        ).order_by('-created_at')
+
+
+class SQLiteFTS5Backend(BaseSearchBackend):
+    """
+    Uses the `listings_listing_fts` FTS5 index (see migration 0008), which
+    triggers keep in sync with `listings_listing`. Every term is matched as a
+    prefix, all terms must match, and results are ranked with bm25 with the
+    title weighted above the description.
+    """
+    table = 'listings_listing_fts'
+
+    def __init__(self, title_weight=10.0, description_weight=1.0):
+        self.weights = (title_weight, description_weight)
+
+    def match_expression(self, query):
+        terms = split_terms(query)
+        return ' '.join(f'"{term}"*' for term in terms)
+
+    def filter(self, queryset, query):
+        match = self.match_expression(query)
+        if not match:
+            return queryset
+        return queryset.filter(pk__in=RawSQL(
+            f"SELECT rowid FROM {self.table} WHERE {self.table} MATCH %s", [match]
+        ))
+
+    def rebuild(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f"INSERT INTO {self.table}({self.table}) VALUES ('rebuild')")
+
+    def ranked(self, queryset, query):
+        match = self.match_expression(query)
+        if not match:
+            return queryset.none()
+        model_table = queryset.model._meta.db_table
+        rank = RawSQL(
+            f"SELECT bm25({self.table}, %s, %s) FROM {self.table} "
+            f"WHERE {self.table} MATCH %s AND {self.table}.rowid = {model_table}.id",
+            [*self.weights, match], output_field=FloatField(),
+        )
+        return self.filter(queryset, query).annotate(search_rank=rank).order_by('search_rank', '-id')
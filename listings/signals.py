@@ -0,0 +1,85 @@
+from django.contrib.auth.models import User
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from . import favorites, stats, versions
+from .models import Category, Listing, ListingStat, Tag
+
+STAT_FIELDS = ('status', 'category_id', 'price', 'created_at')
+
+
+@receiver(pre_save, sender=Listing)
+def remember_stat_values(sender, instance, raw=False, **kwargs):
+    if raw or instance._state.adding:
+        instance._stats_before = None
+        return
+    loaded = instance.loaded_values()
+    if all(field in loaded for field in STAT_FIELDS):
+        instance._stats_before = stats.contribution_of(loaded)
+    else:
+        row = Listing.objects.filter(pk=instance.pk).values(*STAT_FIELDS).first()
+        instance._stats_before = stats.contribution_of(row) if row else None
+
+
+@receiver(post_save, sender=Listing)
+def update_stats_on_save(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    after = stats.contribution(instance.status, instance.category_id, instance.price, instance.created_at)
+    stats.apply(stats.diff(getattr(instance, '_stats_before', None), after))
+
+
+@receiver(post_delete, sender=Listing)
+def update_stats_on_delete(sender, instance, **kwargs):
+    before = stats.contribution(instance.status, instance.category_id, instance.price, instance.created_at)
+    stats.apply(stats.diff(before, None))
+
+
+@receiver(post_delete, sender=Category)
+def drop_category_stats(sender, instance, **kwargs):
+    ListingStat.objects.filter(group='category', key=str(instance.pk)).delete()
+
+
+@receiver(post_save, sender=Listing)
+@receiver(post_delete, sender=Listing)
+@receiver(m2m_changed, sender=Listing.tags.through)
+def bump_listing_version(sender, **kwargs):
+    versions.bump(versions.LISTING)
+
+
+@receiver(m2m_changed, sender=Listing.favorited_by.through)
+def recount_favorites(sender, instance, action, reverse, pk_set, **kwargs):
+    # listings.favorites writes the through table directly; this covers the
+    # related managers (admin, shell), whose pk_set need not match real changes.
+    if action == 'pre_clear':
+        instance._favorites_cleared = set(instance.favorites.values_list('pk', flat=True)) if reverse else {instance.pk}
+        return
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if action == 'post_clear':
+        listing_ids = instance.__dict__.pop('_favorites_cleared', set())
+    else:
+        listing_ids = pk_set if reverse else {instance.pk}
+    if listing_ids:
+        favorites.recount(listing_ids)
+        versions.bump(versions.FAVORITE)
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def bump_category_version(sender, **kwargs):
+    versions.bump(versions.CATEGORY)
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+def bump_tag_version(sender, **kwargs):
+    versions.bump(versions.TAG)
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def bump_user_version(sender, update_fields=None, **kwargs):
+    # Listings embed the author's username; logins only touch last_login.
+    if update_fields is None or 'username' in update_fields:
+        versions.bump(versions.USER)
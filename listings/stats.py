@@ -0,0 +1,151 @@
+import threading
+from collections import defaultdict
+from contextlib import contextmanager
+from datetime import timedelta
+from decimal import Decimal
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+SUMMARY_GROUPS = ('total', 'status', 'category')
+
+_local = threading.local()
+
+
+def contribution(status, category_id, price, created_at):
+    """The counter rows a single listing contributes to."""
+    keys = [('total', ''), ('status', status), ('day', timezone.localdate(created_at).isoformat())]
+    if category_id is not None:
+        keys.append(('category', str(category_id)))
+    return {key: (1, Decimal(price or 0)) for key in keys}
+
+
+def contribution_of(values):
+    return contribution(values['status'], values['category_id'], values['price'], values['created_at'])
+
+
+@contextmanager
+def batched():
+    """Merge every apply() inside the block into one write at the end."""
+    if getattr(_local, 'pending', None) is not None:
+        yield
+        return
+    _local.pending = {}
+    try:
+        yield
+        pending = _local.pending
+    finally:
+        _local.pending = None
+    apply(pending)
+
+
+def apply(deltas):
+    """Add `{(group, key): (count, price_sum)}` to the counters with F() updates."""
+    from .models import ListingStat
+    pending = getattr(_local, 'pending', None)
+    if pending is not None:
+        for key, (count, price_sum) in deltas.items():
+            c, p = pending.get(key, (0, Decimal(0)))
+            pending[key] = (c + count, p + price_sum)
+        return
+    deltas = {key: delta for key, delta in deltas.items() if any(delta)}
+    if not deltas:
+        return
+    with transaction.atomic():
+        for (group, key), (count, price_sum) in deltas.items():
+            rows = ListingStat.objects.filter(group=group, key=key)
+            if rows.update(count=F('count') + count, price_sum=F('price_sum') + price_sum):
+                continue
+            try:
+                with transaction.atomic():
+                    ListingStat.objects.create(group=group, key=key, count=count, price_sum=price_sum)
+            except IntegrityError:
+                rows.update(count=F('count') + count, price_sum=F('price_sum') + price_sum)
+
+
+def diff(before, after):
+    deltas = defaultdict(lambda: (0, Decimal(0)))
+    for sign, contrib in ((-1, before or {}), (1, after or {})):
+        for key, (count, price_sum) in contrib.items():
+            c, p = deltas[key]
+            deltas[key] = (c + sign * count, p + sign * price_sum)
+    return dict(deltas)
+
+
+def _snapshot_querysets(series_days):
+    from .models import Category, ListingStat
+    querysets = {
+        'rows': ListingStat.objects.filter(group__in=SUMMARY_GROUPS).values_list('group', 'key', 'count', 'price_sum'),
+        'categories': Category.objects.values_list('id', 'name'),
+    }
+    if series_days:
+        today = timezone.localdate()
+        first = today - timedelta(days=series_days - 1)
+        querysets['days'] = (
+            ListingStat.objects.filter(group='day', key__gte=first.isoformat(), key__lte=today.isoformat())
+            .values_list('key', 'count')
+        )
+    return querysets
+
+
+def _build_snapshot(series_days, rows, categories, days=()):
+    total, price_sum, by_status, by_category = 0, Decimal(0), [], {}
+    for group, key, count, group_price_sum in rows:
+        if group == 'total':
+            total, price_sum = count, group_price_sum
+        elif group == 'status' and count:
+            by_status.append({'status': key, 'count': count})
+        elif group == 'category':
+            by_category[key] = count
+
+    data = {
+        'total_listings': total,
+        'average_price': (price_sum / total) if total else None,
+        'listings_by_category': [
+            {'name': name, 'count': by_category.get(str(pk), 0)}
+            for pk, name in categories
+        ],
+        'listings_by_status': sorted(by_status, key=lambda row: row['status']),
+    }
+    if series_days:
+        counts = dict(days)
+        first = timezone.localdate() - timedelta(days=series_days - 1)
+        data['listings_per_day'] = [
+            {'date': day.isoformat(), 'count': counts.get(day.isoformat(), 0)}
+            for day in (first + timedelta(days=i) for i in range(series_days))
+        ]
+    return data
+
+
+def snapshot(series_days=None):
+    """Data for the statistics endpoint; cost does not depend on the number of listings."""
+    querysets = _snapshot_querysets(series_days)
+    return _build_snapshot(series_days, **{name: list(qs) for name, qs in querysets.items()})
+
+
+async def asnapshot(series_days=None):
+    """`snapshot()` read with the async ORM."""
+    querysets = _snapshot_querysets(series_days)
+    return _build_snapshot(series_days, **{name: [row async for row in qs] for name, qs in querysets.items()})
+
+
+def rebuild(Listing=None, ListingStat=None):
+    """Recompute every counter from the listings table (drift repair)."""
+    if Listing is None or ListingStat is None:
+        from .models import Listing, ListingStat
+    rows = [('total', '', Listing.objects.aggregate(c=Count('id'), p=Sum('price')))]
+    for group, field in (('status', 'status'), ('category', 'category_id')):
+        for row in Listing.objects.exclude(**{f'{field}__isnull': True}).values(field).annotate(c=Count('id'), p=Sum('price')).order_by():
+            rows.append((group, str(row[field]), row))
+    by_day = Listing.objects.annotate(day=TruncDate('created_at')).values('day').annotate(c=Count('id'), p=Sum('price')).order_by()
+    for row in by_day:
+        rows.append(('day', row['day'].isoformat(), row))
+
+    with transaction.atomic():
+        ListingStat.objects.all().delete()
+        ListingStat.objects.bulk_create([
+            ListingStat(group=group, key=key, count=row['c'], price_sum=row['p'] or 0)
+            for group, key, row in rows
+        ])
@@ -0,0 +1,91 @@
+import hashlib
+import os
+
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+from django.db import IntegrityError, transaction
+from django.db.models import F
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """
+    Stores files under the SHA-256 of their content, e.g.
+    `listings/3f/3f9a...e1.jpg`. Saving bytes that are already stored
+    returns the existing name without writing anything.
+    """
+    def hash_content(self, content):
+        digest = hashlib.sha256()
+        if hasattr(content, 'seek'):
+            content.seek(0)
+        for chunk in content.chunks():
+            digest.update(chunk)
+        if hasattr(content, 'seek'):
+            content.seek(0)
+        return digest.hexdigest()
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        if not hasattr(content, 'chunks'):
+            content = File(content, name)
+        digest = self.hash_content(content)
+        directory = os.path.dirname(name)
+        ext = os.path.splitext(name)[1].lower()
+        name = os.path.join(directory, digest[:2], f"{digest}{ext}").replace('\\', '/')
+        if self.exists(name):
+            return name
+        return super().save(name, content, max_length=max_length)
+
+
+def listing_storage():
+    return _listing_storage
+
+
+_listing_storage = ContentAddressedStorage()
+
+
+def acquire(name):
+    """Register one more reference to a stored file."""
+    from listings.models import StoredFile
+    if not name:
+        return
+    if StoredFile.objects.filter(name=name).update(refcount=F('refcount') + 1):
+        return
+    try:
+        with transaction.atomic():
+            StoredFile.objects.create(name=name, refcount=1)
+    except IntegrityError:
+        StoredFile.objects.filter(name=name).update(refcount=F('refcount') + 1)
+
+
+def release(name, storage=None):
+    """
+    Drop one reference; the file is deleted once nothing points at it.
+    The delete waits for the surrounding transaction to commit, so a
+    rollback never leaves rows pointing at a missing file.
+    """
+    from listings.models import StoredFile
+    if not name:
+        return
+    storage = storage or _listing_storage
+    tracked = StoredFile.objects.filter(name=name)
+    if not tracked.update(refcount=F('refcount') - 1):
+        # Not reference counted (uploaded before deduplication): single owner.
+        transaction.on_commit(lambda: storage.delete(name))
+        return
+    deleted, _ = StoredFile.objects.filter(name=name, refcount__lte=0).delete()
+    if deleted:
+        transaction.on_commit(lambda: _delete_unreferenced(name, storage))
+
+
+def discard(name, storage=None):
+    """Delete a file that was saved but never acquired, unless another owner references it."""
+    if name:
+        _delete_unreferenced(name, storage or _listing_storage)
+
+
+def _delete_unreferenced(name, storage):
+    from listings.models import StoredFile
+    # Identical bytes may have been stored again since the last reference went away.
+    if not StoredFile.objects.filter(name=name).exists():
+        storage.delete(name)
@@ -0,0 +1,72 @@
+import logging
+import os
+
+from django.db import transaction
+from django.utils import timezone
+
+from . import versions
+from .images import build_renditions, rendition_names
+from .models import Listing
+from .storage import acquire, discard, release
+
+logger = logging.getLogger(__name__)
+
+
+def _reuse_derivatives(listing_id, image_name):
+    """Derivatives of another listing that points at the same stored image."""
+    with transaction.atomic():
+        twin = (
+            Listing.objects.filter(image=image_name, thumbnail_status='READY')
+            .exclude(pk=listing_id)
+            .values('thumbnail', 'renditions')
+            .first()
+        )
+        if twin is None or not twin['thumbnail']:
+            return None
+        for name in (twin['thumbnail'], *rendition_names(twin['renditions'])):
+            acquire(name)
+        return twin['thumbnail'], twin['renditions']
+
+
+def generate_derivatives(listing_id):
+    listing = Listing.objects.filter(pk=listing_id).only('id', 'image', 'thumbnail').first()
+    if listing is None or not listing.image:
+        return
+    image_name = listing.image.name
+    storage = listing.thumbnail.storage
+
+    reused = _reuse_derivatives(listing_id, image_name)
+    if reused:
+        thumbnail_name, renditions = reused
+    else:
+        renditions = None
+        try:
+            with listing.image.open('rb') as f:
+                renditions, (thumb_filename, thumb_content) = build_renditions(
+                    f, os.path.basename(image_name), storage
+                )
+            with thumb_content:
+                listing.thumbnail.save(thumb_filename, thumb_content, save=False)
+        except Exception:
+            logger.exception("Image derivative generation failed for listing %s", listing_id)
+            for name in rendition_names(renditions):
+                discard(name, storage)
+            Listing.objects.filter(pk=listing_id, image=image_name).update(
+                thumbnail_status='FAILED', updated_at=timezone.now()
+            )
+            versions.bump(versions.LISTING)
+            return
+        thumbnail_name = listing.thumbnail.name
+        for name in (thumbnail_name, *rendition_names(renditions)):
+            acquire(name)
+
+    # The image may have been replaced while the job was queued.
+    updated = Listing.objects.filter(pk=listing_id, image=image_name).update(
+        thumbnail=thumbnail_name, renditions=renditions, thumbnail_status='READY',
+        updated_at=timezone.now(),
+    )
+    if updated:
+        versions.bump(versions.LISTING)
+    else:
+        for name in (thumbnail_name, *rendition_names(renditions)):
+            release(name, storage)
@@ -0,0 +1,87 @@
+import time
+
+from django.db import router
+
+from . import versions
+from .models import Category, Listing, Tag
+
+CATEGORY_CACHE_TIMEOUT = 60
+
+_categories = {'version': None, 'expires': 0, 'ids': {}}
+
+
+def _create_missing(model, names):
+    model.objects.bulk_create([model(name=name) for name in names], ignore_conflicts=True)
+    # bulk_create sends no post_save, so bump the version here.
+    versions.bump(model._meta.model_name)
+
+
+def _category_ids():
+    """`{name: id}` of the whole (small) category table, cached in-process until a category write."""
+    global _categories
+    counters, _ = versions.get_versions([versions.CATEGORY])
+    state = _categories
+    if state['version'] != counters or state['expires'] < time.monotonic():
+        state = {
+            'version': counters,
+            'expires': time.monotonic() + CATEGORY_CACHE_TIMEOUT,
+            'ids': dict(Category.objects.values_list('name', 'id')),
+        }
+        _categories = state
+    return state['ids']
+
+
+def resolve_categories(names, create_missing=True):
+    """`{name: Category}` for `names`; no query unless a category is missing or was changed."""
+    names = set(names)
+    ids = _category_ids()
+    missing = names - ids.keys()
+    if missing and create_missing:
+        _create_missing(Category, missing)
+        ids = _category_ids()
+    db = router.db_for_read(Category)
+    return {name: Category.from_db(db, ['id', 'name'], (ids[name], name)) for name in names if name in ids}
+
+
+def get_category(name, create_missing=True):
+    return resolve_categories([name], create_missing).get(name)
+
+
+def resolve_tags(names, create_missing=True):
+    """`{name: Tag}` for `names` with one SELECT, plus one INSERT and SELECT for missing names."""
+    names = set(names)
+    if not names:
+        return {}
+    found = {tag.name: tag for tag in Tag.objects.filter(name__in=names)}
+    missing = names - found.keys()
+    if missing and create_missing:
+        _create_missing(Tag, missing)
+        found.update((tag.name, tag) for tag in Tag.objects.filter(name__in=missing))
+    return found
+
+
+def set_tags(assignments, created=()):
+    """
+    Make `{listing_id: tag ids}` the exact tag sets of those listings.
+    Only the difference is written: one SELECT of the current links (skipped
+    for listings in `created`, which have none), one DELETE and one INSERT.
+    """
+    through = Listing.tags.through
+    wanted = {(listing_id, tag_id) for listing_id, tag_ids in assignments.items() for tag_id in tag_ids}
+    created = set(created)
+    existing_ids = [listing_id for listing_id in assignments if listing_id not in created]
+    current = {}
+    if existing_ids:
+        current = {
+            (listing_id, tag_id): pk
+            for pk, listing_id, tag_id in through.objects.filter(listing_id__in=existing_ids)
+            .values_list('pk', 'listing_id', 'tag_id')
+        }
+    removed = [pk for link, pk in current.items() if link not in wanted]
+    added = [through(listing_id=listing_id, tag_id=tag_id) for listing_id, tag_id in wanted if (listing_id, tag_id) not in current]
+    if removed:
+        through.objects.filter(pk__in=removed).delete()
+    if added:
+        through.objects.bulk_create(added, batch_size=500)
+    if removed or added:
+        versions.bump(versions.LISTING)
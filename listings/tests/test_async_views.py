@@ -0,0 +1,146 @@
+import io
+import json
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.test import TransactionTestCase
+from django.urls import reverse
+from rest_framework.test import APITestCase
+
+from listings.models import Category, Listing, Tag
+from zai_project.views import query_hash
+
+
+class AsyncListingViewsTestCase(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='user1', password='pass')
+        self.books = Category.objects.create(name='Books')
+        self.toys = Category.objects.create(name='Toys')
+        self.tag = Tag.objects.create(name='Sale')
+        for i in range(7):
+            listing = Listing.objects.create(
+                title=f'Ad {i}', description='Desc', price=Decimal(10 + i), author=self.user,
+                category=self.books if i % 2 else self.toys, status='APPROVED' if i < 5 else 'PENDING',
+            )
+            if i < 3:
+                listing.tags.add(self.tag)
+        resp = self.client.post(reverse('token_obtain_pair'), {'username': 'user1', 'password': 'pass'}, format='json')
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {resp.data['access']}")
+
+    def assertSameAsSync(self, sync_url, async_url):
+        sync_resp = self.client.get(sync_url)
+        async_resp = self.client.get(async_url)
+        self.assertEqual(async_resp.status_code, sync_resp.status_code)
+        data, expected = async_resp.json(), sync_resp.json()
+        for link in ('next', 'previous'):
+            if expected.get(link):
+                expected[link] = expected[link].replace(sync_url.split('?')[0], async_url.split('?')[0])
+        self.assertEqual(data, expected)
+        return data
+
+    def test_list_matches_viewset(self):
+        sync_url, async_url = reverse('listing-list'), reverse('async-listing-list')
+        for query in ('', '?status=APPROVED', f'?category={self.books.pk}', f'?tags={self.tag.pk}',
+                      '?search=Ad', '?ordering=-price', '?page_size=2',
+                      '?category=0', '?author=0', '?tags=0', '?status=NOPE', '?category=x'):
+            self.assertSameAsSync(sync_url + query, async_url + query)
+
+    def test_cursor_pagination(self):
+        url = reverse('async-listing-list')
+        first = self.client.get(url, {'page_size': 3, 'ordering': 'price'}).json()
+        self.assertEqual([item['title'] for item in first['results']], ['Ad 0', 'Ad 1', 'Ad 2'])
+        second = self.client.get(first['next']).json()
+        self.assertEqual([item['title'] for item in second['results']], ['Ad 3', 'Ad 4', 'Ad 5'])
+        self.assertEqual(self.client.get(url, {'cursor': 'garbage'}).status_code, 404)
+
+    def test_detail_matches_viewset(self):
+        listing = Listing.objects.first()
+        self.assertSameAsSync(reverse('listing-detail', args=[listing.pk]),
+                              reverse('async-listing-detail', args=[listing.pk]))
+        resp = self.client.get(reverse('async-listing-detail', args=[0]))
+        self.assertEqual(resp.status_code, 404)
+
+    def test_statistics_match_viewset(self):
+        data = self.assertSameAsSync(reverse('listing-statistics') + '?days=7',
+                                     reverse('async-listing-statistics') + '?days=7')
+        self.assertEqual(data['total_listings'], 7)
+        for days, message in (('0', 'Must be between 1 and 366.'), ('367', 'Must be between 1 and 366.'), ('x', 'Must be an integer.')):
+            data = self.assertSameAsSync(reverse('listing-statistics') + f'?days={days}',
+                                         reverse('async-listing-statistics') + f'?days={days}')
+            self.assertEqual(data, {'days': [message]})
+
+    def test_authentication(self):
+        url = reverse('async-listing-statistics')
+        self.client.credentials()
+        self.assertEqual(self.client.get(url).status_code, 401)
+        self.client.credentials(HTTP_AUTHORIZATION='Bearer nope')
+        self.assertEqual(self.client.get(reverse('async-listing-list')).status_code, 401)
+
+        self.client.credentials()
+        self.client.force_login(self.user)
+        self.assertEqual(self.client.get(url).status_code, 200)
+
+    def test_only_get_is_allowed(self):
+        self.assertEqual(self.client.post(reverse('async-listing-list'), {}).status_code, 405)
+
+    def test_invalid_filter(self):
+        resp = self.client.get(reverse('async-listing-list'), {'category': 'x'})
+        self.assertEqual(resp.status_code, 400)
+        self.assertIn('category', resp.json())
+
+
+class AsyncGraphQLViewTestCase(TransactionTestCase):
+    # The view resolves on a pool thread with its own connection, so data must be committed.
+    def setUp(self):
+        self.user = user = User.objects.create_user(username='user1', password='pass')
+        category = Category.objects.create(name='Books')
+        for i in range(3):
+            Listing.objects.create(title=f'Ad {i}', description='Desc', price=Decimal(10), author=user, category=category)
+
+    def test_matches_sync_view(self):
+        body = {'query': '{ allListings(first: 10) { edges { node { title category { name } } } } }'}
+        sync_resp = self.client.post('/graphql/', body, content_type='application/json')
+        async_resp = self.client.post('/graphql/async/', body, content_type='application/json')
+        self.assertEqual(async_resp.status_code, 200)
+        self.assertEqual(async_resp.json(), sync_resp.json())
+        self.assertEqual(len(async_resp.json()['data']['allListings']['edges']), 3)
+
+    def test_mutation_and_errors_match_sync_view(self):
+        User.objects.filter(pk=self.user.pk).update(is_staff=True)
+        token = self.client.post('/graphql/', {
+            'query': 'mutation { tokenAuth(username: "user1", password: "pass") { token } }'
+        }, content_type='application/json').json()['data']['tokenAuth']['token']
+        headers = {'HTTP_AUTHORIZATION': f'JWT {token}'}
+        for body in (
+            {'query': '{ myFavorites { edges { node { title } } } }'},
+            {'query': '{ allListings { edges { node { nope } } } }'},
+            {'query': 'mutation { createCategory(name: "Toys") { category { name } } }'},
+        ):
+            sync_resp = self.client.post('/graphql/', body, content_type='application/json', **headers)
+            Category.objects.filter(name='Toys').delete()
+            async_resp = self.client.post('/graphql/async/', body, content_type='application/json', **headers)
+            self.assertEqual(async_resp.status_code, sync_resp.status_code)
+            self.assertEqual(async_resp.json(), sync_resp.json())
+        self.assertEqual(async_resp.json()['data']['createCategory']['category']['name'], 'Toys')
+        self.assertEqual(self.client.get('/graphql/async/', {'query': 'mutation { x }'}).status_code, 405)
+        self.assertEqual(self.client.post('/graphql/async/', 'nope', content_type='application/json').status_code, 400)
+
+    def test_persisted_query_get(self):
+        query = '{ allCategories { name } }'
+        extensions = json.dumps({'persistedQuery': {'version': 1, 'sha256Hash': query_hash(query)}})
+        resp = self.client.get('/graphql/async/', {'extensions': extensions})
+        self.assertEqual(resp.json()['errors'][0]['message'], 'PersistedQueryNotFound')
+        self.assertEqual(self.client.get('/graphql/async/', {'extensions': extensions, 'query': query}).status_code, 200)
+        resp = self.client.get('/graphql/async/', {'extensions': extensions})
+        self.assertEqual(resp.json()['data'], {'allCategories': [{'name': 'Books'}]})
+        self.assertIn('max-age=', resp['Cache-Control'])
+        resp = self.client.get('/graphql/async/', {'extensions': extensions}, HTTP_IF_NONE_MATCH=resp['ETag'])
+        self.assertEqual(resp.status_code, 304)
+
+    def test_benchmark_command(self):
+        out = io.StringIO()
+        call_command('benchmark_asgi', requests=4, concurrency=2, scenario=['listings'], stdout=out)
+        lines = out.getvalue().splitlines()
+        self.assertEqual([line.split()[:2] for line in lines[1:]], [['listings', 'wsgi'], ['listings', 'asgi']])
+        self.assertEqual([line.split()[-1] for line in lines[1:]], ['0', '0'])
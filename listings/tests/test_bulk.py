@@ -0,0 +1,135 @@
+import json
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.contrib.auth.models import User
+from django.urls import reverse
+from rest_framework.test import APITestCase
+from listings.models import Category, Job, Listing, ListingStat, Tag
+from listings.stats import rebuild
+
+
+class BulkListingAPITestCase(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='seller', password='pass')
+        self.other = User.objects.create_user(username='other', password='pass')
+        self.cat = Category.objects.create(name='Electronics')
+        self.tags = [Tag.objects.create(name='Sale'), Tag.objects.create(name='New')]
+        self.url = reverse('listing-bulk')
+        self.client.force_authenticate(self.user)
+
+    def row(self, i, **extra):
+        return dict({'title': f'Ad {i}', 'description': 'Desc', 'price': f'{i}.00', 'category': 'Electronics'}, **extra)
+
+    def stats(self):
+        return sorted(ListingStat.objects.exclude(count=0).values_list('group', 'key', 'count', 'price_sum'))
+
+    def rebuilt_stats(self):
+        current = self.stats()
+        rebuild()
+        return current, self.stats()
+
+    def test_create_many_with_constant_queries(self):
+        def create(count):
+            with CaptureQueriesContext(connection) as ctx:
+                resp = self.client.post(self.url, [self.row(i, tags=['Sale', 'New']) for i in range(count)], format='json')
+            self.assertEqual(resp.status_code, 200)
+            return resp.json()['results'], len(ctx.captured_queries)
+
+        create(2)
+        _, few = create(5)
+        results, many = create(300)
+        # Only the number of INSERT batches (SQLite parameter limit) grows.
+        self.assertLess(many, few + 10)
+        self.assertTrue(all(r['action'] == 'created' and not r['errors'] for r in results))
+        self.assertEqual(Listing.objects.filter(author=self.user).count(), 307)
+        listing = Listing.objects.get(pk=results[-1]['id'])
+        self.assertEqual(sorted(listing.tags.values_list('name', flat=True)), ['New', 'Sale'])
+        current, rebuilt = self.rebuilt_stats()
+        self.assertEqual(current, rebuilt)
+
+    def test_update_and_delete(self):
+        mine = [Listing.objects.create(title=f'Mine {i}', description='D', price=1, author=self.user, category=self.cat) for i in range(3)]
+        theirs = Listing.objects.create(title='Theirs', description='D', price=1, author=self.other)
+        mine[0].tags.add(self.tags[0])
+        rows = [
+            {'id': mine[0].pk, 'title': 'Renamed', 'price': '7.00', 'tags': ['New']},
+            {'id': mine[1].pk, 'delete': True},
+            {'id': theirs.pk, 'title': 'Hijacked'},
+            {'id': 999999, 'title': 'Ghost'},
+            {'id': mine[2].pk, 'status': 'APPROVED'},
+        ]
+        results = self.client.post(self.url, rows, format='json').json()['results']
+
+        self.assertEqual([r['action'] for r in results], ['updated', 'deleted', None, None, 'updated'])
+        self.assertIn('id', results[2]['errors'])
+        self.assertIn('id', results[3]['errors'])
+        mine[0].refresh_from_db()
+        self.assertEqual((mine[0].title, str(mine[0].price)), ('Renamed', '7.00'))
+        self.assertEqual(list(mine[0].tags.values_list('name', flat=True)), ['New'])
+        self.assertFalse(Listing.objects.filter(pk=mine[1].pk).exists())
+        self.assertEqual(Listing.objects.get(pk=theirs.pk).title, 'Theirs')
+        self.assertEqual(Listing.objects.get(pk=mine[2].pk).status, 'APPROVED')
+        current, rebuilt = self.rebuilt_stats()
+        self.assertEqual(current, rebuilt)
+
+    def test_per_row_validation(self):
+        rows = [
+            self.row(1),
+            {'title': 'No price'},
+            self.row(2, category='Missing'),
+            self.row(3, tags=['Unknown']),
+            self.row(4, price='abc'),
+            self.row(5),
+        ]
+        results = self.client.post(self.url, rows, format='json').json()['results']
+        self.assertEqual([r['index'] for r in results], list(range(6)))
+        self.assertEqual([r['action'] for r in results], ['created', None, None, None, None, 'created'])
+        self.assertIn('price', results[1]['errors'])
+        self.assertIn('category', results[2]['errors'])
+        self.assertIn('tags', results[3]['errors'])
+        self.assertIn('price', results[4]['errors'])
+        self.assertFalse(Category.objects.filter(name='Missing').exists())
+
+    def test_duplicate_ids_rejected(self):
+        listing = Listing.objects.create(title='Mine', description='D', price=1, author=self.user)
+        results = self.client.post(self.url, [{'id': listing.pk, 'title': 'A'}, {'id': listing.pk, 'title': 'B'}], format='json').json()['results']
+        self.assertEqual([r['action'] for r in results], ['updated', None])
+
+    def test_images_deferred_to_jobs(self):
+        with self.settings(LISTINGS_JOBS={'BACKEND': 'listings.jobs.backends.DatabaseBackend'}):
+            results = self.client.post(self.url, [self.row(1, image='listings/feed.jpg')], format='json').json()['results']
+        listing = Listing.objects.get(pk=results[0]['id'])
+        self.assertEqual(listing.thumbnail_status, 'PENDING')
+        self.assertEqual(list(Job.objects.values_list('task', 'args')), [('listings.tasks.generate_derivatives', [listing.pk])])
+
+    def test_requires_authentication_and_list(self):
+        self.assertEqual(self.client.post(self.url, {'title': 'x'}, format='json').status_code, 400)
+        self.client.force_authenticate(None)
+        self.assertEqual(self.client.post(self.url, [self.row(1)], format='json').status_code, 401)
+
+
+class BulkUpsertListingsGraphQLTestCase(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='seller', password='pass')
+        self.client.force_login(self.user)
+
+    def test_bulk_upsert_creates_taxonomy(self):
+        existing = Listing.objects.create(title='Old', description='D', price=1, author=self.user)
+        query = """
+        mutation($rows: [BulkListingInput!]!) {
+          bulkUpsertListings(listings: $rows) { results { index id action errors } }
+        }
+        """
+        rows = [
+            {'title': 'Bike', 'description': 'D', 'price': 100.5, 'categoryName': 'Sport', 'tagNames': ['Used']},
+            {'id': existing.pk, 'title': 'Renamed', 'tagNames': ['Used']},
+            {'title': 'No category', 'description': 'D', 'price': 1},
+        ]
+        resp = self.client.post('/graphql/', json.dumps({'query': query, 'variables': {'rows': rows}}), content_type='application/json')
+        results = resp.json()['data']['bulkUpsertListings']['results']
+
+        self.assertEqual([r['action'] for r in results], ['created', 'updated', None])
+        self.assertEqual(results[2]['errors'], ['category: This field is required.'])
+        bike = Listing.objects.get(pk=results[0]['id'])
+        self.assertEqual((bike.category.name, str(bike.price)), ('Sport', '100.50'))
+        self.assertEqual(list(existing.tags.values_list('name', flat=True)), ['Used'])
@@ -0,0 +1,108 @@
+import multiprocessing
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.urls import reverse
+from rest_framework.test import APITestCase
+from listings import versions
+from listings.models import Category, Listing, Tag
+
+
+class ConditionalCacheTestCase(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='seller', password='pass')
+        self.admin = User.objects.create_superuser(username='admin', password='pass')
+        self.cat = Category.objects.create(name='Electronics')
+        self.listing = Listing.objects.create(
+            title='Phone', description='Desc', price=10, author=self.user, category=self.cat
+        )
+        self.url = reverse('listing-list')
+
+    def test_validators_present(self):
+        resp = self.client.get(self.url)
+        self.assertEqual(resp.status_code, 200)
+        self.assertTrue(resp['ETag'])
+        self.assertTrue(resp['Last-Modified'])
+
+    def test_not_modified_skips_queryset(self):
+        etag = self.client.get(self.url)['ETag']
+        # The freshness aggregate and the latest passed expiry.
+        with self.assertNumQueries(2):
+            resp = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(resp.status_code, 304)
+        self.assertEqual(resp.content, b'')
+
+    def test_if_modified_since(self):
+        last_modified = self.client.get(self.url)['Last-Modified']
+        resp = self.client.get(self.url, HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(resp.status_code, 304)
+
+    def test_repeat_request_served_from_cache(self):
+        first = self.client.get(self.url)
+        with self.assertNumQueries(2):
+            second = self.client.get(self.url)
+        self.assertEqual(second.json(), first.json())
+        self.assertEqual(second['ETag'], first['ETag'])
+
+    def test_cache_key_includes_query_params(self):
+        self.client.get(self.url)
+        resp = self.client.get(self.url + '?status=APPROVED')
+        self.assertEqual(resp.json()['results'], [])
+
+    def test_listing_write_invalidates(self):
+        etag = self.client.get(self.url)['ETag']
+        self.listing.title = 'Tablet'
+        self.listing.save()
+        resp = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.json()['results'][0]['title'], 'Tablet')
+
+    def test_delete_invalidates(self):
+        etag = self.client.get(self.url)['ETag']
+        Listing.objects.create(title='Old', description='D', price=1, author=self.user, category=self.cat).delete()
+        self.listing.delete()
+        resp = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.json()['results'], [])
+
+    def test_writes_in_other_processes_invalidate(self):
+        etag = self.client.get(self.url)['ETag']
+        # A listing deleted by another worker only shows through its version bump.
+        process = multiprocessing.get_context('fork').Process(target=versions.bump, args=(versions.LISTING,))
+        process.start()
+        process.join()
+        self.assertEqual(process.exitcode, 0)
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_related_writes_invalidate(self):
+        detail = reverse('listing-detail', args=[self.listing.pk])
+        self.client.get(detail)
+        self.cat.name = 'Phones'
+        self.cat.save()
+        self.assertEqual(self.client.get(detail).json()['category'], 'Phones')
+        self.listing.tags.add(Tag.objects.create(name='Sale'))
+        self.assertEqual(self.client.get(detail).json()['tags'], ['Sale'])
+
+    def test_missing_detail_is_404(self):
+        resp = self.client.get(reverse('listing-detail', args=[self.listing.pk + 100]))
+        self.assertEqual(resp.status_code, 404)
+
+    def test_scope_separates_users(self):
+        anonymous = self.client.get(self.url)['ETag']
+        self.client.force_authenticate(self.user)
+        self.assertNotEqual(self.client.get(self.url)['ETag'], anonymous)
+
+    def test_permissions_checked_before_cache(self):
+        url = reverse('category-list')
+        self.client.force_authenticate(self.admin)
+        etag = self.client.get(url)['ETag']
+        self.client.force_authenticate(self.user)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 403)
+
+    def test_category_list_invalidated_on_write(self):
+        url = reverse('category-list')
+        self.client.force_authenticate(self.admin)
+        self.client.get(url)
+        Category.objects.create(name='Books')
+        self.assertEqual([c['name'] for c in self.client.get(url).json()['results']], ['Electronics', 'Books'])
@@ -0,0 +1,67 @@
+import io
+import os
+import subprocess
+import sys
+import tempfile
+from unittest import mock
+
+from django.core.management import call_command
+from django.db import connections
+from django.test import SimpleTestCase, TransactionTestCase, override_settings
+
+
+class SQLiteTuningTestCase(SimpleTestCase):
+    def connect(self, **overrides):
+        path = os.path.join(tempfile.mkdtemp(), 'db.sqlite3')
+        wrapper = connections['default'].__class__(dict(connections.settings['default'], NAME=path, **overrides), 'tuning')
+        self.addCleanup(wrapper.close)
+        wrapper.ensure_connection()
+        return wrapper
+
+    def pragma(self, wrapper, name):
+        return wrapper.connection.execute(f'PRAGMA {name}').fetchone()[0]
+
+    def test_settings_pragmas_apply_to_new_connections(self):
+        wrapper = self.connect()
+        self.assertEqual(self.pragma(wrapper, 'journal_mode'), 'wal')
+        self.assertEqual(self.pragma(wrapper, 'synchronous'), 1)  # NORMAL
+        self.assertEqual(self.pragma(wrapper, 'busy_timeout'), 5000)
+        self.assertEqual(self.pragma(wrapper, 'cache_size'), -64000)
+
+    def test_asgi_closes_connections_after_each_request(self):
+        code = (
+            "import zai_project.{};"
+            "from django.db import connections;"
+            "print(*(connections[alias].settings_dict['CONN_MAX_AGE'] for alias in connections))"
+        )
+        for module, expected in (('asgi', '0 0'), ('wsgi', '600 600')):
+            output = subprocess.run(
+                [sys.executable, '-c', code.format(module)], capture_output=True, text=True, check=True,
+                cwd=os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+            ).stdout
+            self.assertEqual(output.split(), expected.split())
+
+    def test_database_can_override_pragmas(self):
+        wrapper = self.connect(PRAGMAS={'busy_timeout': 100})
+        self.assertEqual(self.pragma(wrapper, 'journal_mode'), 'delete')
+        self.assertEqual(self.pragma(wrapper, 'busy_timeout'), 100)
+
+    @override_settings(SQLITE_PRAGMAS={'journal_mode; DROP TABLE x': 'WAL'})
+    def test_rejects_invalid_names(self):
+        with self.assertRaises(ValueError):
+            self.connect()
+
+
+class SQLiteLoadTestCommandTestCase(TransactionTestCase):
+    def test_tuned_profile_never_reports_locked_database(self):
+        out = io.StringIO()
+        # The command registers a 'loadtest' alias for its copy of the database.
+        with mock.patch.object(type(self), 'databases', {'default', 'loadtest'}):
+            call_command('loadtest_sqlite', seconds=0.5, readers=2, writers=2, stdout=out)
+        rows = {line.split()[0]: line.split()[1:] for line in out.getvalue().splitlines()[1:]}
+        self.assertEqual(set(rows), {'default', 'tuned'})
+        reads, writes, locked = rows['tuned']
+        self.assertGreater(float(reads), 0)
+        self.assertGreater(float(writes), 0)
+        self.assertEqual(locked, '0')
+        self.assertNotIn('loadtest', connections.settings)
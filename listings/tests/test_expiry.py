@@ -0,0 +1,99 @@
+import io
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APITestCase
+
+from listings import stats, versions
+from listings.expiry import archive_expired
+from listings.models import Category, Listing, Tag
+
+
+class ListingExpiryTestCase(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='seller', password='pass')
+        self.cat = Category.objects.create(name='Books')
+        now = timezone.now()
+        self.open_ended = self.create('Open', 'APPROVED', None)
+        self.future = self.create('Future', 'APPROVED', now + timedelta(days=1))
+        self.expired = [self.create(f'Expired {i}', 'APPROVED', now - timedelta(hours=i + 1)) for i in range(5)]
+        self.expired_pending = self.create('Expired pending', 'PENDING', now - timedelta(days=1))
+        self.archived = self.create('Archived', 'ARCHIVED', None)
+
+    def create(self, title, status, expires_at):
+        return Listing.objects.create(
+            title=title, description='Desc', price=10, author=self.user, category=self.cat,
+            status=status, expires_at=expires_at,
+        )
+
+    def test_active_and_published(self):
+        self.assertCountEqual(Listing.objects.active(), [self.open_ended, self.future])
+        self.assertCountEqual(Listing.published.all(), [self.open_ended, self.future])
+        self.assertCountEqual(Listing.objects.expired(), [*self.expired, self.expired_pending])
+
+    def test_feeds_hide_expired_listings(self):
+        resp = self.client.get(reverse('listing-list'))
+        self.assertCountEqual([item['title'] for item in resp.data['results']], ['Open', 'Future'])
+        resp = self.client.get(reverse('listing-detail', args=[self.expired[0].pk]))
+        self.assertEqual(resp.status_code, 200)
+
+        query = '{ allListings(first: 20) { edges { node { title } } } }'
+        data = self.client.post('/graphql/', {'query': query}, format='json').json()
+        self.assertCountEqual([edge['node']['title'] for edge in data['data']['allListings']['edges']], ['Open', 'Future'])
+
+    def test_nested_listing_fields_hide_expired_listings(self):
+        tag = Tag.objects.create(name='sale')
+        for listing in Listing.objects.all():
+            listing.tags.add(tag)
+        query = '{ allCategories { listings { title } } allTags { listings { title } } }'
+        data = self.client.post('/graphql/', {'query': query}, format='json').json()['data']
+        self.assertCountEqual([item['title'] for item in data['allCategories'][0]['listings']], ['Open', 'Future'])
+        self.assertCountEqual([item['title'] for item in data['allTags'][0]['listings']], ['Open', 'Future'])
+
+    def test_feed_validators_change_when_a_listing_expires(self):
+        url = reverse('listing-list')
+        etag = self.client.get(url)['ETag']
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        # Time passing is no write: no version bump, no updated_at change.
+        Listing.objects.filter(pk=self.future.pk).update(expires_at=timezone.now() - timedelta(seconds=1))
+        resp = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual([item['title'] for item in resp.data['results']], ['Open'])
+
+    def test_archive_expired_in_batches(self):
+        version = versions.get_versions([versions.LISTING])[0]
+        self.assertEqual(archive_expired(batch_size=2), 6)
+        self.assertEqual(Listing.objects.filter(status='ARCHIVED').count(), 7)
+        self.assertEqual(Listing.objects.get(pk=self.future.pk).status, 'APPROVED')
+        self.assertNotEqual(versions.get_versions([versions.LISTING])[0], version)
+
+        by_status = {row['status']: row['count'] for row in stats.snapshot()['listings_by_status']}
+        self.assertEqual(by_status, {'APPROVED': 2, 'ARCHIVED': 7})
+        self.assertEqual(archive_expired(), 0)
+
+    def test_command(self):
+        out = io.StringIO()
+        call_command('archive_expired', batch_size=4, stdout=out)
+        self.assertEqual(out.getvalue().strip(), 'Archived 6 listing(s).')
+
+
+class ListingExpiryQueryPlanTestCase(TestCase):
+    def plan(self, queryset):
+        sql, params = queryset.query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute('EXPLAIN QUERY PLAN ' + sql, params)
+            return [row[3] for row in cursor.fetchall()]
+
+    def test_expired_uses_status_expires_at_index(self):
+        # active() feeds are covered by test_query_plans.
+        plan = self.plan(Listing.objects.expired())
+        self.assertTrue(any('(status=? AND expires_at' in step for step in plan), plan)
+        self.assertFalse(any(step.startswith('SCAN listings_listing') for step in plan), plan)
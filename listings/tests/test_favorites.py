@@ -0,0 +1,134 @@
+import json
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APITestCase
+from listings import favorites
+from listings.models import Category, Listing
+
+
+class FavoritesTestCase(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='user1', password='pass')
+        self.other = User.objects.create_user(username='user2', password='pass')
+        cat = Category.objects.create(name='Electronics')
+        self.listings = [
+            Listing.objects.create(title=f'Ad {i}', description='D', price=i, author=self.other, category=cat)
+            for i in range(6)
+        ]
+        self.client.force_authenticate(self.user)
+
+    def count(self, listing):
+        listing.refresh_from_db(fields=['favorite_count'])
+        return listing.favorite_count
+
+    def test_add_and_remove_keep_count_in_step(self):
+        listing = self.listings[0]
+        self.assertTrue(favorites.add(self.user, listing))
+        self.assertFalse(favorites.add(self.user, listing))
+        self.assertTrue(favorites.add(self.other, listing))
+        self.assertEqual(self.count(listing), 2)
+
+        self.assertTrue(favorites.remove(self.user, listing))
+        self.assertFalse(favorites.remove(self.user, listing))
+        self.assertEqual(self.count(listing), 1)
+
+    def test_stale_save_does_not_overwrite_count(self):
+        listing = Listing.objects.get(pk=self.listings[0].pk)
+        favorites.add(self.user, self.listings[0])
+        listing.title = 'Renamed'
+        listing.save()
+        self.assertEqual(self.count(listing), 1)
+
+    def test_related_manager_changes_are_counted(self):
+        listing = self.listings[0]
+        listing.favorited_by.add(self.user, self.other)
+        self.assertEqual(self.count(listing), 2)
+        self.user.favorites.remove(listing)
+        self.assertEqual(self.count(listing), 1)
+        listing.favorited_by.clear()
+        self.assertEqual(self.count(listing), 0)
+
+    def test_toggle_endpoint(self):
+        url = reverse('listing-favorite', args=[self.listings[0].pk])
+        resp = self.client.post(url)
+        self.assertEqual(resp.data, {'id': self.listings[0].pk, 'is_favorited': True, 'favorite_count': 1})
+        self.client.post(url)
+        resp = self.client.delete(url)
+        self.assertEqual(resp.data['favorite_count'], 0)
+
+        self.client.force_authenticate(None)
+        self.assertEqual(self.client.post(url).status_code, 401)
+
+    def test_list_flags_favorites_without_per_row_queries(self):
+        def list_queries():
+            with CaptureQueriesContext(connection) as ctx:
+                resp = self.client.get(reverse('listing-list'))
+            return len(ctx.captured_queries), {row['title']: row for row in resp.json()['results']}
+
+        favorites.add(self.user, self.listings[1])
+        queries_one, rows = list_queries()
+        self.assertTrue(rows['Ad 1']['is_favorited'])
+        self.assertEqual(rows['Ad 1']['favorite_count'], 1)
+        self.assertFalse(rows['Ad 2']['is_favorited'])
+
+        for listing in self.listings[2:5]:
+            favorites.add(self.user, listing)
+        queries_many, rows = list_queries()
+        self.assertEqual(queries_one, queries_many)
+        favorited = [title for title, row in rows.items() if row['is_favorited']]
+        self.assertEqual(favorited, ['Ad 4', 'Ad 3', 'Ad 2', 'Ad 1'])
+
+    def test_my_favorites_feed(self):
+        for listing in self.listings[:4]:
+            favorites.add(self.user, listing)
+        favorites.add(self.other, self.listings[5])
+
+        titles, url = [], reverse('listing-favorites') + '?page_size=3'
+        while url:
+            data = self.client.get(url).json()
+            self.assertTrue(all(row['is_favorited'] for row in data['results']))
+            titles += [row['title'] for row in data['results']]
+            url = data['next']
+        self.assertEqual(titles, ['Ad 3', 'Ad 2', 'Ad 1', 'Ad 0'])
+
+
+class GraphQLFavoritesTestCase(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='user1', password='pass')
+        cat = Category.objects.create(name='Electronics')
+        self.listings = [
+            Listing.objects.create(title=f'Ad {i}', description='D', price=i, author=self.user, category=cat)
+            for i in range(3)
+        ]
+        self.client.force_login(self.user)
+
+    def run_query(self, query, **variables):
+        resp = self.client.post(
+            '/graphql/', json.dumps({'query': query, 'variables': variables}), content_type='application/json'
+        )
+        content = resp.json()
+        self.assertNotIn('errors', content)
+        return content['data']
+
+    def test_mutation_and_feeds(self):
+        data = self.run_query(
+            'mutation($id: Int!) { favoriteListing(id: $id) { listing { favoriteCount isFavorited } } }',
+            id=self.listings[1].pk,
+        )
+        self.assertEqual(data['favoriteListing']['listing'], {'favoriteCount': 1, 'isFavorited': True})
+
+        data = self.run_query('{ allListings { edges { node { title isFavorited } } } }')
+        flags = {edge['node']['title']: edge['node']['isFavorited'] for edge in data['allListings']['edges']}
+        self.assertEqual(flags, {'Ad 0': False, 'Ad 1': True, 'Ad 2': False})
+
+        data = self.run_query('{ myFavorites { edges { node { title } } } }')
+        self.assertEqual([edge['node']['title'] for edge in data['myFavorites']['edges']], ['Ad 1'])
+
+        data = self.run_query(
+            'mutation($id: Int!) { favoriteListing(id: $id, favorited: false) { listing { favoriteCount } } }',
+            id=self.listings[1].pk,
+        )
+        self.assertEqual(data['favoriteListing']['listing']['favoriteCount'], 0)
@@ -1,8 +1,14 @@
+import json
+from django.conf import settings
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from rest_framework.test import APITestCase
 from django.contrib.auth.models import User
 from rest_framework import status
 from listings.models import Category, Tag, Listing, Profile
+from listings.tests.utils import create_listings
 
 class ListingAPITestCase(APITestCase):
     def setUp(self):
@@ -29,4 +35,119 @@ class ListingAPITestCase(APITestCase):
         self.client.force_authenticate(user=None)
         url = reverse('listing-list')
         resp = self.client.post(url, {}, format='json')
-        self.assertEqual(resp.status_code, status.HTTP_401_UNAUTHORIZED)
\ No newline at end of file
+        self.assertEqual(resp.status_code, status.HTTP_401_UNAUTHORIZED)
+
+class GraphQLBatchingTestCase(TestCase):
+    QUERY = """
+    query {
+      allListings(first: 50) {
+        edges {
+          node {
+            title
+            author { username }
+            tags { name listings { title } }
+            category { name listings { title author { username } tags { name } } }
+          }
+        }
+      }
+    }
+    """
+
+    def setUp(self):
+        self.cats = [Category.objects.create(name=f'Cat {i}') for i in range(12)]
+        self.tags = [Tag.objects.create(name=f'Tag {i}') for i in range(3)]
+
+    def create_listings(self, count, categories=2):
+        create_listings(count, self.cats[:categories], self.tags)
+
+    def run_query(self):
+        # The nested feed is far above the default cost limit; this test is about batching.
+        graphene = dict(settings.GRAPHENE, QUERY_COST={'MAX_COST': 10 ** 6})
+        with self.settings(GRAPHENE=graphene), CaptureQueriesContext(connection) as ctx:
+            resp = self.client.post('/graphql/', json.dumps({'query': self.QUERY}), content_type='application/json')
+        content = resp.json()
+        self.assertNotIn('errors', content)
+        edges = content['data']['allListings']['edges']
+        return len(ctx.captured_queries), [edge['node'] for edge in edges]
+
+    def test_nested_query_cost_is_per_level(self):
+        self.create_listings(2)
+        queries_small, _ = self.run_query()
+        # More listings, spread over more categories, each with its own listings feed.
+        self.create_listings(10, categories=12)
+        queries_large, listings = self.run_query()
+
+        self.assertEqual(len(listings), 12)
+        self.assertEqual(queries_small, queries_large)
+
+    def test_nested_results_match_relations(self):
+        self.create_listings(4)
+        _, listings = self.run_query()
+        by_title = {l['title']: l for l in listings}
+        self.assertEqual([t['name'] for t in by_title['Ad 2']['tags']], ['Tag 0', 'Tag 1', 'Tag 2'])
+        self.assertEqual(by_title['Ad 1']['category']['name'], 'Cat 1')
+        self.assertEqual(
+            sorted(l['title'] for l in by_title['Ad 1']['category']['listings']), ['Ad 1', 'Ad 3']
+        )
+        self.assertEqual(by_title['Ad 0']['author']['username'], 'seller0')
+
+    def test_nested_listing_lists_are_capped(self):
+        self.create_listings(25, categories=1)
+        query = '{ allCategories { name listings { title } } allTags { name listings(first: 3) { title } } }'
+        with CaptureQueriesContext(connection) as ctx:
+            data = self.client.post('/graphql/', json.dumps({'query': query}), content_type='application/json').json()['data']
+        newest = [f'Ad {i}' for i in range(24, -1, -1)]
+        category = next(c for c in data['allCategories'] if c['name'] == 'Cat 0')
+        self.assertEqual([l['title'] for l in category['listings']], newest[:20])
+        tag = next(t for t in data['allTags'] if t['name'] == 'Tag 0')
+        self.assertEqual([l['title'] for l in tag['listings']], newest[:3])
+        self.assertTrue(all(len(c['listings']) <= 20 for c in data['allCategories']))
+        self.assertLessEqual(len(ctx.captured_queries), 4)
+
+        query = '{ allTags { listings(first: -1) { title } } }'
+        data = self.client.post('/graphql/', json.dumps({'query': query}), content_type='application/json').json()
+        self.assertIn("'first' must be non-negative", data['errors'][0]['message'])
+
+
+
+class GraphQLListingConnectionTestCase(TestCase):
+    QUERY = """
+    query($first: Int, $after: String, $last: Int, $before: String) {
+      allListings(first: $first, after: $after, last: $last, before: $before) {
+        edges { cursor node { title } }
+        pageInfo { hasNextPage hasPreviousPage startCursor endCursor }
+      }
+    }
+    """
+
+    def setUp(self):
+        user = User.objects.create_user(username='user1', password='pass')
+        cat = Category.objects.create(name='Electronics')
+        for i in range(7):
+            Listing.objects.create(title=f'Ad {i}', description='D', price=i, author=user, category=cat)
+        self.expected = list(Listing.objects.order_by('-created_at', '-id').values_list('title', flat=True))
+
+    def run_query(self, **variables):
+        resp = self.client.post(
+            '/graphql/', json.dumps({'query': self.QUERY, 'variables': variables}), content_type='application/json'
+        )
+        content = resp.json()
+        self.assertNotIn('errors', content)
+        return content['data']['allListings']
+
+    def test_forward_pagination(self):
+        titles, after = [], None
+        while True:
+            page = self.run_query(first=3, after=after)
+            titles += [edge['node']['title'] for edge in page['edges']]
+            if not page['pageInfo']['hasNextPage']:
+                break
+            after = page['pageInfo']['endCursor']
+        self.assertEqual(titles, self.expected)
+
+    def test_backward_pagination(self):
+        last_page = self.run_query(last=3)
+        self.assertEqual([e['node']['title'] for e in last_page['edges']], self.expected[-3:])
+        self.assertTrue(last_page['pageInfo']['hasPreviousPage'])
+        before = self.run_query(last=2, before=last_page['pageInfo']['startCursor'])
+        self.assertEqual([e['node']['title'] for e in before['edges']], self.expected[-5:-3])
@@ -0,0 +1,92 @@
+import hashlib
+import json
+from django.conf import settings
+from unittest import mock
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase
+from listings.models import Category
+from zai_project import views
+
+QUERY = '{ allCategories { id name } }'
+HASH = hashlib.sha256(QUERY.encode()).hexdigest()
+
+
+class GraphQLDocumentCacheTestCase(TestCase):
+    def graphene_settings(self, **overrides):
+        return self.settings(GRAPHENE=dict(settings.GRAPHENE, **overrides))
+
+    def setUp(self):
+        views.document_cache.clear()
+        cache.clear()
+        Category.objects.create(name='Electronics')
+
+    def post(self, body):
+        return self.client.post('/graphql/', json.dumps(body), content_type='application/json')
+
+    def persisted(self, query=None):
+        body = {'extensions': {'persistedQuery': {'version': 1, 'sha256Hash': HASH}}}
+        if query:
+            body['query'] = query
+        return body
+
+    def test_query_parsed_and_validated_once(self):
+        with mock.patch('zai_project.views.parse', wraps=views.parse) as parse, \
+                mock.patch('zai_project.views.validate', wraps=views.validate) as validate:
+            for _ in range(3):
+                self.assertEqual(self.post({'query': QUERY}).json()['data']['allCategories'][0]['name'], 'Electronics')
+        self.assertEqual((parse.call_count, validate.call_count), (1, 1))
+
+    def test_cached_validation_errors(self):
+        for _ in range(2):
+            resp = self.post({'query': '{ allCategories { missing } }'})
+            self.assertEqual(resp.status_code, 400)
+            self.assertIn('missing', resp.json()['errors'][0]['message'])
+
+    def test_lru_evicts_oldest(self):
+        with self.graphene_settings(DOCUMENT_CACHE_SIZE=2):
+            for query in (QUERY, '{ allTags { id } }', '{ allTags { name } }'):
+                self.post({'query': query})
+            self.assertEqual(len(views.document_cache._entries), 2)
+
+    def test_automatic_persisted_query(self):
+        resp = self.post(self.persisted())
+        self.assertEqual(resp.json()['errors'][0]['extensions']['code'], 'PERSISTED_QUERY_NOT_FOUND')
+
+        self.assertNotIn('errors', self.post(self.persisted(QUERY)).json())
+        data = self.post(self.persisted()).json()
+        self.assertEqual(data['data']['allCategories'][0]['name'], 'Electronics')
+
+    def test_persisted_query_storage_is_bounded(self):
+        with mock.patch('zai_project.views.cache.set', wraps=cache.set) as cache_set:
+            self.post(self.persisted(QUERY))
+        self.assertEqual(cache_set.call_args.args[2], 24 * 60 * 60)
+
+        with self.graphene_settings(PERSISTED_QUERY_MAX_SIZE=len(QUERY) - 1):
+            cache.clear()
+            data = self.post(self.persisted(QUERY)).json()
+            self.assertEqual(data['data']['allCategories'][0]['name'], 'Electronics')
+            resp = self.post(self.persisted())
+        self.assertEqual(resp.json()['errors'][0]['extensions']['code'], 'PERSISTED_QUERY_NOT_FOUND')
+
+    def test_hash_mismatch_rejected(self):
+        resp = self.post(self.persisted('{ allTags { id } }'))
+        self.assertEqual(resp.json()['errors'][0]['extensions']['code'], 'BAD_PERSISTED_QUERY')
+
+    def test_persisted_get_is_http_cacheable(self):
+        self.post(self.persisted(QUERY))
+        params = {'extensions': json.dumps(self.persisted()['extensions'])}
+        resp = self.client.get('/graphql/', params, HTTP_ACCEPT='application/json')
+        self.assertEqual(resp.status_code, 200)
+        self.assertIn('public', resp['Cache-Control'])
+        self.assertIn('max-age=60', resp['Cache-Control'])
+
+        again = self.client.get('/graphql/', params, HTTP_ACCEPT='application/json', HTTP_IF_NONE_MATCH=resp['ETag'])
+        self.assertEqual(again.status_code, 304)
+
+        self.client.force_login(User.objects.create_user(username='u', password='p'))
+        self.assertIn('private', self.client.get('/graphql/', params, HTTP_ACCEPT='application/json')['Cache-Control'])
+
+    def test_get_mutation_still_rejected(self):
+        resp = self.client.get('/graphql/', {'query': 'mutation { deleteTag(id: 1) { ok } }'}, HTTP_ACCEPT='application/json')
+        self.assertEqual(resp.status_code, 405)
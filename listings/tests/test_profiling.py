@@ -0,0 +1,106 @@
+import json
+import tempfile
+from asgiref.sync import async_to_sync
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import AsyncClient, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APITestCase
+from listings import profiling
+from listings.models import Category, Listing
+from listings.tests.utils import make_image_file
+
+PROFILED = {'ENABLED': True, 'SERVER_TIMING': True, 'SLOW_QUERY_MS': 1000}
+
+
+def timings(response):
+    """{'db': (duration, description), ...} from the Server-Timing header."""
+    entries = {}
+    for entry in response['Server-Timing'].split(', '):
+        name, *params = entry.split(';')
+        params = dict(param.split('=', 1) for param in params)
+        entries[name] = (float(params['dur']), params.get('desc', '').strip('"'))
+    return entries
+
+
+class ProfilingTestCase(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='user1', password='pass')
+        cat = Category.objects.create(name='Electronics')
+        for i in range(3):
+            Listing.objects.create(title=f'Ad {i}', description='D', price=i, author=self.user, category=cat)
+        self.client.force_authenticate(self.user)
+
+    @override_settings(LISTINGS_PROFILING=PROFILED)
+    def test_rest_request_reports_timings_and_logs(self):
+        with self.assertLogs('listings.profiling', 'INFO') as logs:
+            with CaptureQueriesContext(connection) as ctx:
+                resp = self.client.get(reverse('listing-list'))
+        entries = timings(resp)
+        self.assertEqual(entries['db'][1], f'{len(ctx.captured_queries)} queries')
+        self.assertGreater(entries['serialize'][0], 0)
+        self.assertGreaterEqual(entries['total'][0], entries['db'][0])
+
+        record, = logs.records
+        self.assertEqual(record.origin, 'ListingViewSet.list')
+        self.assertEqual(record.queries, len(ctx.captured_queries))
+        self.assertEqual(record.status, 200)
+        self.assertIn('GET /api/listings/ 200 origin=ListingViewSet.list', record.getMessage())
+
+    @override_settings(LISTINGS_PROFILING=PROFILED)
+    def test_async_view_counts_queries_from_worker_threads(self):
+        # Opened before the override; with profiling on from startup, connection_created instruments it.
+        profiling.instrument(connection)
+        client = AsyncClient()
+        client.force_login(self.user)
+        with self.assertLogs('listings.profiling', 'INFO') as logs:
+            resp = async_to_sync(client.get)(reverse('async-listing-list'))
+        self.assertEqual(resp.status_code, 200)
+        self.assertGreater(logs.records[0].queries, 0)
+        self.assertEqual(timings(resp)['db'][1], f'{logs.records[0].queries} queries')
+        self.assertIn('serialize', timings(resp))
+
+    @override_settings(
+        LISTINGS_PROFILING=PROFILED,
+        LISTINGS_JOBS={'BACKEND': 'listings.jobs.backends.ImmediateBackend'},
+        MEDIA_ROOT=tempfile.mkdtemp(),
+    )
+    def test_image_upload_reports_pillow_time(self):
+        data = {'title': 'With image', 'description': 'D', 'price': '1.00', 'category': 'Electronics',
+                'image': make_image_file()}
+        with self.assertLogs('listings.profiling', 'INFO'):
+            resp = self.client.post(reverse('listing-list'), data, format='multipart')
+        self.assertEqual(resp.status_code, 201)
+        self.assertGreater(timings(resp)['pillow'][0], 0)
+
+    @override_settings(LISTINGS_PROFILING=dict(PROFILED, SLOW_QUERY_MS=0))
+    def test_slow_queries_name_their_resolver(self):
+        self.client.force_login(self.user)
+        with self.assertLogs('listings.profiling', 'WARNING') as logs:
+            resp = self.client.post(
+                '/graphql/', json.dumps({'query': '{ allListings { edges { node { title } } } }'}),
+                content_type='application/json',
+            )
+        self.assertNotIn('errors', resp.json())
+        origins = {record.origin for record in logs.records if record.levelname == 'WARNING'}
+        self.assertIn('CachedGraphQLView > Query.allListings', origins)
+        self.assertIn('serialize', timings(resp))
+
+    @override_settings(LISTINGS_PROFILING=dict(PROFILED, SLOW_QUERY_MS=0))
+    def test_nested_origin(self):
+        listing = Listing.objects.first()
+        with self.assertLogs('listings.profiling', 'WARNING') as logs:
+            with profiling.profile_request() as profile:
+                profiling.set_view('view')
+                listing.save()
+        self.assertTrue(all(record.origin == 'view > Listing.save' for record in logs.records))
+        self.assertEqual(profile.queries, len(logs.records))
+
+    def test_disabled_adds_nothing(self):
+        with self.assertNoLogs('listings.profiling'):
+            resp = self.client.get(reverse('listing-list'))
+        self.assertFalse(resp.has_header('Server-Timing'))
+        self.assertFalse(profiling.active())
+        with profiling.timed('pillow'), profiling.origin('x'):
+            pass
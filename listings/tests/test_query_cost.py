@@ -0,0 +1,62 @@
+import json
+from django.conf import settings
+from django.test import TestCase
+from listings.models import Category
+from zai_project import views
+
+NESTED = '{ allCategories { listings { category { listings { tags { listings { id } } } } } } }'
+
+
+class QueryCostTestCase(TestCase):
+    def graphene_settings(self, **overrides):
+        return self.settings(GRAPHENE=dict(settings.GRAPHENE, **overrides))
+
+    def setUp(self):
+        views.document_cache.clear()
+        Category.objects.create(name='Electronics')
+
+    def post(self, query, **extra):
+        return self.client.post('/graphql/', json.dumps(dict({'query': query}, **extra)), content_type='application/json')
+
+    def test_cost_reported_in_extensions(self):
+        data = self.post('{ allListings(first: 10) { edges { node { id author { username } category { name } tags { name } } } } }').json()
+        self.assertNotIn('errors', data)
+        # allListings + edges + 10 × (node, author, category, tags)
+        self.assertEqual(data['extensions']['cost']['requested'], 42)
+        self.assertEqual(data['extensions']['cost']['depth'], 5)
+
+    def test_cyclic_query_rejected_without_touching_database(self):
+        with self.assertNumQueries(0):
+            resp = self.post(NESTED)
+        self.assertEqual(resp.status_code, 400)
+        self.assertEqual(resp.json()['errors'][0]['extensions']['code'], 'QUERY_TOO_COMPLEX')
+
+    def test_depth_limit(self):
+        with self.graphene_settings(QUERY_COST={'MAX_DEPTH': 3, 'MAX_COST': 10 ** 9}):
+            resp = self.post(NESTED)
+        self.assertEqual(resp.json()['errors'][0]['extensions']['code'], 'QUERY_TOO_DEEP')
+
+    def test_field_costs_and_variables(self):
+        query = 'query Feed($n: Int = 5) { allListings(first: $n) { edges { node { id } } } }'
+        # Variable page sizes are priced at MAX_LIST_SIZE whatever their default.
+        self.assertEqual(self.post(query).json()['extensions']['cost']['requested'], 102)
+        with self.graphene_settings(QUERY_COST={'FIELD_COSTS': {'ListingType.id': 1}}):
+            self.assertEqual(self.post(query).json()['extensions']['cost']['requested'], 202)
+
+    def test_variable_page_size_cannot_exceed_limit_through_small_default(self):
+        query = 'query Feed($n: Int = 1) { allListings(first: $n) { edges { node { id author { username } } } } }'
+        with self.graphene_settings(QUERY_COST={'MAX_COST': 50}):
+            self.assertEqual(self.post('{ allListings(first: 1) { edges { node { id author { username } } } } }').status_code, 200)
+            for variables in ({'n': 100}, {}):
+                with self.assertNumQueries(0):
+                    resp = self.post(query, variables=variables)
+                self.assertEqual(resp.status_code, 400)
+                self.assertEqual(resp.json()['errors'][0]['extensions']['code'], 'QUERY_TOO_COMPLEX')
+
+    def test_fragments_counted(self):
+        query = '{ allCategories { ...C } } fragment C on CategoryType { listings { category { listings { category { listings { id } } } } } }'
+        self.assertEqual(self.post(query).json()['errors'][0]['extensions']['code'], 'QUERY_TOO_COMPLEX')
+
+    def test_introspection_allowed(self):
+        data = self.post('{ __schema { types { name fields { name type { name ofType { name ofType { name } } } } } } }').json()
+        self.assertNotIn('errors', data)
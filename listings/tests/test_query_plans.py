@@ -0,0 +1,64 @@
+from itertools import combinations
+
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import TestCase
+from rest_framework.test import APIRequestFactory
+from listings.api.views import ListingViewSet
+from listings.models import Category, Listing, Tag
+from listings.pagination import Keyset, keyset_ordering
+
+
+class ListingFeedQueryPlanTestCase(TestCase):
+    """
+    EXPLAIN QUERY PLAN for every ListingViewSet filter combination and
+    ordering, on the first page and on a cursor page. No plan may read a
+    whole table; without `tags` (an M2M join) the page must also come out of
+    an index in order, with no sort.
+    """
+    def setUp(self):
+        user = User.objects.create_user(username='user1')
+        category = Category.objects.create(name='Books')
+        tag = Tag.objects.create(name='Sale')
+        self.listing = Listing.objects.create(
+            title='Ad', description='D', price=1, author=user, category=category, status='APPROVED'
+        )
+        self.values = {'status': 'APPROVED', 'category': category.pk, 'tags': tag.pk, 'author': user.pk}
+
+    def page_queryset(self, params, cursor):
+        view = ListingViewSet(action_map={'get': 'list'}, args=(), kwargs={}, format_kwarg=None)
+        view.request = view.initialize_request(APIRequestFactory().get('/api/listings/', params))
+        queryset = view.filter_queryset(view.get_queryset())
+        keyset = Keyset(queryset.model, keyset_ordering(queryset))
+        values = keyset.values_for(self.listing) if cursor else None
+        return keyset._page_queryset(queryset, 20, values, True)
+
+    def plan(self, queryset):
+        sql, params = queryset.query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute('EXPLAIN QUERY PLAN ' + sql, params)
+            return [row[3] for row in cursor.fetchall()]
+
+    def combinations(self):
+        fields = ListingViewSet.filterset_fields
+        orderings = [None] + [prefix + field for field in ListingViewSet.ordering_fields for prefix in ('', '-')]
+        for size in range(len(fields) + 1):
+            for filters in combinations(fields, size):
+                for ordering in orderings:
+                    params = {name: self.values[name] for name in filters}
+                    if ordering:
+                        params['ordering'] = ordering
+                    yield params
+
+    def test_no_filter_and_order_combination_scans_the_table(self):
+        for params in self.combinations():
+            for cursor in (False, True):
+                with self.subTest(params=params, cursor=cursor):
+                    plan = self.plan(self.page_queryset(params, cursor))
+                    sorts = 'USE TEMP B-TREE FOR ORDER BY' in plan
+                    for step in plan:
+                        self.assertFalse(step.startswith('SCAN ') and ' USING ' not in step, plan)
+                        # Walking a whole index is only bounded when it yields rows in order.
+                        self.assertFalse(step.startswith('SCAN ') and sorts, plan)
+                    if 'tags' not in params:
+                        self.assertFalse(sorts, plan)
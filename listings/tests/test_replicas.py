@@ -0,0 +1,124 @@
+import io
+import os
+import sqlite3
+import tempfile
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.db import connections, transaction
+from django.test import TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from graphql_jwt.shortcuts import get_token
+from rest_framework.test import APIClient
+
+from listings.db import ReplicaRouter, backup_sqlite, replica_reads
+from listings.models import Category, Listing
+
+REPLICAS = {'ALIASES': ['replica'], 'STICKY_SECONDS': 5}
+
+
+@override_settings(LISTINGS_REPLICAS=REPLICAS)
+class ReplicaRoutingTestCase(TransactionTestCase):
+    databases = {'default', 'replica'}
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='user1', password='pass')
+        self.category = Category.objects.create(name='Books')
+        Listing.objects.create(title='Ad', description='Desc', price=Decimal(10), author=self.user, category=self.category)
+        self.client = APIClient()
+        resp = self.client.post(reverse('token_obtain_pair'), {'username': 'user1', 'password': 'pass'}, format='json')
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {resp.data['access']}")
+        # Logging in wrote last_login; start each test unpinned.
+        cache.clear()
+        self.client.cookies.clear()
+
+    def request(self, method, *args, **kwargs):
+        """(response, queries on the primary, queries on the replica)."""
+        with CaptureQueriesContext(connections['default']) as primary, \
+                CaptureQueriesContext(connections['replica']) as replica:
+            response = getattr(self.client, method)(*args, **kwargs)
+        return response, len(primary), len(replica)
+
+    def test_safe_requests_read_from_replica(self):
+        resp, primary, replica = self.request('get', reverse('listing-list'))
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(primary, 0)
+        self.assertGreater(replica, 0)
+
+    def test_client_reads_its_writes_from_primary(self):
+        data = {'title': 'New', 'description': 'Desc', 'price': '5.00', 'category': 'Books'}
+        resp, primary, replica = self.request('post', reverse('listing-list'), data, format='json')
+        self.assertEqual(resp.status_code, 201)
+        self.assertEqual(replica, 0)
+
+        resp, primary, replica = self.request('get', reverse('listing-detail', args=[resp.data['id']]))
+        self.assertEqual(resp.status_code, 200)
+        self.assertGreater(primary, 0)
+        self.assertEqual(replica, 0)
+
+        # A client without the cookie is still pinned through the cache.
+        self.client.cookies.clear()
+        self.assertEqual(self.request('get', reverse('listing-list'))[2], 0)
+        cache.clear()
+        self.assertGreater(self.request('get', reverse('listing-list'))[2], 0)
+
+    def test_graphql_queries_read_from_replica_and_mutations_write_to_primary(self):
+        query = {'query': '{ allListings(first: 5) { edges { node { title } } } }'}
+        resp, primary, replica = self.request('post', '/graphql/', query, format='json')
+        self.assertEqual(len(resp.json()['data']['allListings']['edges']), 1)
+        self.assertEqual(primary, 0)
+        self.assertGreater(replica, 0)
+
+        mutation = {'query': 'mutation { deleteListing(id: %d) { ok } }' % Listing.objects.get().pk}
+        self.client.credentials(HTTP_AUTHORIZATION=f'JWT {get_token(self.user)}')
+        resp, primary, replica = self.request('post', '/graphql/', mutation, format='json')
+        self.assertNotIn('errors', resp.json())
+        self.assertGreater(primary, 0)
+        self.assertEqual(replica, 0)
+        self.assertFalse(Listing.objects.exists())
+
+    def test_router(self):
+        router = ReplicaRouter()
+        self.assertIsNone(router.db_for_read(Listing))
+        with replica_reads():
+            self.assertEqual(router.db_for_read(Listing), 'replica')
+            self.assertEqual(router.db_for_write(Listing), 'default')
+            with transaction.atomic():
+                self.assertEqual(router.db_for_read(Listing), 'default')
+        self.assertFalse(router.allow_migrate('replica', 'listings'))
+        self.assertIsNone(router.allow_migrate('default', 'listings'))
+
+    @override_settings(LISTINGS_REPLICAS={'ALIASES': []})
+    def test_disabled_without_aliases(self):
+        resp, primary, replica = self.request('get', reverse('listing-list'))
+        self.assertGreater(primary, 0)
+        self.assertEqual(replica, 0)
+
+
+class SyncReplicaTestCase(TransactionTestCase):
+    def test_backup_copies_primary_into_live_replica(self):
+        directory = tempfile.mkdtemp()
+        source_path, replica_path = os.path.join(directory, 'primary.sqlite3'), os.path.join(directory, 'replica.sqlite3')
+        wrapper = connections['default'].__class__(dict(connections.settings['default'], NAME=source_path), 'primary')
+        self.addCleanup(wrapper.close)
+        with wrapper.cursor() as cursor:
+            cursor.execute('CREATE TABLE ad (title TEXT)')
+            cursor.execute("INSERT INTO ad VALUES ('one')")
+
+        backup_sqlite(wrapper, replica_path)
+        reader = sqlite3.connect(replica_path)
+        self.addCleanup(reader.close)
+        self.assertEqual(reader.execute('SELECT COUNT(*) FROM ad').fetchone()[0], 1)
+
+        with wrapper.cursor() as cursor:
+            cursor.execute("INSERT INTO ad VALUES ('two')")
+        backup_sqlite(wrapper, replica_path)
+        self.assertEqual(reader.execute('SELECT COUNT(*) FROM ad').fetchone()[0], 2)
+
+    def test_command_requires_replicas(self):
+        with self.assertRaisesMessage(CommandError, 'No replicas configured'):
+            call_command('sync_replica', stdout=io.StringIO())
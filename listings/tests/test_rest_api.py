@@ -1,8 +1,13 @@
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
+from django.utils import timezone
+from datetime import timedelta
 from rest_framework.test import APITestCase
 from django.contrib.auth.models import User, Group
 from rest_framework import status
 from listings.models import Category, Tag, Listing, Profile
+from listings.tests.utils import create_listings
 
 
 class ListingAPITestCase(APITestCase):
@@ -136,8 +141,8 @@ class ListingFilterTestCase(APITestCase):
         resp = self.client.get(url, format='json')
         self.assertEqual(resp.status_code, status.HTTP_200_OK)
         data = resp.json()
-        self.assertEqual(data['count'], 1)
         self.assertEqual(len(data['results']), 1)
+        self.assertIsNone(data['next'])
         self.assertEqual(data['results'][0]['status'], 'APPROVED')
         self.assertEqual(data['results'][0]['title'], 'Approved Ad')
 
@@ -189,4 +194,84 @@ class ListingAdvancedFilteringTestCase(APITestCase):
         url = reverse('listing-list')
         resp = self.client.get(url)
         self.assertEqual(resp.status_code, 200)
-        self.assertEqual(len(resp.json()['results']), 5)
\ No newline at end of file
+        self.assertEqual(len(resp.json()['results']), 5)
+
+
+class ListingQueryCountTestCase(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='user1', password='pass')
+        self.cats = [Category.objects.create(name=f'Cat {i}') for i in range(3)]
+        self.tags = [Tag.objects.create(name=f'Tag {i}') for i in range(3)]
+
+    def create_listings(self, count):
+        create_listings(count, self.cats, self.tags, status='APPROVED')
+
+    def count_list_queries(self):
+        with CaptureQueriesContext(connection) as ctx:
+            resp = self.client.get(reverse('listing-list'))
+        self.assertEqual(resp.status_code, 200)
+        return len(ctx.captured_queries), len(resp.json()['results'])
+
+    def test_query_count_independent_of_page_size(self):
+        self.create_listings(1)
+        queries_one, rows_one = self.count_list_queries()
+        self.create_listings(10)
+        queries_full, rows_full = self.count_list_queries()
+
+        self.assertEqual((rows_one, rows_full), (1, 5))
+        self.assertEqual(queries_one, queries_full)
+        # Freshness aggregate and latest expiry, the listing page with author/category joined and one tag prefetch.
+        self.assertEqual(queries_full, 4)
+
+
+
+class ListingKeysetPaginationTestCase(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='user1', password='pass')
+        self.cat = Category.objects.create(name='Electronics')
+        created = timezone.now()
+        # Shared timestamps and prices exercise the id tie-breaker.
+        for i in range(12):
+            Listing.objects.create(
+                title=f'Ad {i}', description='Desc', price=i % 4, author=self.user,
+                category=self.cat, created_at=created - timedelta(hours=i // 3)
+            )
+
+    def walk(self, url):
+        titles, pages = [], 0
+        while url:
+            resp = self.client.get(url)
+            self.assertEqual(resp.status_code, 200)
+            titles += [item['title'] for item in resp.json()['results']]
+            url, pages = resp.json()['next'], pages + 1
+        return titles, pages
+
+    def test_pages_follow_default_ordering_without_gaps(self):
+        titles, pages = self.walk(reverse('listing-list'))
+        expected = list(Listing.objects.order_by('-created_at', '-id').values_list('title', flat=True))
+        self.assertEqual(titles, expected)
+        self.assertEqual(pages, 3)
+
+    def test_pages_follow_requested_ordering(self):
+        titles, _ = self.walk(reverse('listing-list') + '?ordering=price&page_size=4')
+        expected = list(Listing.objects.order_by('price', 'id').values_list('title', flat=True))
+        self.assertEqual(titles, expected)
+
+    def test_previous_link_returns_preceding_page(self):
+        first = self.client.get(reverse('listing-list')).json()
+        self.assertIsNone(first['previous'])
+        second = self.client.get(first['next']).json()
+        back = self.client.get(second['previous']).json()
+        self.assertEqual(back['results'], first['results'])
+
+    def test_deep_page_has_no_count_or_offset(self):
+        url = self.client.get(reverse('listing-list')).json()['next']
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.get(url)
+        sql = ' '.join(q['sql'] for q in ctx.captured_queries)
+        self.assertNotIn('COUNT(', sql)
+        self.assertNotIn('OFFSET', sql)
+
+    def test_invalid_cursor(self):
+        resp = self.client.get(reverse('listing-list') + '?cursor=garbage')
+        self.assertEqual(resp.status_code, 404)
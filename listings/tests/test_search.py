@@ -0,0 +1,121 @@
+import io
+import json
+from unittest import mock
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APITestCase
+from listings.models import Listing, Category
+from listings.search import get_backend
+
+
+class FullTextSearchTestCase(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='user1', password='pass')
+        self.cat = Category.objects.create(name='Electronics')
+        self.bike = self.create('Mountain bicycle', 'Aluminium frame, barely used.')
+        self.phone = self.create('Smartphone', 'Comes with a bicycle phone holder.')
+        self.lamp = self.create('Desk lamp', 'Zażółć gęślą jaźń')
+
+    def create(self, title, description):
+        return Listing.objects.create(
+            title=title, description=description, price=1, author=self.user, category=self.cat
+        )
+
+    def search(self, query):
+        return set(get_backend().filter(Listing.objects.all(), query))
+
+    def test_prefix_and_all_terms(self):
+        self.assertEqual(self.search('bicyc'), {self.bike, self.phone})
+        self.assertEqual(self.search('bicycle holder'), {self.phone})
+        self.assertEqual(self.search('gesla'), {self.lamp})
+
+    def test_ranking_prefers_title_matches(self):
+        ranked = list(get_backend().ranked(Listing.objects.all(), 'bicycle'))
+        self.assertEqual(ranked, [self.bike, self.phone])
+
+    def test_index_follows_updates_and_deletes(self):
+        self.lamp.title = 'Floor lamp'
+        self.lamp.save()
+        self.assertEqual(self.search('floor'), {self.lamp})
+        self.assertEqual(self.search('desk'), set())
+        self.bike.delete()
+        self.assertEqual(self.search('bicycle'), {self.phone})
+
+    def test_quotes_and_operators_are_literal(self):
+        self.assertEqual(self.search('"bicycle" OR NOT*'), set())
+        self.assertEqual(self.search('mountain-bicycle'), {self.bike})
+
+    def test_rebuild_command(self):
+        with connection.cursor() as cursor:
+            cursor.execute("DELETE FROM listings_listing_fts")
+        call_command('rebuild_search_index', stdout=io.StringIO())
+        self.assertEqual(self.search('lamp'), {self.lamp})
+
+    def test_rest_search(self):
+        resp = self.client.get(reverse('listing-list') + '?search=bicyc')
+        titles = {item['title'] for item in resp.json()['results']}
+        self.assertEqual(titles, {'Mountain bicycle', 'Smartphone'})
+
+    def test_rest_search_is_ranked(self):
+        url = reverse('listing-list')
+        titles = [item['title'] for item in self.client.get(url, {'search': 'bicycle'}).json()['results']]
+        self.assertEqual(titles, ['Mountain bicycle', 'Smartphone'])
+        # An explicit ordering wins over relevance.
+        resp = self.client.get(url, {'search': 'bicycle', 'ordering': '-created_at'})
+        self.assertEqual([item['title'] for item in resp.json()['results']], ['Smartphone', 'Mountain bicycle'])
+
+        first = self.client.get(url, {'search': 'bicycle', 'page_size': 1}).json()
+        second = self.client.get(first['next']).json()
+        self.assertEqual([item['title'] for item in first['results'] + second['results']], titles)
+        self.assertIsNone(second['next'])
+        previous = self.client.get(second['previous']).json()
+        self.assertEqual([item['title'] for item in previous['results']], titles[:1])
+
+    @override_settings(LISTINGS_SEARCH={'BACKEND': 'listings.search.backends.LikeSearchBackend'})
+    def test_like_backend(self):
+        self.assertEqual(self.search('bicycle holder'), {self.phone})
+
+
+class GraphQLSearchTestCase(TestCase):
+    def test_search_listings_ranked(self):
+        user = User.objects.create_user(username='user1', password='pass')
+        for title, description in [('Guitar strap', 'For an acoustic guitar'), ('Acoustic guitar', 'Spruce top')]:
+            Listing.objects.create(title=title, description=description, price=1, author=user)
+        query = '{ searchListings(query: "acoustic guit") { title } }'
+        resp = self.client.post('/graphql/', json.dumps({'query': query}), content_type='application/json')
+        titles = [item['title'] for item in resp.json()['data']['searchListings']]
+        self.assertEqual(titles, ['Acoustic guitar', 'Guitar strap'])
+
+    def test_search_listings_first(self):
+        user = User.objects.create_user(username='user1', password='pass')
+        for i in range(3):
+            Listing.objects.create(title=f'Guitar {i}', description='D', price=1, author=user)
+
+        def search(first):
+            query = 'query($first: Int) { searchListings(query: "guitar", first: $first) { title } }'
+            body = {'query': query, 'variables': {'first': first}}
+            return self.client.post('/graphql/', json.dumps(body), content_type='application/json').json()
+        self.assertEqual(len(search(None)['data']['searchListings']), 3)
+        self.assertEqual(len(search(2)['data']['searchListings']), 2)
+        self.assertEqual(len(search(10 ** 6)['data']['searchListings']), 3)
+        self.assertEqual(search(-1)['errors'][0]['message'], "'first' must be non-negative")
+
+
+class FullTextMigrationTestCase(TransactionTestCase):
+    def triggers(self):
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT name FROM sqlite_master WHERE type = 'trigger' AND name LIKE 'listings_listing_fts_%'")
+            return {name for name, in cursor.fetchall()}
+
+    def test_unapplying_table_rebuilds_keeps_triggers(self):
+        expected = {'listings_listing_fts_ai', 'listings_listing_fts_ad', 'listings_listing_fts_au'}
+        self.addCleanup(call_command, 'migrate', 'listings', verbosity=0)
+        # SQLite before 3.35.5 has no DROP COLUMN, so removing favorite_count rebuilds the table.
+        with mock.patch.object(connection.features, 'can_alter_table_drop_column', False):
+            call_command('migrate', 'listings', '0011', verbosity=0)
+        self.assertEqual(self.triggers(), expected)
+        call_command('migrate', 'listings', verbosity=0)
+        self.assertEqual(self.triggers(), expected)
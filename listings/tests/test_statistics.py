@@ -0,0 +1,83 @@
+import io
+from datetime import timedelta
+from decimal import Decimal
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db.models import Avg, Count
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APITestCase
+from listings.models import Listing, Category, ListingStat
+from listings import stats
+
+
+class ListingStatisticsTestCase(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='user1', password='pass')
+        self.client.force_authenticate(self.user)
+        self.books = Category.objects.create(name='Books')
+        self.toys = Category.objects.create(name='Toys')
+        Category.objects.create(name='Empty')
+        now = timezone.now()
+        for i in range(6):
+            Listing.objects.create(
+                title=f'Ad {i}', description='D', price=Decimal(10 * (i + 1)), author=self.user,
+                category=self.books if i % 2 else self.toys, created_at=now - timedelta(days=i % 3),
+                status='APPROVED' if i < 4 else 'PENDING',
+            )
+
+    def expected(self):
+        return {
+            'total_listings': Listing.objects.count(),
+            'average_price': Listing.objects.aggregate(avg=Avg('price'))['avg'],
+            'listings_by_category': list(Category.objects.annotate(count=Count('listings')).values('name', 'count')),
+            'listings_by_status': list(
+                Listing.objects.values('status').annotate(count=Count('id')).order_by('status')
+            ),
+        }
+
+    def assertMatchesAggregates(self):
+        data = stats.snapshot()
+        expected = self.expected()
+        self.assertAlmostEqual(float(data.pop('average_price') or 0), float(expected.pop('average_price') or 0))
+        self.assertEqual(data, expected)
+
+    def test_counters_follow_creates_updates_and_deletes(self):
+        self.assertMatchesAggregates()
+        listing = Listing.objects.filter(status='PENDING').first()
+        listing.status = 'APPROVED'
+        listing.category = self.books
+        listing.price = Decimal('99.99')
+        listing.save()
+        self.assertMatchesAggregates()
+
+        Listing.objects.first().delete()
+        self.assertMatchesAggregates()
+
+        self.toys.delete()
+        self.assertFalse(ListingStat.objects.filter(group='category', key=str(self.toys.pk)).exists())
+
+    def test_endpoint_query_count_is_constant(self):
+        url = reverse('listing-statistics')
+        with self.assertNumQueries(2):
+            resp = self.client.get(url)
+        for i in range(5):
+            Listing.objects.create(title=f'More {i}', description='D', price=1, author=self.user)
+        with self.assertNumQueries(2):
+            resp = self.client.get(url)
+        self.assertEqual(resp.data['total_listings'], 11)
+
+    def test_daily_series(self):
+        resp = self.client.get(reverse('listing-statistics') + '?days=4')
+        series = resp.data['listings_per_day']
+        self.assertEqual([row['count'] for row in series], [0, 2, 2, 2])
+        self.assertEqual(series[-1]['date'], timezone.localdate().isoformat())
+
+        resp = self.client.get(reverse('listing-statistics') + '?days=0')
+        self.assertEqual(resp.status_code, 400)
+
+    def test_rebuild_repairs_drift(self):
+        ListingStat.objects.filter(group='total').update(count=1000)
+        Listing.objects.filter(status='PENDING').update(status='REJECTED')
+        call_command('rebuild_listing_stats', stdout=io.StringIO())
+        self.assertMatchesAggregates()
@@ -0,0 +1,82 @@
+import io
+import json
+import os
+import tempfile
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db.models import Count
+from django.test import TestCase
+from listings import stats
+from listings.models import Listing, ListingStat
+from listings.search import get_backend
+
+
+def seed(**options):
+    defaults = {'users': 20, 'categories': 4, 'tags': 10, 'listings': 60, 'batch_size': 25}
+    call_command('seed_data', stdout=io.StringIO(), **dict(defaults, **options))
+
+
+class SeedDataCommandTestCase(TestCase):
+    def test_creates_consistent_data(self):
+        seed()
+        self.assertEqual(User.objects.filter(username__startswith='seed-').count(), 20)
+        self.assertEqual(Listing.objects.count(), 60)
+
+        # Denormalized values the signals would normally maintain.
+        counted = Listing.objects.annotate(fans=Count('favorited_by')).values_list('favorite_count', 'fans')
+        self.assertTrue(all(stored == actual for stored, actual in counted))
+        self.assertEqual(stats.snapshot()['total_listings'], 60)
+        self.assertTrue(ListingStat.objects.filter(group='day').exists())
+        word = Listing.objects.first().title.split()[0]
+        self.assertTrue(get_backend().filter(Listing.objects.all(), word).exists())
+
+    def test_same_seed_same_listings(self):
+        seed(prefix='a')
+        first = list(Listing.objects.order_by('pk').values_list('title', 'price', 'status'))
+        Listing.objects.all().delete()
+        seed(prefix='b')
+        self.assertEqual(list(Listing.objects.order_by('pk').values_list('title', 'price', 'status')), first)
+
+    def test_refuses_existing_prefix(self):
+        seed()
+        with self.assertRaises(CommandError):
+            seed()
+
+
+class BenchmarkApiCommandTestCase(TestCase):
+    def setUp(self):
+        seed()
+        self.output = os.path.join(tempfile.mkdtemp(), 'baseline.json')
+
+    def benchmark(self, **options):
+        out = io.StringIO()
+        call_command('benchmark_api', requests=3, warmup=1, stdout=out, **options)
+        return out.getvalue()
+
+    def test_reports_every_scenario_as_json(self):
+        self.benchmark(output=self.output)
+        with open(self.output) as f:
+            results = json.load(f)['scenarios']
+        self.assertIn('rest:listings', results)
+        self.assertIn('rest:statistics', results)
+        self.assertIn('graphql:allListings', results)
+        for name, result in results.items():
+            self.assertEqual(result['requests'], 3, name)
+            self.assertLessEqual(result['p50_ms'], result['p99_ms'], name)
+            self.assertGreater(result['queries_per_request'], 0, name)
+        self.assertEqual(results['rest:listings']['errors'], 0)
+        self.assertEqual(results['graphql:allListings']['errors'], 0)
+
+    def test_fails_on_query_count_regression(self):
+        self.benchmark(output=self.output, scenario=['rest:listings'])
+        with open(self.output) as f:
+            baseline = json.load(f)
+        self.assertIn('No regressions', self.benchmark(baseline=self.output, scenario=['rest:listings'], tolerance=100))
+
+        baseline['scenarios']['rest:listings']['queries_per_request'] -= 1
+        with open(self.output, 'w') as f:
+            json.dump(baseline, f)
+        with self.assertRaisesMessage(CommandError, 'rest:listings'):
+            self.benchmark(baseline=self.output, scenario=['rest:listings'], tolerance=100)
@@ -0,0 +1,80 @@
+import json
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from listings import taxonomy
+from listings.models import Category, Listing, Tag
+
+
+class TaxonomyResolverTestCase(TestCase):
+    def setUp(self):
+        self.cat = Category.objects.create(name='Electronics')
+        self.tags = {name: Tag.objects.create(name=name) for name in ('a', 'b', 'c')}
+        self.user = User.objects.create_user(username='seller', password='pass')
+
+    def test_category_table_cached_until_write(self):
+        taxonomy.get_category('Electronics')
+        with self.assertNumQueries(0):
+            self.assertEqual(taxonomy.get_category('Electronics').pk, self.cat.pk)
+        self.cat.name = 'Phones'
+        self.cat.save()
+        with self.assertNumQueries(1):
+            self.assertEqual(taxonomy.get_category('Phones').pk, self.cat.pk)
+        self.assertIsNone(taxonomy.get_category('Electronics', create_missing=False))
+
+    def test_missing_names_created_in_bulk(self):
+        with self.assertNumQueries(3):
+            tags = taxonomy.resolve_tags(['a', 'x', 'y'])
+        self.assertEqual(sorted(tags), ['a', 'x', 'y'])
+        self.assertEqual(Tag.objects.count(), 5)
+        self.assertEqual(taxonomy.get_category('Books').name, 'Books')
+        self.assertTrue(Category.objects.filter(name='Books').exists())
+
+    def test_set_tags_writes_only_difference(self):
+        listing = Listing.objects.create(title='Ad', description='D', price=1, author=self.user)
+        listing.tags.set([self.tags['a'], self.tags['b']])
+        kept = Listing.tags.through.objects.get(listing=listing, tag=self.tags['b']).pk
+
+        with CaptureQueriesContext(connection) as ctx:
+            taxonomy.set_tags({listing.pk: {self.tags['b'].pk, self.tags['c'].pk}})
+        self.assertEqual(len(ctx.captured_queries), 3)
+        self.assertEqual(sorted(listing.tags.values_list('name', flat=True)), ['b', 'c'])
+        self.assertEqual(Listing.tags.through.objects.get(listing=listing, tag=self.tags['b']).pk, kept)
+
+        with self.assertNumQueries(1):
+            taxonomy.set_tags({listing.pk: {self.tags['b'].pk, self.tags['c'].pk}})
+
+
+class TaxonomyMutationTestCase(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='seller', password='pass')
+        Category.objects.create(name='Electronics')
+        self.client.force_login(self.user)
+
+    def mutate(self, query):
+        resp = self.client.post('/graphql/', json.dumps({'query': query}), content_type='application/json')
+        data = resp.json()
+        self.assertNotIn('errors', data)
+        return data['data']
+
+    def create(self, tags):
+        return self.mutate(
+            'mutation { createListing(title: "Ad", description: "D", price: 10, categoryName: "Electronics", '
+            f'tagNames: {json.dumps(tags)}) {{ listing {{ id }} }} }}'
+        )['createListing']['listing']['id']
+
+    def test_tag_queries_do_not_grow_with_tag_count(self):
+        self.create(['warmup'])
+        with CaptureQueriesContext(connection) as few:
+            self.create(['t1'])
+        with CaptureQueriesContext(connection) as many:
+            self.create([f't{i}' for i in range(2, 12)])
+        self.assertEqual(len(few.captured_queries), len(many.captured_queries))
+
+    def test_update_replaces_tags(self):
+        listing_id = self.create(['a', 'b'])
+        self.mutate(f'mutation {{ updateListing(id: {listing_id}, tagNames: ["b", "c"], categoryName: "Books") {{ listing {{ id }} }} }}')
+        listing = Listing.objects.get(pk=listing_id)
+        self.assertEqual(sorted(listing.tags.values_list('name', flat=True)), ['b', 'c'])
+        self.assertEqual(listing.category.name, 'Books')
@@ -1,13 +1,27 @@
 from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import IntegrityError, connection, transaction
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
 from django.urls import reverse
 from rest_framework.test import APITestCase
 from django.contrib.auth.models import User
-from listings.models import Listing, Category
+from listings import images
+from listings.jobs import get_backend
+from listings.models import Listing, Category, Job, StoredFile
+from listings.storage import ContentAddressedStorage, acquire
+from listings.tests.utils import make_image_file
 from PIL import Image
 import io
 import os
+import tempfile
+from datetime import timedelta
+from unittest import mock
 from django.conf import settings
 
+
+@override_settings(LISTINGS_JOBS={'BACKEND': 'listings.jobs.backends.ImmediateBackend'})
 class ThumbnailGenerationTestCase(APITestCase):
     def setUp(self):
         self.user = User.objects.create_user(username='user1', password='pass')
@@ -41,6 +55,8 @@ class ThumbnailGenerationTestCase(APITestCase):
 
         listing = Listing.objects.first()
         self.assertIsNotNone(listing.thumbnail)
+        self.assertEqual(listing.thumbnail_status, 'READY')
+        self.assertEqual(response.data['thumbnail_status'], 'PENDING')
 
         thumbnail_path = os.path.join(settings.MEDIA_ROOT, listing.thumbnail.name)
         self.assertTrue(os.path.exists(thumbnail_path))
@@ -48,3 +64,357 @@ class ThumbnailGenerationTestCase(APITestCase):
         thumb = Image.open(thumbnail_path)
         self.assertLessEqual(thumb.width, 200)
         self.assertLessEqual(thumb.height, 200)
+
+
+@override_settings(
+    LISTINGS_JOBS={'BACKEND': 'listings.jobs.backends.DatabaseBackend'},
+    MEDIA_ROOT=tempfile.mkdtemp(),
+)
+class DatabaseJobQueueTestCase(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='user1', password='pass')
+        self.category = Category.objects.create(name='TestCat')
+
+    def test_save_only_enqueues_thumbnail_job(self):
+        listing = Listing.objects.create(
+            title='Ad', description='Desc', price=1, author=self.user,
+            category=self.category, image=make_image_file()
+        )
+        listing.refresh_from_db()
+        self.assertEqual(listing.thumbnail_status, 'PENDING')
+        self.assertFalse(listing.thumbnail)
+        self.assertEqual(Job.objects.filter(status='QUEUED').count(), 1)
+
+        call_command('runjobs', '--once', stdout=io.StringIO())
+
+        listing.refresh_from_db()
+        self.assertEqual(listing.thumbnail_status, 'READY')
+        self.assertTrue(os.path.exists(listing.thumbnail.path))
+        self.assertEqual(Job.objects.get().status, 'DONE')
+
+    def test_listing_without_image_has_no_thumbnail_job(self):
+        listing = Listing.objects.create(
+            title='Ad', description='Desc', price=1, author=self.user, category=self.category
+        )
+        self.assertEqual(listing.thumbnail_status, 'NONE')
+        self.assertFalse(Job.objects.exists())
+
+    def test_job_of_crashed_worker_is_reclaimed(self):
+        backend = get_backend()
+        Job.objects.create(task='listings.tasks.generate_derivatives', args=[0])
+        crashed = backend.claim()
+        self.assertIsNone(backend.claim())
+
+        Job.objects.filter(pk=crashed.pk).update(lease_expires_at=timezone.now() - timedelta(seconds=1))
+        job = backend.claim()
+        self.assertEqual((job.pk, job.attempts), (crashed.pk, 2))
+        self.assertGreater(Job.objects.get().lease_expires_at, timezone.now())
+
+    def test_worker_that_lost_its_lease_keeps_off_the_job(self):
+        backend = get_backend()
+        Job.objects.create(task='listings.tasks.generate_derivatives', args=[0])
+
+        def slow_task(pk):
+            # Meanwhile the lease runs out and another worker takes the job.
+            Job.objects.update(lease_expires_at=timezone.now() - timedelta(seconds=1))
+            backend.claim()
+        with mock.patch('listings.tasks.generate_derivatives', slow_task):
+            backend.run_next()
+        job = Job.objects.get()
+        self.assertEqual((job.status, job.attempts), ('RUNNING', 2))
+
+    def test_reclaim_stops_after_max_attempts(self):
+        expired = timezone.now() - timedelta(seconds=1)
+        Job.objects.create(task='listings.tasks.generate_derivatives', args=[0], status='RUNNING',
+                           attempts=get_backend().max_attempts, lease_expires_at=expired)
+        with self.assertLogs('listings.jobs.backends', 'ERROR'):
+            self.assertIsNone(get_backend().claim())
+        job = Job.objects.get()
+        self.assertEqual((job.status, job.error), ('FAILED', 'Lease expired.'))
+
+
+@override_settings(
+    LISTINGS_JOBS={'BACKEND': 'listings.jobs.backends.ImmediateBackend'},
+    LISTINGS_IMAGE_RENDITIONS={'SIZES': [64, 200, 480, 1024], 'FORMATS': ['WEBP', 'ORIGINAL']},
+    MEDIA_ROOT=tempfile.mkdtemp(),
+)
+class RenditionsTestCase(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='user1', password='pass')
+        self.category = Category.objects.create(name='TestCat')
+
+    def test_renditions_generated_without_upscaling(self):
+        listing = Listing.objects.create(
+            title='Ad', description='Desc', price=1, author=self.user,
+            category=self.category, image=make_image_file(size=(800, 600))
+        )
+        listing.refresh_from_db()
+        self.assertEqual(set(listing.renditions), {'webp', 'jpeg'})
+        for fmt, entries in listing.renditions.items():
+            self.assertEqual([e['size'] for e in entries], [64, 200, 480])
+            for entry in entries:
+                with Image.open(os.path.join(settings.MEDIA_ROOT, entry['name'])) as img:
+                    self.assertEqual(img.format, fmt.upper())
+                    self.assertEqual(max(img.size), entry['size'])
+
+    def test_renditions_exposed_on_api(self):
+        listing = Listing.objects.create(
+            title='Ad', description='Desc', price=1, author=self.user,
+            category=self.category, image=make_image_file()
+        )
+        resp = self.client.get(reverse('listing-detail', args=[listing.pk]))
+        webp = resp.data['renditions']['webp']
+        self.assertEqual([i['size'] for i in webp['images']], [64, 200])
+        self.assertIn(' 64w, ', webp['srcset'])
+        self.assertTrue(webp['images'][0]['url'].startswith('http://testserver/media/listings/renditions/'))
+
+    def test_renditions_removed_with_listing(self):
+        listing = Listing.objects.create(
+            title='Ad', description='Desc', price=1, author=self.user,
+            category=self.category, image=make_image_file()
+        )
+        listing.refresh_from_db()
+        paths = [os.path.join(settings.MEDIA_ROOT, e['name']) for e in listing.renditions['webp']]
+        self.assertTrue(all(os.path.exists(p) for p in paths))
+        with self.captureOnCommitCallbacks(execute=True):
+            listing.delete()
+        self.assertFalse(any(os.path.exists(p) for p in paths))
+
+
+@override_settings(
+    LISTINGS_JOBS={'BACKEND': 'listings.jobs.backends.DatabaseBackend'},
+    MEDIA_ROOT=tempfile.mkdtemp(),
+)
+class ImageChangeTrackingTestCase(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='user1', password='pass')
+        self.category = Category.objects.create(name='TestCat')
+        Listing.objects.create(
+            title='Ad', description='Desc', price=1, author=self.user,
+            category=self.category, image=make_image_file()
+        )
+        call_command('runjobs', '--once', stdout=io.StringIO())
+
+    def test_save_without_image_change_is_single_update(self):
+        listing = Listing.objects.get()
+        listing.title = 'Moderated'
+        with self.assertNumQueries(1):
+            listing.save()
+        self.assertEqual(Job.objects.filter(status='QUEUED').count(), 0)
+        listing.refresh_from_db()
+        self.assertEqual(listing.title, 'Moderated')
+        self.assertEqual(listing.thumbnail_status, 'READY')
+
+    def test_save_with_deferred_image_keeps_derivatives(self):
+        listing = Listing.objects.only('title').get()
+        listing.title = 'Moderated'
+        with CaptureQueriesContext(connection) as ctx:
+            listing.save()
+        self.assertFalse([q['sql'] for q in ctx.captured_queries if 'thumbnail' in q['sql'] or 'image' in q['sql']])
+        self.assertEqual(Job.objects.filter(status='QUEUED').count(), 0)
+        listing = Listing.objects.get()
+        self.assertEqual((listing.title, listing.thumbnail_status), ('Moderated', 'READY'))
+        self.assertTrue(listing.thumbnail)
+
+        deferred = Listing.objects.defer('image').get()
+        deferred.image = make_image_file('other.jpg', color='red')
+        with self.captureOnCommitCallbacks(execute=True):
+            deferred.save()
+        self.assertEqual(Job.objects.filter(status='QUEUED').count(), 1)
+
+    def test_stale_instance_does_not_clobber_derivatives(self):
+        Listing.objects.update(thumbnail='', renditions={}, thumbnail_status='PENDING')
+        stale = Listing.objects.get()
+        Job.objects.create(task='listings.tasks.generate_derivatives', args=[stale.pk])
+        call_command('runjobs', '--once', stdout=io.StringIO())
+
+        stale.title = 'Changed'
+        stale.save()
+        listing = Listing.objects.get()
+        self.assertEqual(listing.title, 'Changed')
+        self.assertEqual(listing.thumbnail_status, 'READY')
+        self.assertTrue(listing.thumbnail)
+
+    def test_replacing_image_removes_old_files_and_requeues(self):
+        listing = Listing.objects.get()
+        old_paths = [listing.image.path, listing.thumbnail.path]
+        listing.image = make_image_file('other.jpg', color='red')
+        with self.captureOnCommitCallbacks(execute=True):
+            listing.save()
+        self.assertFalse(any(os.path.exists(p) for p in old_paths))
+        self.assertEqual(Job.objects.filter(status='QUEUED').count(), 1)
+        listing.refresh_from_db()
+        self.assertEqual(listing.thumbnail_status, 'PENDING')
+
+
+@override_settings(
+    LISTINGS_JOBS={'BACKEND': 'listings.jobs.backends.ImmediateBackend'},
+    MEDIA_ROOT=tempfile.mkdtemp(),
+)
+class ContentAddressedStorageTestCase(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='user1', password='pass')
+        self.category = Category.objects.create(name='TestCat')
+
+    def create_listing(self, name='photo.jpg'):
+        listing = Listing.objects.create(
+            title='Ad', description='Desc', price=1, author=self.user,
+            category=self.category, image=make_image_file(name)
+        )
+        listing.refresh_from_db()
+        return listing
+
+    def test_identical_uploads_share_files_and_derivatives(self):
+        first = self.create_listing('a.jpg')
+        with mock.patch('listings.tasks.build_renditions') as build:
+            second = self.create_listing('b.jpg')
+        build.assert_not_called()
+
+        self.assertEqual(first.image.name, second.image.name)
+        self.assertEqual(first.thumbnail.name, second.thumbnail.name)
+        self.assertEqual(first.renditions, second.renditions)
+        self.assertEqual(StoredFile.objects.get(name=first.image.name).refcount, 2)
+
+    def test_file_removed_with_last_reference(self):
+        first = self.create_listing()
+        second = self.create_listing()
+        paths = [first.image.path, first.thumbnail.path]
+
+        with self.captureOnCommitCallbacks(execute=True):
+            first.delete()
+        self.assertTrue(all(os.path.exists(p) for p in paths))
+        with self.captureOnCommitCallbacks(execute=True):
+            second.delete()
+        self.assertFalse(any(os.path.exists(p) for p in paths))
+        self.assertFalse(StoredFile.objects.exists())
+
+    def test_rolled_back_delete_keeps_files(self):
+        listing = self.create_listing()
+        paths = [listing.image.path, listing.thumbnail.path]
+
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            try:
+                with transaction.atomic():
+                    listing.delete()
+                    raise IntegrityError
+            except IntegrityError:
+                pass
+        self.assertEqual(callbacks, [])
+        self.assertTrue(all(os.path.exists(p) for p in paths))
+        self.assertEqual(StoredFile.objects.get(name=listing.image.name).refcount, 1)
+
+    def build_failing_at_third_save(self, storage):
+        """build_renditions of an 800px image with the third storage.save failing; (saved names, encoded files)."""
+        saved, encoded = [], []
+        save, encode = storage.save, images._encode
+
+        def flaky_save(name, content, max_length=None):
+            if len(saved) == 2:
+                raise OSError('No space left on device')
+            saved.append(save(name, content, max_length))
+            return saved[-1]
+
+        def tracked_encode(*args):
+            encoded.append(encode(*args))
+            return encoded[-1]
+
+        with mock.patch.object(storage, 'save', flaky_save), \
+                mock.patch('listings.images._encode', side_effect=tracked_encode):
+            with self.assertRaises(OSError):
+                images.build_renditions(make_image_file(size=(800, 600)), 'photo.jpg', storage)
+        return saved, encoded
+
+    def test_failed_rendition_build_leaves_no_files(self):
+        storage = ContentAddressedStorage(location=tempfile.mkdtemp())
+        saved, encoded = self.build_failing_at_third_save(storage)
+        self.assertEqual(len(saved), 2)
+        self.assertFalse(any(storage.exists(name) for name in saved))
+        # The thumbnail was encoded before the failure.
+        self.assertIn('photo_thumb.jpg', [f.name for f in encoded])
+        self.assertTrue(all(f.closed for f in encoded))
+
+        # Identical renditions another listing references are kept.
+        for name in saved:
+            acquire(name)
+        saved, _ = self.build_failing_at_third_save(storage)
+        self.assertTrue(all(storage.exists(name) for name in saved))
+
+    def test_failed_thumbnail_save_discards_renditions(self):
+        built = []
+        build = images.build_renditions
+
+        def tracked_build(*args):
+            built.append(build(*args))
+            return built[-1]
+
+        field_file = Listing._meta.get_field('thumbnail').attr_class
+        save_file = field_file.save
+
+        def failing_thumbnail_save(file, name, content, save=True):
+            if '_thumb' in name:
+                raise OSError('No space left on device')
+            return save_file(file, name, content, save)
+
+        with mock.patch('listings.tasks.build_renditions', side_effect=tracked_build), \
+                mock.patch.object(field_file, 'save', failing_thumbnail_save), \
+                self.assertLogs('listings.tasks', 'ERROR'):
+            listing = self.create_listing('failing.jpg')
+        self.assertEqual(listing.thumbnail_status, 'FAILED')
+        renditions, (_, thumb_content) = built[0]
+        names = list(images.rendition_names(renditions))
+        self.assertTrue(names)
+        self.assertFalse(any(listing.thumbnail.storage.exists(name) for name in names))
+        self.assertTrue(thumb_content.closed)
+
+
+@override_settings(
+    LISTINGS_JOBS={'BACKEND': 'listings.jobs.backends.ImmediateBackend'},
+    LISTINGS_UPLOADS={'MAX_BYTES': 64 * 1024, 'MAX_PIXELS': 1000 * 1000},
+    MEDIA_ROOT=tempfile.mkdtemp(),
+)
+class UploadLimitsTestCase(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='user1', password='pass')
+        self.category = Category.objects.create(name='TestCat')
+        self.client.force_authenticate(self.user)
+
+    def post_image(self, image_file):
+        data = {
+            'title': 'Ad', 'description': 'Desc', 'price': '9.99',
+            'category': 'TestCat', 'image': image_file,
+        }
+        return self.client.post(reverse('listing-list'), data, format='multipart')
+
+    def test_too_many_pixels_rejected_before_decoding(self):
+        image_io = io.BytesIO()
+        Image.new('L', (2000, 1000)).save(image_io, format='PNG')
+        resp = self.post_image(SimpleUploadedFile('big.png', image_io.getvalue(), content_type='image/png'))
+        self.assertEqual(resp.status_code, 400)
+        self.assertIn('image', resp.data)
+        self.assertFalse(Listing.objects.exists())
+
+    def test_too_large_upload_aborted(self):
+        image_io = io.BytesIO()
+        Image.effect_noise((600, 600), 64).save(image_io, format='PNG')
+        self.assertGreater(image_io.tell(), 64 * 1024)
+        with self.assertLogs('django.security.RequestDataTooBig', 'ERROR'):
+            resp = self.post_image(SimpleUploadedFile('big.png', image_io.getvalue(), content_type='image/png'))
+        self.assertEqual(resp.status_code, 400)
+        self.assertFalse(Listing.objects.exists())
+
+    def test_graphql_multipart_upload(self):
+        mutation = '''
+        mutation {
+          createListing(title: "Ad", description: "Desc", price: 1.5,
+                        categoryName: "TestCat", image: "photo") {
+            listing { id thumbnailStatus }
+          }
+        }
+        '''
+        self.client.force_login(self.user)
+        resp = self.client.post('/graphql/', {'query': mutation, 'photo': make_image_file()}, format='multipart')
+        self.assertEqual(resp.status_code, 200, resp.content)
+        self.assertNotIn('errors', resp.json())
+        listing = Listing.objects.get()
+        self.assertEqual(listing.thumbnail_status, 'READY')
+        self.assertTrue(os.path.exists(listing.image.path))
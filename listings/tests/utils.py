@@ -0,0 +1,22 @@
+import io
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from PIL import Image
+from listings.models import Listing
+
+
+def make_image_file(name='test.jpg', size=(400, 400), color='blue'):
+    image_io = io.BytesIO()
+    Image.new('RGB', size, color).save(image_io, format='JPEG')
+    return SimpleUploadedFile(name, image_io.getvalue(), content_type='image/jpeg')
+
+
+def create_listings(count, categories, tags, **fields):
+    """`count` listings 'Ad <i>', each by a new author, round-robin over `categories`, with 1-3 of `tags`."""
+    for i in range(count):
+        author = User.objects.create_user(username=f'seller{Listing.objects.count()}')
+        listing = Listing.objects.create(
+            title=f'Ad {i}', description='Desc', price=i, author=author,
+            category=categories[i % len(categories)], **fields
+        )
+        listing.tags.set(tags[:i % 3 + 1])
@@ -0,0 +1,63 @@
+from django.conf import settings
+from django.core.exceptions import RequestDataTooBig, ValidationError
+from django.core.files.uploadhandler import TemporaryFileUploadHandler
+from PIL import Image
+
+from . import profiling
+
+DEFAULT_LIMITS = {
+    'MAX_BYTES': 15 * 1024 * 1024,
+    'MAX_PIXELS': 40_000_000,
+}
+
+
+def upload_limits():
+    limits = dict(DEFAULT_LIMITS)
+    limits.update(getattr(settings, 'LISTINGS_UPLOADS', {}))
+    return limits
+
+
+class LimitedTemporaryFileUploadHandler(TemporaryFileUploadHandler):
+    """
+    Spools every uploaded file to a temporary file chunk by chunk, so the
+    request never holds a whole image in memory, and aborts the upload as
+    soon as it grows past LISTINGS_UPLOADS['MAX_BYTES'].
+    """
+    def receive_data_chunk(self, raw_data, start):
+        if start + len(raw_data) > upload_limits()['MAX_BYTES']:
+            self.upload_interrupted()
+            raise RequestDataTooBig("Uploaded file exceeds LISTINGS_UPLOADS['MAX_BYTES'].")
+        return super().receive_data_chunk(raw_data, start)
+
+
+def check_image_size(width, height):
+    max_pixels = upload_limits()['MAX_PIXELS']
+    if width * height > max_pixels:
+        raise ValidationError(
+            f"Image is {width}x{height} px; at most {max_pixels} pixels are allowed.",
+            code='image_too_large',
+        )
+
+
+@profiling.timed('pillow')
+def validate_image_upload(file):
+    """
+    Reject oversized files and decompression bombs. Only the image header
+    is read; pixel data is never decoded here.
+    """
+    if not file or getattr(file, '_committed', False):
+        return
+    if file.size is not None and file.size > upload_limits()['MAX_BYTES']:
+        raise ValidationError("Uploaded file is too large.", code='file_too_large')
+    position = file.tell() if hasattr(file, 'tell') else None
+    try:
+        with Image.open(file) as img:
+            width, height = img.size
+    except Image.DecompressionBombError:
+        raise ValidationError("Image has too many pixels.", code='image_too_large')
+    except Exception:
+        raise ValidationError("Upload a valid image.", code='invalid_image')
+    finally:
+        if position is not None:
+            file.seek(position)
+    check_image_size(width, height)
@@ -0,0 +1,30 @@
+import uuid
+
+from django.core.cache import cache
+from django.utils import timezone
+
+# Names of the data sets whose writes invalidate cached API responses.
+LISTING = 'listing'
+CATEGORY = 'category'
+TAG = 'tag'
+USER = 'user'
+FAVORITE = 'favorite'
+
+
+def _version_key(name):
+    return f'listings:version:{name}'
+
+
+def bump(*names):
+    # A fresh token rather than cache.incr(): on a shared cache whose incr is
+    # get-then-set (file, database), two concurrent bumps could yield one value.
+    now = timezone.now()
+    cache.set_many({_version_key(name): (uuid.uuid4().hex, now) for name in names}, None)
+
+
+def get_versions(names):
+    """(version tokens, time of the latest bump or None) for `names`."""
+    values = cache.get_many([_version_key(name) for name in names])
+    entries = [values.get(_version_key(name), (0, None)) for name in names]
+    counters = tuple(token for token, _ in entries)
+    return counters, max(filter(None, (changed for _, changed in entries)), default=None)
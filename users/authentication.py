@@ -0,0 +1,165 @@
+import threading
+import time
+from collections import OrderedDict, defaultdict
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from django.utils.translation import gettext_lazy as _
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+DEFAULTS = {
+    'MAX_ENTRIES': 10000,
+    'TTL': 60,
+}
+
+
+class UserCache:
+    """
+    Process-local LRU of user rows with a short TTL. Entries are stored as
+    raw column values and a fresh User instance is built on every hit, so
+    per-request state never leaks between requests.
+    """
+    def __init__(self, max_entries, ttl):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._keys_by_user = defaultdict(set)
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires, user_id, db, values = entry
+            if expires < time.monotonic():
+                self._remove(key)
+                return None
+            self._entries.move_to_end(key)
+        User = get_user_model()
+        return User.from_db(db, [f.attname for f in User._meta.concrete_fields], values)
+
+    def set(self, key, user):
+        values = tuple(getattr(user, f.attname) for f in user._meta.concrete_fields)
+        with self._lock:
+            self._remove(key)
+            self._entries[key] = (time.monotonic() + self.ttl, user.pk, user._state.db, values)
+            self._keys_by_user[user.pk].add(key)
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+
+    def invalidate(self, user_id):
+        with self._lock:
+            for key in list(self._keys_by_user.get(user_id, ())):
+                self._remove(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._keys_by_user.clear()
+
+    def _remove(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            keys = self._keys_by_user[entry[1]]
+            keys.discard(key)
+            if not keys:
+                del self._keys_by_user[entry[1]]
+
+
+_cache = None
+
+
+def get_user_cache():
+    global _cache
+    if _cache is None:
+        config = dict(DEFAULTS, **getattr(settings, 'USERS_AUTH_CACHE', {}))
+        _cache = UserCache(config['MAX_ENTRIES'], config['TTL'])
+    return _cache
+
+
+@receiver(setting_changed)
+def reset_user_cache(setting, **kwargs):
+    global _cache
+    if setting == 'USERS_AUTH_CACHE':
+        _cache = None
+
+
+def get_cached_user(field, value):
+    """User with `field == value`; raises User.DoesNotExist."""
+    cache = get_user_cache()
+    key = (field, value)
+    user = cache.get(key)
+    if user is None:
+        user = get_user_model()._default_manager.get(**{field: value})
+        cache.set(key, user)
+    return user
+
+
+def get_user_by_natural_key(username):
+    """JWT_GET_USER_BY_NATURAL_KEY_HANDLER for graphql_jwt."""
+    User = get_user_model()
+    try:
+        return get_cached_user(User.USERNAME_FIELD, username)
+    except User.DoesNotExist:
+        return None
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """simplejwt authentication that resolves the token subject through the user cache."""
+    def get_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(_("Token contained no recognizable user identification"))
+
+        try:
+            user = get_cached_user(api_settings.USER_ID_FIELD, user_id)
+        except self.user_model.DoesNotExist:
+            raise AuthenticationFailed(_("User not found"), code="user_not_found")
+
+        if api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+
+        if api_settings.CHECK_REVOKE_TOKEN:
+            if validated_token.get(api_settings.REVOKE_TOKEN_CLAIM) != get_md5_hash_password(user.password):
+                raise AuthenticationFailed(_("The user's password has been changed."), code="password_changed")
+
+        return user
+
+
+class ClaimsJWTAuthentication(CachedJWTAuthentication):
+    """
+    Builds the user from the token claims alone (simplejwt's TokenUser)
+    without touching the database. A deactivated or deleted user passes
+    until the token expires, so use it only where anonymous users may read
+    as well and the identity merely personalises the response.
+    """
+    def get_user(self, validated_token):
+        return api_settings.TOKEN_USER_CLASS(validated_token)
+
+
+class StatelessReadJWTAuthentication(CachedJWTAuthentication):
+    """
+    Claims-only users (see ClaimsJWTAuthentication) for the safe-method
+    actions a view lists in `stateless_auth_actions`; every other request
+    loads the real user, so inactive users are refused there.
+    """
+    def authenticate(self, request):
+        view = (request.parser_context or {}).get('view')
+        self.stateless = (
+            request.method in SAFE_METHODS
+            and getattr(view, 'action', None) in getattr(view, 'stateless_auth_actions', ())
+        )
+        return super().authenticate(request)
+
+    def get_user(self, validated_token):
+        if getattr(self, 'stateless', False):
+            return api_settings.TOKEN_USER_CLASS(validated_token)
+        return super().get_user(validated_token)
@@ -0,0 +1,74 @@
+import uuid
+
+from django.core.cache import DEFAULT_CACHE_ALIAS, cache, caches
+from django.core.cache.backends.locmem import LocMemCache
+
+MODERATOR_GROUP = 'moderators'
+ROLES_TIMEOUT = 300
+# A process-local cache never sees other workers' invalidations, so there
+# the TTL alone bounds how long a demoted moderator keeps the role.
+LOCAL_ROLES_TIMEOUT = 5
+
+GLOBAL_VERSION_KEY = 'roles:version'
+
+
+def _user_version_key(user_id):
+    return f'roles:version:{user_id}'
+
+
+def roles_timeout():
+    return LOCAL_ROLES_TIMEOUT if isinstance(caches[DEFAULT_CACHE_ALIAS], LocMemCache) else ROLES_TIMEOUT
+
+
+def get_roles(user):
+    """
+    Group names of `user`. Loaded at most once per request (memoized on the
+    user object) and shared across requests through the cache. Entries are
+    keyed by version tokens that membership/group changes bump.
+    """
+    if user is None or not user.is_authenticated:
+        return frozenset()
+    roles = getattr(user, '_roles', None)
+    if roles is not None:
+        return roles
+
+    versions = cache.get_many([GLOBAL_VERSION_KEY, _user_version_key(user.pk)])
+    key = 'roles:{}:{}:{}'.format(
+        user.pk, versions.get(GLOBAL_VERSION_KEY, 0), versions.get(_user_version_key(user.pk), 0)
+    )
+    roles = cache.get(key)
+    if roles is None:
+        roles = frozenset(user.groups.values_list('name', flat=True))
+        cache.set(key, roles, roles_timeout())
+    user._roles = roles
+    return roles
+
+
+def _bump(key):
+    # A fresh token, not cache.incr(): see listings.versions.bump.
+    cache.set(key, uuid.uuid4().hex, None)
+
+
+def invalidate_user(user_id):
+    _bump(_user_version_key(user_id))
+
+
+def invalidate_all():
+    _bump(GLOBAL_VERSION_KEY)
+
+
+def is_moderator(user):
+    return MODERATOR_GROUP in get_roles(user)
+
+
+def can_moderate(user):
+    if user is None or not user.is_authenticated:
+        return False
+    return user.is_staff or user.is_superuser or is_moderator(user)
+
+
+def can_modify_listing(user, listing):
+    """Author, staff/superuser or moderator. Compares `author_id`, so the author row is never loaded."""
+    if user is None or not user.is_authenticated:
+        return False
+    return listing.author_id == user.pk or can_moderate(user)
@@ -1,6 +1,8 @@
-from django.db.models.signals import post_save, post_migrate
+from django.db.models.signals import m2m_changed, post_delete, post_save, post_migrate
 from django.contrib.auth.models import User, Group
 from django.dispatch import receiver
+from . import roles
+from .authentication import get_user_cache
 
 
 @receiver(post_migrate)
@@ -13,3 +15,28 @@ def assign_user_group(sender, instance, created, **kwargs):
     if created:
         default_group, _ = Group.objects.get_or_create(name='user')
         instance.groups.add(default_group)
+
+
+@receiver(m2m_changed, sender=User.groups.through)
+def invalidate_roles_on_membership_change(sender, instance, action, reverse, pk_set, **kwargs):
+    if not action.startswith('post_'):
+        return
+    if not reverse:
+        roles.invalidate_user(instance.pk)
+    elif pk_set:
+        for user_id in pk_set:
+            roles.invalidate_user(user_id)
+    else:
+        # group.user_set.clear(): affected users are unknown.
+        roles.invalidate_all()
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def invalidate_roles_on_group_change(sender, **kwargs):
+    roles.invalidate_all()
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_cached_user(sender, instance, **kwargs):
+    get_user_cache().invalidate(instance.pk)
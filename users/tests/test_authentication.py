@@ -0,0 +1,76 @@
+import json
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from graphql_jwt.shortcuts import get_token
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+from listings.models import Category
+from users.authentication import get_user_cache
+
+
+def user_queries(queries):
+    return [q['sql'] for q in queries if 'FROM "auth_user"' in q['sql']]
+
+
+class CachedJWTAuthenticationTest(TestCase):
+    def setUp(self):
+        get_user_cache().clear()
+        self.user = User.objects.create_user(username='jwtuser', password='pass')
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(self.user)}')
+        Category.objects.create(name='Cars')
+        self.payload = {'title': 'Ad', 'description': 'D', 'price': '10.00', 'category': 'Cars'}
+
+    def test_user_loaded_once_across_requests(self):
+        with CaptureQueriesContext(connection) as first:
+            self.assertEqual(self.client.post('/api/listings/', self.payload).status_code, 201)
+        self.assertEqual(len(user_queries(first.captured_queries)), 1)
+
+        with CaptureQueriesContext(connection) as second:
+            self.assertEqual(self.client.post('/api/listings/', self.payload).status_code, 201)
+        self.assertEqual(user_queries(second.captured_queries), [])
+
+    def test_reads_do_not_load_user(self):
+        with CaptureQueriesContext(connection) as ctx:
+            self.assertEqual(self.client.get('/api/listings/').status_code, 200)
+        self.assertEqual(user_queries(ctx.captured_queries), [])
+
+    def test_deactivation_invalidates_cache(self):
+        self.client.post('/api/listings/', self.payload)
+        self.user.is_active = False
+        self.user.save()
+        self.assertEqual(self.client.post('/api/listings/', self.payload).status_code, 401)
+
+    def test_inactive_user_refused_on_personal_reads(self):
+        self.user.is_active = False
+        self.user.save()
+        # Anonymous users may read the feed; the token only personalises it.
+        self.assertEqual(self.client.get('/api/listings/').status_code, 200)
+        for url in ('/api/listings/favorites/', '/api/listings/statistics/', '/api/async/listings/statistics/'):
+            self.assertEqual(self.client.get(url).status_code, 401, url)
+
+    def test_cached_users_are_not_shared(self):
+        self.client.post('/api/listings/', self.payload)
+        first = get_user_cache().get(('id', self.user.pk))
+        second = get_user_cache().get(('id', self.user.pk))
+        self.assertEqual(first, second)
+        self.assertIsNot(first, second)
+
+    def test_graphql_token_uses_cache(self):
+        token = get_token(self.user)
+        query = 'mutation { createListing(title: "Ad", description: "D", price: 10, categoryName: "Cars") { listing { id } } }'
+
+        def post():
+            return self.client.generic(
+                'POST', '/graphql/', json.dumps({'query': query}),
+                content_type='application/json', HTTP_AUTHORIZATION=f'JWT {token}',
+            )
+
+        self.client.credentials()
+        self.assertNotIn('errors', post().json())
+        with CaptureQueriesContext(connection) as ctx:
+            data = post().json()
+        self.assertNotIn('errors', data)
+        self.assertEqual(user_queries(ctx.captured_queries), [])
@@ -0,0 +1,76 @@
+import multiprocessing
+
+from django.contrib.auth.models import User, Group
+from django.test import TestCase, override_settings
+from listings.models import Listing
+from users import roles
+
+
+class RoleResolutionTest(TestCase):
+    def setUp(self):
+        self.moderators = Group.objects.create(name='moderators')
+        self.author = User.objects.create_user(username='author', password='pass')
+        self.mod = User.objects.create_user(username='mod', password='pass')
+        self.mod.groups.add(self.moderators)
+        self.listings = [
+            Listing.objects.create(title=f'Ad {i}', description='D', price=1, author=self.author)
+            for i in range(20)
+        ]
+
+    def fresh(self, user):
+        return User.objects.get(pk=user.pk)
+
+    def test_roles_loaded_once_per_request(self):
+        mod = self.fresh(self.mod)
+        listings = list(Listing.objects.all())
+        with self.assertNumQueries(1):
+            self.assertTrue(all(roles.can_modify_listing(mod, listing) for listing in listings))
+
+    def test_roles_shared_across_requests(self):
+        roles.get_roles(self.fresh(self.mod))
+        next_request_user = self.fresh(self.mod)
+        with self.assertNumQueries(0):
+            self.assertTrue(roles.is_moderator(next_request_user))
+
+    def test_owner_check_does_not_load_author(self):
+        listing = Listing.objects.get(pk=self.listings[0].pk)
+        author = self.fresh(self.author)
+        with self.assertNumQueries(0):
+            self.assertTrue(roles.can_modify_listing(author, listing))
+
+    def test_membership_change_invalidates(self):
+        self.assertTrue(roles.is_moderator(self.fresh(self.mod)))
+        self.mod.groups.remove(self.moderators)
+        self.assertFalse(roles.is_moderator(self.fresh(self.mod)))
+
+        self.moderators.user_set.add(self.author)
+        self.assertTrue(roles.is_moderator(self.fresh(self.author)))
+        self.moderators.user_set.clear()
+        self.assertFalse(roles.is_moderator(self.fresh(self.author)))
+
+    def test_group_rename_invalidates(self):
+        self.assertTrue(roles.is_moderator(self.fresh(self.mod)))
+        self.moderators.name = 'former-moderators'
+        self.moderators.save()
+        self.assertFalse(roles.is_moderator(self.fresh(self.mod)))
+
+    def test_demotion_in_another_process_invalidates(self):
+        self.assertTrue(roles.is_moderator(self.fresh(self.mod)))
+        # Another worker removes the membership; only its cache invalidation reaches this one.
+        User.groups.through.objects.filter(user=self.mod, group=self.moderators).delete()
+        process = multiprocessing.get_context('fork').Process(target=roles.invalidate_user, args=(self.mod.pk,))
+        process.start()
+        process.join()
+        self.assertEqual(process.exitcode, 0)
+        self.assertFalse(roles.is_moderator(self.fresh(self.mod)))
+
+    def test_short_ttl_with_process_local_cache(self):
+        self.assertEqual(roles.roles_timeout(), roles.ROLES_TIMEOUT)
+        with override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}):
+            self.assertEqual(roles.roles_timeout(), roles.LOCAL_ROLES_TIMEOUT)
+
+    def test_anonymous_and_other_users(self):
+        other = User.objects.create_user(username='other', password='pass')
+        listing = self.listings[0]
+        self.assertFalse(roles.can_modify_listing(None, listing))
+        self.assertFalse(roles.can_modify_listing(self.fresh(other), listing))
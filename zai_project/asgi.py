@@ -9,8 +9,14 @@ https://docs.djangoproject.com/en/5.1/howto/deployment/asgi/
 
 import os
 
+from django.conf import settings
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'zai_project.settings')
 
+# Sync code of each ASGI request runs in a thread of its own, so a kept-alive
+# connection would be left behind with that thread: close them per request.
+for database in settings.DATABASES.values():
+    database['CONN_MAX_AGE'] = 0
+
 application = get_asgi_application()
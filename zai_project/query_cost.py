@@ -0,0 +1,121 @@
+from django.conf import settings
+from graphql import (
+    FieldNode, FragmentSpreadNode, GraphQLError, GraphQLList, InlineFragmentNode, IntValueNode,
+    OperationDefinitionNode, ValidationRule, get_named_type, get_nullable_type, is_leaf_type,
+)
+
+DEFAULTS = {
+    'MAX_DEPTH': 10,
+    'MAX_COST': 1000,
+    # Assumed size of lists without a `first`/`last` argument.
+    'DEFAULT_LIST_SIZE': 20,
+    # Assumed size when `first`/`last` comes from a variable. Validation is
+    # cached per document, so the declared default can't be trusted.
+    'MAX_LIST_SIZE': 100,
+    # 'Type.field': cost of one resolution; object fields cost 1, scalars 0.
+    'FIELD_COSTS': {},
+}
+
+
+def cost_settings():
+    return dict(DEFAULTS, **getattr(settings, 'GRAPHENE', {}).get('QUERY_COST', {}))
+
+
+class _Analyzer:
+    def __init__(self, schema, document, config):
+        self.schema = schema
+        self.config = config
+        self.fragments = {
+            definition.name.value: definition for definition in document.definitions
+            if not isinstance(definition, OperationDefinitionNode)
+        }
+
+    def operation(self, operation):
+        root = self.schema.get_root_type(operation.operation)
+        if root is None:
+            return 0, 0
+        cost, depth = self.selections(root, operation.selection_set, 1, 0, None, frozenset())
+        return depth, cost
+
+    def page_size(self, node):
+        for argument in node.arguments or ():
+            if argument.name.value not in ('first', 'last'):
+                continue
+            if isinstance(argument.value, IntValueNode):
+                return int(argument.value.value)
+            return self.config['MAX_LIST_SIZE']
+        return None
+
+    def selections(self, parent_type, selection_set, multiplier, depth, pending_size, fragments):
+        """(cost, depth) of `selection_set`, resolved `multiplier` times."""
+        cost, max_depth = 0, depth
+        for selection in selection_set.selections:
+            if isinstance(selection, FieldNode):
+                field_cost, field_depth = self.field(parent_type, selection, multiplier, depth, pending_size, fragments)
+            elif isinstance(selection, InlineFragmentNode):
+                condition = selection.type_condition
+                fragment_type = self.schema.get_type(condition.name.value) if condition else parent_type
+                field_cost, field_depth = self.selections(
+                    fragment_type, selection.selection_set, multiplier, depth, pending_size, fragments
+                )
+            elif isinstance(selection, FragmentSpreadNode):
+                name = selection.name.value
+                fragment = self.fragments.get(name)
+                if fragment is None or name in fragments:
+                    continue
+                field_cost, field_depth = self.selections(
+                    self.schema.get_type(fragment.type_condition.name.value), fragment.selection_set,
+                    multiplier, depth, pending_size, fragments | {name},
+                )
+            else:
+                continue
+            cost += field_cost
+            max_depth = max(max_depth, field_depth)
+        return cost, max_depth
+
+    def field(self, parent_type, node, multiplier, depth, pending_size, fragments):
+        name = node.name.value
+        field = getattr(parent_type, 'fields', {}).get(name)
+        if field is None or name.startswith('__'):
+            return 0, depth
+        named_type = get_named_type(field.type)
+        weight = self.config['FIELD_COSTS'].get(f'{parent_type.name}.{name}', 0 if is_leaf_type(named_type) else 1)
+        cost = multiplier * weight
+        if node.selection_set is None:
+            return cost, depth + 1
+
+        size = self.page_size(node)
+        if isinstance(get_nullable_type(field.type), GraphQLList):
+            # Connection fields pass their page size down to `edges`.
+            multiplier *= size or pending_size or self.config['DEFAULT_LIST_SIZE']
+            size = None
+        child_cost, child_depth = self.selections(named_type, node.selection_set, multiplier, depth + 1, size, fragments)
+        return cost + child_cost, child_depth
+
+
+def analyze(schema, document, config=None):
+    """`{operation name: (depth, cost)}` estimated from the document alone."""
+    analyzer = _Analyzer(schema, document, config or cost_settings())
+    return {
+        (definition.name.value if definition.name else None): analyzer.operation(definition)
+        for definition in document.definitions if isinstance(definition, OperationDefinitionNode)
+    }
+
+
+class QueryCostRule(ValidationRule):
+    """Rejects operations deeper than MAX_DEPTH or costlier than MAX_COST (settings.GRAPHENE['QUERY_COST'])."""
+    def enter_document(self, node, *args):
+        config = cost_settings()
+        for name, (depth, cost) in analyze(self.context.schema, node, config).items():
+            label = f'Operation "{name}"' if name else 'Query'
+            if depth > config['MAX_DEPTH']:
+                self.report_error(GraphQLError(
+                    f"{label} has depth {depth}, exceeding the maximum of {config['MAX_DEPTH']}.",
+                    extensions={'code': 'QUERY_TOO_DEEP'},
+                ))
+            if cost > config['MAX_COST']:
+                self.report_error(GraphQLError(
+                    f"{label} has an estimated cost of {cost}, exceeding the maximum of {config['MAX_COST']}.",
+                    extensions={'code': 'QUERY_TOO_COMPLEX'},
+                ))
+        return self.SKIP
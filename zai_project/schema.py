@@ -5,6 +5,8 @@ from listings.graphql.mutations import (
     CreateListing,
     UpdateListing,
     DeleteListing,
+    BulkUpsertListings,
+    FavoriteListing,
     CreateCategory,
     UpdateCategory,
     DeleteCategory,
@@ -29,6 +31,8 @@ class Mutation(
     createListing = CreateListing.Field()
     updateListing = UpdateListing.Field()
     deleteListing = DeleteListing.Field()
+    bulkUpsertListings = BulkUpsertListings.Field()
+    favoriteListing = FavoriteListing.Field()
 
     # Category
     createCategory = CreateCategory.Field()
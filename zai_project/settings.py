@@ -52,7 +52,9 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'listings.middleware.RequestProfilingMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'listings.middleware.ReplicaRoutingMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -89,7 +91,84 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
-    }
+        # Keep connections open between requests; checked before reuse.
+        # zai_project.asgi sets 0: there every request gets a new thread.
+        'CONN_MAX_AGE': 600,
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {
+            # Take the write lock at BEGIN, so busy_timeout applies instead of
+            # failing when a read transaction is upgraded to a write.
+            'transaction_mode': 'IMMEDIATE',
+        },
+    },
+    # Read replica; locally a copy of db.sqlite3 refreshed by `manage.py sync_replica`.
+    'replica': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': BASE_DIR / 'db.replica.sqlite3',
+        'CONN_MAX_AGE': 600,
+        'CONN_HEALTH_CHECKS': True,
+        'TEST': {'MIRROR': 'default'},
+    },
+}
+
+DATABASE_ROUTERS = ['listings.db.ReplicaRouter']
+
+# Shared by every worker process on the host: the API validators and
+# response cache (listings.versions), roles, persisted GraphQL queries and
+# replica pinning must look the same in all of them. A deployment on several
+# hosts needs a network cache (Redis, Memcached) here instead.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': BASE_DIR / 'cache',
+        'OPTIONS': {'MAX_ENTRIES': 10000},
+    },
+}
+
+# Runs the tests against an empty cache directory of their own.
+TEST_RUNNER = 'zai_project.test_runner.TestRunner'
+
+# Safe-method requests and GraphQL queries read from one of ALIASES
+# (listings.db); an empty list keeps every query on the primary. A client
+# that wrote reads from the primary for STICKY_SECONDS afterwards.
+LISTINGS_REPLICAS = {
+    'ALIASES': [],
+    'STICKY_SECONDS': 5,
+}
+
+# PRAGMAs run on every new SQLite connection (listings.db). WAL lets readers
+# work while a listing or thumbnail save holds the write lock; writers wait
+# up to busy_timeout ms for it. A database can override this with its own
+# 'PRAGMAS' entry in DATABASES; {} keeps SQLite's defaults.
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'busy_timeout': 5000,
+    'cache_size': -64000,  # KiB
+    'mmap_size': 256 * 1024 * 1024,
+    'temp_store': 'MEMORY',
+}
+
+# Per-request profiling (listings.profiling): query count and DB, Pillow and
+# serialization time in a Server-Timing header and one 'listings.profiling'
+# log line per request, plus a warning for every query slower than
+# SLOW_QUERY_MS naming the view or GraphQL resolver that ran it. Disabled,
+# neither the middleware nor the query wrapper is installed.
+LISTINGS_PROFILING = {
+    'ENABLED': False,
+    'SERVER_TIMING': True,
+    'SLOW_QUERY_MS': 100,
+}
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'listings.profiling': {'handlers': ['console'], 'level': 'INFO', 'propagate': False},
+    },
 }
 
 
@@ -132,6 +211,37 @@ MEDIA_ROOT = BASE_DIR / 'media'
 STATIC_URL = '/static/'
 STATIC_ROOT = BASE_DIR / 'staticfiles'
 
+# Uploads are always spooled to temp files in chunks (never held in memory)
+# and rejected past the size/pixel limits before any decoding happens.
+FILE_UPLOAD_HANDLERS = ['listings.uploads.LimitedTemporaryFileUploadHandler']
+LISTINGS_UPLOADS = {
+    'MAX_BYTES': 15 * 1024 * 1024,
+    'MAX_PIXELS': 40_000_000,
+}
+
+# Background jobs (thumbnail generation etc.)
+# Backends: ProcessPoolBackend (local worker processes), DatabaseBackend
+# (jobs stored in the DB, run with `manage.py runjobs`), ImmediateBackend (inline).
+LISTINGS_JOBS = {
+    'BACKEND': 'listings.jobs.backends.ProcessPoolBackend',
+    'OPTIONS': {'max_workers': 2},
+}
+
+# Listing image renditions (px of the longest side). 'ORIGINAL' keeps the
+# uploaded format; 'AVIF' is used only if Pillow was built with libavif.
+LISTINGS_IMAGE_RENDITIONS = {
+    'SIZES': [64, 200, 480, 1024],
+    'FORMATS': ['WEBP', 'ORIGINAL'],
+    'QUALITY': 80,
+}
+
+# Listing full-text search. SQLiteFTS5Backend uses the FTS5 index created by
+# migration listings.0008; LikeSearchBackend works on any database.
+LISTINGS_SEARCH = {
+    'BACKEND': 'listings.search.backends.SQLiteFTS5Backend',
+    'OPTIONS': {'title_weight': 10.0, 'description_weight': 1.0},
+}
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.1/ref/settings/#default-auto-field
 
@@ -141,7 +251,7 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 # REST Framework + JWT
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'users.authentication.CachedJWTAuthentication',
         'rest_framework.authentication.SessionAuthentication',
     ),
     'DEFAULT_FILTER_BACKENDS': ['django_filters.rest_framework.DjangoFilterBackend'],
@@ -154,10 +264,43 @@ GRAPHENE = {
     'SCHEMA': 'zai_project.schema.schema',
     'MIDDLEWARE': [
         'graphql_jwt.middleware.JSONWebTokenMiddleware',
+        'listings.middleware.GraphQLProfilingMiddleware',
     ],
+    # Parsed/validated documents kept per process (zai_project.views).
+    'DOCUMENT_CACHE_SIZE': 500,
+    # Automatic Persisted Queries: storage timeout in seconds, largest query
+    # text (bytes) that gets stored, and Cache-Control max-age of GET
+    # responses to persisted queries.
+    'PERSISTED_QUERY_TIMEOUT': 24 * 60 * 60,
+    'PERSISTED_QUERY_MAX_SIZE': 16 * 1024,
+    'PERSISTED_QUERY_MAX_AGE': 60,
+    # Queries above these limits are rejected before execution (zai_project.query_cost).
+    'QUERY_COST': {
+        'MAX_DEPTH': 10,
+        'MAX_COST': 1000,
+        'DEFAULT_LIST_SIZE': 20,
+        'MAX_LIST_SIZE': 100,
+        'FIELD_COSTS': {
+            'Query.searchListings': 5,
+        },
+    },
 }
 
 GRAPHQL_JWT = {
   "JWT_ALLOW_REFRESH": True,
-  "JWT_LONG_RUNNING_REFRESH_TOKEN": True
+  "JWT_LONG_RUNNING_REFRESH_TOKEN": True,
+  "JWT_GET_USER_BY_NATURAL_KEY_HANDLER": "users.authentication.get_user_by_natural_key",
+}
+
+# JSONWebTokenBackend lets JSONWebTokenMiddleware authenticate GraphQL requests.
+AUTHENTICATION_BACKENDS = [
+    'graphql_jwt.backends.JSONWebTokenBackend',
+    'django.contrib.auth.backends.ModelBackend',
+]
+
+# Process-local cache of users resolved from JWTs (REST and GraphQL).
+# Invalidated on User save/delete; TTL bounds staleness across processes.
+USERS_AUTH_CACHE = {
+    'MAX_ENTRIES': 10000,
+    'TTL': 60,
 }
@@ -0,0 +1,25 @@
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.test import override_settings
+from django.test.runner import DiscoverRunner
+
+
+class TestRunner(DiscoverRunner):
+    """
+    DiscoverRunner with the file cache moved to a fresh directory, so
+    entries left by earlier runs or a running server never leak into tests.
+    """
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self.cache_dir = tempfile.mkdtemp()
+        self.cache_settings = override_settings(CACHES={
+            'default': dict(settings.CACHES['default'], LOCATION=self.cache_dir),
+        })
+        self.cache_settings.enable()
+
+    def teardown_test_environment(self, **kwargs):
+        self.cache_settings.disable()
+        shutil.rmtree(self.cache_dir, ignore_errors=True)
+        super().teardown_test_environment(**kwargs)
@@ -19,18 +19,19 @@ from django.urls import path, include
 from django.views.decorators.csrf import csrf_exempt
 from drf_yasg import openapi
 from drf_yasg.views import get_schema_view
-from graphene_django.views import GraphQLView
 from rest_framework import permissions
 from rest_framework_simplejwt.views import TokenRefreshView, TokenObtainPairView
 from django.conf import settings
 from django.conf.urls.static import static
+from .views import CachedGraphQLView, async_graphql_view
 
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/', include('listings.api.urls')),
     path('api/token/', TokenObtainPairView.as_view(), name='token_obtain_pair'),
     path('api/token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
-    path('graphql/', csrf_exempt(GraphQLView.as_view(graphiql=True))),
+    path('graphql/', csrf_exempt(CachedGraphQLView.as_view(graphiql=True))),
+    path('graphql/async/', csrf_exempt(async_graphql_view(graphiql=True))),
     path('api/users/', include('users.urls')),
 ]
 
@@ -0,0 +1,258 @@
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from functools import partial
+
+from asgiref.sync import sync_to_async
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.signals import setting_changed
+from django.db import close_old_connections, connection, transaction
+from django.dispatch import receiver
+from django.http import HttpResponseNotAllowed
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers, set_response_etag
+from graphene_django.constants import MUTATION_ERRORS_FLAG
+from graphene_django.settings import graphene_settings
+from graphene_django.views import GraphQLView, HttpError
+from graphql import (
+    ExecutionResult, GraphQLError, OperationType, execute, get_operation_ast, parse, specified_rules, validate,
+    validate_schema,
+)
+
+from listings import profiling
+from listings.db import replica_reads
+from listings.middleware import GraphQLProfilingMiddleware
+
+from .query_cost import QueryCostRule, analyze, cost_settings
+
+DEFAULTS = {
+    'DOCUMENT_CACHE_SIZE': 500,
+    'PERSISTED_QUERY_TIMEOUT': 24 * 60 * 60,
+    'PERSISTED_QUERY_MAX_SIZE': 16 * 1024,
+    'PERSISTED_QUERY_MAX_AGE': 60,
+}
+
+
+def graphql_setting(name):
+    return getattr(settings, 'GRAPHENE', {}).get(name, DEFAULTS[name])
+
+
+def query_hash(query):
+    return hashlib.sha256(query.encode()).hexdigest()
+
+
+class DocumentCache:
+    """LRU of parsed and validated documents keyed by schema and query hash."""
+    def __init__(self):
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def set(self, key, entry):
+        max_entries = graphql_setting('DOCUMENT_CACHE_SIZE')
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+document_cache = DocumentCache()
+
+
+@receiver(setting_changed)
+def reset_document_cache(setting, **kwargs):
+    # Cached validation results depend on the cost limits.
+    if setting == 'GRAPHENE':
+        document_cache.clear()
+
+
+def _persisted_query_key(sha256):
+    return f'graphql:apq:{sha256}'
+
+
+class CachedGraphQLView(GraphQLView):
+    """
+    GraphQLView that parses and validates each distinct query once per
+    process and supports Automatic Persisted Queries: clients send
+    `extensions.persistedQuery.sha256Hash` and only include the query text
+    when the server answers PersistedQueryNotFound. GET requests for
+    persisted queries get Cache-Control and ETag headers. Operations are
+    rejected during validation when they exceed the depth/cost limits, and
+    the cost estimate is returned in `extensions.cost`. Queries read from a
+    replica when one is configured (listings.db).
+    """
+    validation_rules = (*specified_rules, QueryCostRule)
+
+    def dispatch(self, request, *args, **kwargs):
+        response = super().dispatch(request, *args, **kwargs)
+        if request.method == 'GET' and getattr(request, '_graphql_persisted', False) and response.status_code == 200:
+            user = getattr(request, 'user', None)
+            authenticated = bool(user and user.is_authenticated) or 'HTTP_AUTHORIZATION' in request.META
+            patch_cache_control(
+                response, max_age=graphql_setting('PERSISTED_QUERY_MAX_AGE'),
+                **({'private': True} if authenticated else {'public': True})
+            )
+            patch_vary_headers(response, ['Authorization', 'Cookie'])
+            set_response_etag(response)
+            response = get_conditional_response(request, etag=response['ETag'], response=response)
+        return response
+
+    def resolve_persisted_query(self, request, data, query):
+        extensions = request.GET.get('extensions') or data.get('extensions')
+        if isinstance(extensions, str):
+            try:
+                extensions = json.loads(extensions)
+            except ValueError:
+                raise GraphQLError('Extensions are invalid JSON.')
+        persisted = (extensions or {}).get('persistedQuery')
+        if not persisted:
+            return query
+        sha256 = persisted.get('sha256Hash')
+        if persisted.get('version') != 1 or not isinstance(sha256, str):
+            raise GraphQLError('Unsupported persisted query.', extensions={'code': 'PERSISTED_QUERY_NOT_SUPPORTED'})
+
+        if query:
+            if query_hash(query) != sha256:
+                raise GraphQLError('Provided sha256Hash does not match query.', extensions={'code': 'BAD_PERSISTED_QUERY'})
+            # Larger queries still run, but aren't registered.
+            if len(query.encode()) <= graphql_setting('PERSISTED_QUERY_MAX_SIZE'):
+                cache.set(_persisted_query_key(sha256), query, graphql_setting('PERSISTED_QUERY_TIMEOUT'))
+        else:
+            query = cache.get(_persisted_query_key(sha256))
+            if query is None:
+                raise GraphQLError('PersistedQueryNotFound', extensions={'code': 'PERSISTED_QUERY_NOT_FOUND'})
+        request._graphql_persisted = True
+        return query
+
+    def get_document(self, schema, query):
+        """(document, errors, costs) for `query`, parsed and validated once per process."""
+        key = (id(schema), query_hash(query))
+        entry = document_cache.get(key)
+        if entry is None:
+            try:
+                document = parse(query)
+            except GraphQLError as e:
+                return None, [e], {}
+            errors = validate(schema, document, self.validation_rules, graphene_settings.MAX_VALIDATION_ERRORS)
+            entry = (document, errors, analyze(schema, document))
+            document_cache.set(key, entry)
+        return entry
+
+    def get_middleware(self, request):
+        if profiling.active():
+            return self.middleware
+        # Outside a profiled request the resolver hook would only add a call per field.
+        return [middleware for middleware in self.middleware if not isinstance(middleware, GraphQLProfilingMiddleware)]
+
+    def json_encode(self, request, d, pretty=False):
+        with profiling.timed('serialize'):
+            return self._json_encode(request, d, pretty)
+
+    def _json_encode(self, request, d, pretty):
+        cost = getattr(request, '_graphql_cost', None)
+        if cost is not None and isinstance(d, dict):
+            request._graphql_cost = None
+            depth, requested = cost
+            config = cost_settings()
+            d = dict(d, extensions={'cost': {
+                'requested': requested, 'maximum': config['MAX_COST'],
+                'depth': depth, 'maximumDepth': config['MAX_DEPTH'],
+            }})
+        return super().json_encode(request, d, pretty)
+
+    def execute_graphql_request(self, request, data, query, variables, operation_name, show_graphiql=False):
+        try:
+            query = self.resolve_persisted_query(request, data, query)
+        except GraphQLError as e:
+            return ExecutionResult(errors=[e])
+        if not query:
+            return super().execute_graphql_request(request, data, query, variables, operation_name, show_graphiql)
+
+        schema = self.schema.graphql_schema
+        schema_validation_errors = validate_schema(schema)
+        if schema_validation_errors:
+            return ExecutionResult(data=None, errors=schema_validation_errors)
+
+        document, errors, costs = self.get_document(schema, query)
+        if document is None:
+            return ExecutionResult(errors=errors)
+
+        operation_ast = get_operation_ast(document, operation_name)
+        if operation_ast is not None:
+            request._graphql_cost = costs.get(operation_ast.name.value if operation_ast.name else None)
+        if request.method.lower() == 'get' and operation_ast is not None and operation_ast.operation != OperationType.QUERY:
+            if show_graphiql:
+                return None
+            raise HttpError(HttpResponseNotAllowed(
+                ['POST'], f'Can only perform a {operation_ast.operation.value} operation from a POST request.'
+            ))
+
+        if errors:
+            return ExecutionResult(data=None, errors=errors)
+
+        # Same execution path as GraphQLView.execute_graphql_request.
+        try:
+            execute_options = {
+                'root_value': self.get_root_value(request),
+                'context_value': self.get_context(request),
+                'variable_values': variables,
+                'operation_name': operation_name,
+                'middleware': self.get_middleware(request),
+            }
+            if self.execution_context_class:
+                execute_options['execution_context_class'] = self.execution_context_class
+
+            if (
+                operation_ast is not None
+                and operation_ast.operation == OperationType.MUTATION
+                and (graphene_settings.ATOMIC_MUTATIONS is True or connection.settings_dict.get('ATOMIC_MUTATIONS', False) is True)
+            ):
+                with transaction.atomic():
+                    result = execute(schema, document, **execute_options)
+                    if getattr(request, MUTATION_ERRORS_FLAG, False) is True:
+                        transaction.set_rollback(True)
+                return result
+
+            if operation_ast is not None and operation_ast.operation == OperationType.QUERY:
+                with replica_reads(request):
+                    return execute(schema, document, **execute_options)
+            return execute(schema, document, **execute_options)
+        except Exception as e:
+            return ExecutionResult(errors=[e])
+
+
+def _run_in_worker(view, request, *args, **kwargs):
+    # Worker threads see no request_started/finished, so manage connections here.
+    close_old_connections()
+    try:
+        return view(request, *args, **kwargs)
+    finally:
+        close_old_connections()
+
+
+def async_graphql_view(**initkwargs):
+    """
+    Async entry point for CachedGraphQLView. Under ASGI, Django runs sync
+    views one at a time on a single thread; this view instead runs each
+    operation on a pool thread (thread_sensitive=False), so concurrent
+    GraphQL requests in one worker no longer queue behind each other.
+    Resolvers stay synchronous, as graphene-django's ORM resolvers are.
+    """
+    run = sync_to_async(partial(_run_in_worker, CachedGraphQLView.as_view(**initkwargs)), thread_sensitive=False)
+
+    async def graphql(request, *args, **kwargs):
+        return await run(request, *args, **kwargs)
+    return graphql